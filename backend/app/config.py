@@ -12,7 +12,28 @@ class Settings:
     APP_VERSION: str = "2.0.0"
     
     # Configurações do banco de dados
-    DATABASE_URL: str = "sqlite:///./clientes.db"
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./clientes.db")
+    
+    # Perfil do SQLite, aplicado em cada nova conexão
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_TEMP_STORE: str = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+    
+    # Pools de conexões: escrita (get_db) e somente leitura (get_db_leitura)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_READ_POOL_SIZE: int = int(os.getenv("DB_READ_POOL_SIZE", "10"))
+    DB_READ_MAX_OVERFLOW: int = int(os.getenv("DB_READ_MAX_OVERFLOW", "20"))
+    
+    # Coleta de lixo: limiar da geração 0 (o padrão do Python é 700; 0 mantém o padrão)
+    GC_LIMIAR_GERACAO_0: int = int(os.getenv("GC_LIMIAR_GERACAO_0", "50000"))
+    
+    # Threads que executam os endpoints def (o padrão do AnyIO é 40; aqui, uma por CPU)
+    THREADPOOL_TAMANHO: int = int(os.getenv("THREADPOOL_TAMANHO", str(os.cpu_count() or 1)))
     
     # Configurações CORS - Melhoradas para desenvolvimento
     ALLOWED_ORIGINS: List[str] = [
@@ -2,29 +2,98 @@
 Configuração do banco de dados SQLite
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 
-# URL do banco de dados SQLite
-SQLALCHEMY_DATABASE_URL = "sqlite:///./clientes.db"
+from app.config import settings
+
+# URL do banco de dados (padrão: SQLite em ./clientes.db)
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+def _aplicar_perfil_sqlite(engine: Engine, somente_leitura: bool = False) -> None:
+    """
+    Aplica os PRAGMAs de desempenho em cada nova conexão SQLite
+    
+    WAL permite leituras simultâneas à escrita; synchronous=NORMAL é seguro
+    em WAL e evita um fsync por commit; busy_timeout espera o lock em vez
+    de falhar com "database is locked".
+    """
+    @event.listens_for(engine, "connect")
+    def configurar_conexao(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not somente_leitura:
+            cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS:d}")
+        cursor.execute(f"PRAGMA cache_size={-settings.SQLITE_CACHE_SIZE_KB:d}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE:d}")
+        cursor.execute(f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}")
+        if somente_leitura:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+def _criar_engine_leitura(url: str) -> Engine:
+    """
+    Cria o engine somente leitura usado pelos endpoints GET
+    
+    Em um arquivo SQLite em WAL os leitores não esperam o escritor, então
+    um pool separado evita que GETs fiquem na fila atrás das escritas.
+    Para outros bancos (ou SQLite em memória) reutiliza o engine principal.
+    """
+    url_obj = make_url(url)
+    if url_obj.get_backend_name() != "sqlite" or url_obj.database in (None, "", ":memory:"):
+        return engine
+    url_leitura = url_obj.set(
+        database=f"file:{url_obj.database}",
+        query={**url_obj.query, "mode": "ro", "uri": "true"}
+    )
+    engine_leitura = create_engine(
+        url_leitura,
+        connect_args={"check_same_thread": False},
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT
+    )
+    _aplicar_perfil_sqlite(engine_leitura, somente_leitura=True)
+    return engine_leitura
 
 # Criar engine do SQLAlchemy
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Necessário para SQLite
-)
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},  # Necessário para SQLite
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT
+    )
+    _aplicar_perfil_sqlite(engine)
+else:
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True
+    )
+
+engine_leitura = _criar_engine_leitura(SQLALCHEMY_DATABASE_URL)
 
-# Criar sessão local
+# Criar sessão local (escrita) e sessão somente leitura
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLeitura = sessionmaker(autocommit=False, autoflush=False, bind=engine_leitura)
 
-# Base para os modelos
-Base = declarative_base()
+# Base para os modelos (a mesma usada em app.models, para que create_all crie as tabelas)
+from .models import Base
 
 def get_db():
     """
     Função para obter uma sessão do banco de dados
     Usada como dependência nos endpoints
+    
+    A sessão é síncrona: os endpoints que a usam são declarados com def
+    (e não async def) para que o FastAPI os execute no threadpool, sem
+    bloquear o event loop enquanto esperam o banco.
     """
     db = SessionLocal()
     try:
@@ -32,5 +101,17 @@ def get_db():
     finally:
         db.close()
 
+def get_db_leitura():
+    """
+    Sessão somente leitura, usada como dependência nos endpoints GET
+    
+    Usa um pool próprio, então leituras não disputam conexões com escritas.
+    """
+    db = SessionLeitura()
+    try:
+        yield db
+    finally:
+        db.close()
+
 # Importar todos os modelos para garantir que sejam criados
-from .models import Cliente, Procedimento, Material, Atendimento, AtendimentoMaterial, AtendimentoProcedimento 
\ No newline at end of file
+from .models import Cliente, Procedimento, Material, Atendimento, AtendimentoMaterial, AtendimentoProcedimento
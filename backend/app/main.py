@@ -3,14 +3,29 @@ Aplicação principal para sistema de gestão de clientes
 Usando FastAPI e SQLAlchemy com SQLite
 """
 
+import gc
+
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
+from app.database import engine, Base, SessionLocal
 from app.routers import clientes, atendimentos, procedimentos, materiais
 from app.config import settings
+from app.migracoes import aplicar_migracoes
+from app.utils.autocomplete_clientes import carregar_indice_clientes
+from app.utils.resumo_diario import garantir_resumo_diario
 
-# Criar tabelas no banco de dados
+# Criar tabelas no banco de dados e aplicar migrações pendentes em bancos existentes
 Base.metadata.create_all(bind=engine)
+aplicar_migracoes(engine)
+
+# Popular o resumo diário em bancos criados antes da tabela atendimento_diario
+with SessionLocal() as db:
+    garantir_resumo_diario(db)
+
+# Construir o índice do autocompletar de clientes antes da primeira requisição
+with SessionLocal() as db:
+    carregar_indice_clientes(db)
 
 # Instanciar aplicação FastAPI
 app = FastAPI(
@@ -35,6 +50,33 @@ app.include_router(atendimentos.router, prefix="/api/v1", tags=["atendimentos"])
 app.include_router(procedimentos.router, prefix="/api/v1", tags=["procedimentos"])
 app.include_router(materiais.router, prefix="/api/v1", tags=["materiais"])
 
+def configurar_coleta_de_lixo() -> None:
+    """
+    Ajusta o coletor de lixo para requisições simultâneas no threadpool
+    
+    Com várias listagens em andamento ao mesmo tempo há mais objetos vivos
+    (ORM, schemas) e cada coleta percorre todos eles: com o limiar padrão
+    a coleta chegava a ~40% do tempo sob carga. Os objetos da
+    inicialização (modelos, schemas, rotas) são congelados fora das
+    coletas e a geração 0 é coletada com menos frequência.
+    """
+    if settings.GC_LIMIAR_GERACAO_0:
+        gc.set_threshold(settings.GC_LIMIAR_GERACAO_0, *gc.get_threshold()[1:])
+    gc.freeze()
+
+@app.on_event("startup")
+async def limitar_threadpool() -> None:
+    """
+    Limita as threads que executam os endpoints síncronos
+    
+    Por causa do GIL, threads a mais que CPUs não executam Python em
+    paralelo: só disputam o interpretador (o sqlite3 o libera a cada linha
+    lida) e mantêm mais objetos vivos. Com 1 CPU e 16 listagens
+    simultâneas, 40 threads gastavam ~20% a mais de CPU por requisição do
+    que uma só. O event loop continua livre para as rotas async.
+    """
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_TAMANHO
+
 @app.get("/")
 async def root():
     """Endpoint raiz da aplicação"""
@@ -56,6 +98,9 @@ async def health_check():
     """Endpoint para verificar se a aplicação está funcionando"""
     return {"status": "healthy", "environment": settings.ENVIRONMENT}
 
+# Por último: tudo o que foi criado até aqui fica fora das coletas
+configurar_coleta_de_lixo()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,186 @@
+"""
+Migrações versionadas do esquema do banco de dados
+
+Base.metadata.create_all só cria tabelas que ainda não existem; alterações
+em tabelas existentes (novos índices, colunas, backfills) são registradas
+aqui como migrações numeradas. Cada migração roda uma única vez, em sua
+própria transação, e fica registrada na tabela schema_migracoes.
+
+Em um banco novo o create_all já cria o esquema completo, então as
+migrações devem ser idempotentes (ex: CREATE INDEX IF NOT EXISTS).
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List
+
+from sqlalchemy import Index, text
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.engine import Connection, Engine
+
+from app.models import Base, DDL_BUSCA_CLIENTES
+from app.utils.consumo_diario import popular_consumo_diario
+from app.utils.material_normalizer import normalizar_nomes
+from app.utils.resumo_clientes import popular_resumo_clientes
+from app.utils.telefone import inverter_telefone, normalizar_telefone
+
+@dataclass
+class Migracao:
+    """Uma alteração de esquema identificada por versão"""
+    versao: int
+    descricao: str
+    aplicar: Callable[[Connection], None]
+
+MIGRACOES: List[Migracao] = []
+
+def migracao(versao: int, descricao: str):
+    """Decorator que registra uma função como migração"""
+    def registrar(funcao: Callable[[Connection], None]):
+        MIGRACOES.append(Migracao(versao, descricao, funcao))
+        return funcao
+    return registrar
+
+def _indice(nome: str) -> Index:
+    """Busca um índice declarado nos modelos pelo nome"""
+    for tabela in Base.metadata.tables.values():
+        for indice in tabela.indexes:
+            if indice.name == nome:
+                return indice
+    raise KeyError(f"Índice {nome} não declarado nos modelos")
+
+def criar_indices(conn: Connection, *nomes: str) -> None:
+    """Cria os índices declarados nos modelos, se ainda não existirem"""
+    for nome in nomes:
+        conn.execute(CreateIndex(_indice(nome), if_not_exists=True))
+
+def coluna_existe(conn: Connection, tabela: str, coluna: str) -> bool:
+    """Verifica se uma coluna existe em uma tabela SQLite"""
+    colunas = conn.execute(text(f"PRAGMA table_info({tabela})")).fetchall()
+    return any(c[1] == coluna for c in colunas)
+
+@migracao(1, "Índices das consultas de listagem e filtros")
+def _indices_consultas_principais(conn: Connection) -> None:
+    criar_indices(
+        conn,
+        "ix_clientes_nome",
+        "ix_procedimentos_ativo",
+        "ix_materiais_ativo",
+        "ix_materiais_folga_estoque",
+        "ix_atendimentos_data_hora",
+        "ix_atendimentos_cliente_data",
+        "ix_atendimentos_status_data",
+        "ix_atendimento_procedimentos_atendimento",
+        "ix_atendimento_procedimentos_procedimento",
+        "ix_atendimento_materiais_atendimento",
+        "ix_atendimento_materiais_material",
+        "ix_procedimento_materiais_procedimento",
+        "ix_procedimento_materiais_material",
+    )
+
+@migracao(2, "Coluna materiais.nome_normalizado com backfill e índice")
+def _nome_normalizado_materiais(conn: Connection) -> None:
+    if not coluna_existe(conn, "materiais", "nome_normalizado"):
+        conn.execute(text("ALTER TABLE materiais ADD COLUMN nome_normalizado VARCHAR(100) NOT NULL DEFAULT ''"))
+    
+    # Backfill em lotes, com o mesmo normalizador usado pela aplicação
+    ultimo_id = 0
+    while True:
+        lote = conn.execute(
+            text("SELECT id, nome FROM materiais WHERE id > :ultimo ORDER BY id LIMIT 1000"),
+            {"ultimo": ultimo_id}
+        ).fetchall()
+        if not lote:
+            break
+        normalizados = normalizar_nomes(nome for _, nome in lote)
+        conn.execute(
+            text("UPDATE materiais SET nome_normalizado = :normalizado WHERE id = :id"),
+            [{"id": id_, "normalizado": normalizado} for (id_, _), normalizado in zip(lote, normalizados)]
+        )
+        ultimo_id = lote[-1][0]
+    
+    criar_indices(conn, "ix_materiais_nome_normalizado")
+
+@migracao(3, "Livro-razão do estoque: índices e saldo inicial dos materiais existentes")
+def _livro_razao_estoque(conn: Connection) -> None:
+    criar_indices(conn, "ix_movimentacoes_estoque_material", "ix_movimentacoes_estoque_material_data")
+
+    # O saldo atual de materiais sem movimentações vira a movimentação inicial
+    conn.execute(text(
+        "INSERT INTO movimentacoes_estoque (material_id, quantidade, tipo, data_hora) "
+        "SELECT id, quantidade_disponivel, 'inicial', :agora FROM materiais "
+        "WHERE quantidade_disponivel != 0 "
+        "AND NOT EXISTS (SELECT 1 FROM movimentacoes_estoque m WHERE m.material_id = materiais.id)"
+    ), {"agora": datetime.utcnow()})
+
+@migracao(4, "Consumo diário de materiais com backfill a partir de atendimento_materiais")
+def _consumo_diario(conn: Connection) -> None:
+    # A tabela já foi criada pelo create_all; só é populada se estiver vazia
+    if conn.execute(text("SELECT 1 FROM consumo_diario LIMIT 1")).first() is None:
+        popular_consumo_diario(conn)
+
+@migracao(5, "Índice FTS5 da busca de clientes, com triggers e carga inicial")
+def _busca_clientes(conn: Connection) -> None:
+    for comando in DDL_BUSCA_CLIENTES:
+        conn.execute(text(comando))
+    # Reindexa a partir da tabela clientes (tabela de conteúdo externo)
+    conn.execute(text("INSERT INTO clientes_fts (clientes_fts) VALUES ('rebuild')"))
+
+@migracao(6, "Colunas de busca por telefone dos clientes com backfill e índice")
+def _telefone_normalizado_clientes(conn: Connection) -> None:
+    for coluna in ("telefone_normalizado", "telefone_invertido"):
+        if not coluna_existe(conn, "clientes", coluna):
+            conn.execute(text(f"ALTER TABLE clientes ADD COLUMN {coluna} VARCHAR(20) NOT NULL DEFAULT ''"))
+
+    # Backfill em lotes, com o mesmo normalizador usado pela aplicação
+    ultimo_id = 0
+    while True:
+        lote = conn.execute(
+            text("SELECT id, telefone FROM clientes WHERE id > :ultimo ORDER BY id LIMIT 1000"),
+            {"ultimo": ultimo_id}
+        ).fetchall()
+        if not lote:
+            break
+        linhas = []
+        for id_, telefone in lote:
+            normalizado = normalizar_telefone(telefone)
+            linhas.append({"id": id_, "normalizado": normalizado, "invertido": inverter_telefone(normalizado)})
+        conn.execute(
+            text("UPDATE clientes SET telefone_normalizado = :normalizado, telefone_invertido = :invertido WHERE id = :id"),
+            linhas
+        )
+        ultimo_id = lote[-1][0]
+
+    criar_indices(conn, "ix_clientes_telefone_invertido")
+
+@migracao(7, "Resumo dos clientes (histórico) com backfill a partir dos atendimentos")
+def _resumo_clientes(conn: Connection) -> None:
+    # As tabelas já foram criadas pelo create_all; só são populadas se estiverem vazias
+    if conn.execute(text("SELECT 1 FROM resumo_clientes LIMIT 1")).first() is None:
+        popular_resumo_clientes(conn)
+
+def aplicar_migracoes(engine: Engine) -> List[int]:
+    """
+    Aplica as migrações pendentes em ordem de versão
+
+    Returns:
+        Versões aplicadas nesta execução
+    """
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migracoes ("
+            "versao INTEGER PRIMARY KEY, descricao VARCHAR(200) NOT NULL, aplicada_em DATETIME NOT NULL)"
+        ))
+        aplicadas = {v for (v,) in conn.execute(text("SELECT versao FROM schema_migracoes"))}
+
+    novas = []
+    for m in sorted(MIGRACOES, key=lambda m: m.versao):
+        if m.versao in aplicadas:
+            continue
+        with engine.begin() as conn:
+            m.aplicar(conn)
+            conn.execute(
+                text("INSERT INTO schema_migracoes (versao, descricao, aplicada_em) VALUES (:v, :d, :a)"),
+                {"v": m.versao, "d": m.descricao, "a": datetime.utcnow()}
+            )
+        novas.append(m.versao)
+    return novas
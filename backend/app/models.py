@@ -2,11 +2,14 @@
 Modelos SQLAlchemy para o sistema de gestão de clientes
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Text, ForeignKey, Boolean, Index, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 
+from app.utils.material_normalizer import normalizar_nome
+from app.utils.telefone import inverter_telefone, normalizar_telefone
+
 Base = declarative_base()
 
 class Cliente(Base):
@@ -14,11 +17,17 @@ class Cliente(Base):
     Modelo para a tabela de clientes
     """
     __tablename__ = "clientes"
+    __table_args__ = (
+        Index("ix_clientes_nome", "nome"),
+        Index("ix_clientes_telefone_invertido", "telefone_invertido"),
+    )
     
     # Campos da tabela
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
     telefone = Column(String(20), nullable=False)
+    telefone_normalizado = Column(String(20), nullable=False, default="")  # só dígitos, mantido por _normalizar_telefone
+    telefone_invertido = Column(String(20), nullable=False, default="")  # telefone_normalizado invertido (busca pelo final)
     email = Column(String(100), nullable=True)
     observacao = Column(Text, nullable=True)
     data_cadastro = Column(DateTime, default=datetime.utcnow)
@@ -26,13 +35,48 @@ class Cliente(Base):
     # Relacionamento com atendimentos
     atendimentos = relationship("Atendimento", back_populates="cliente")
 
+    @validates("telefone")
+    def _normalizar_telefone(self, key, telefone):
+        """Mantém as colunas de busca por telefone em sincronia sempre que o telefone é atribuído"""
+        self.telefone_normalizado = normalizar_telefone(telefone)
+        self.telefone_invertido = inverter_telefone(self.telefone_normalizado)
+        return telefone
+
     def __repr__(self):
         """Representação string do objeto"""
         return f"<Cliente(id={self.id}, nome='{self.nome}', telefone='{self.telefone}')>"
 
+# Índice de texto completo (FTS5) da busca de clientes. Tabela de conteúdo
+# externo: guarda só o índice, lendo os textos de clientes; os triggers o
+# mantêm em sincronia com qualquer escrita na tabela, inclusive em lote.
+# unicode61 com remove_diacritics ignora acentos ("Joao" encontra "João")
+# e os índices de prefixo aceleram a busca por início de palavra.
+DDL_BUSCA_CLIENTES = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5("
+    "nome, telefone, email, observacao, content='clientes', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS clientes_fts_insert AFTER INSERT ON clientes BEGIN "
+    "INSERT INTO clientes_fts (rowid, nome, telefone, email, observacao) "
+    "VALUES (new.id, new.nome, new.telefone, new.email, new.observacao); END",
+    "CREATE TRIGGER IF NOT EXISTS clientes_fts_delete AFTER DELETE ON clientes BEGIN "
+    "INSERT INTO clientes_fts (clientes_fts, rowid, nome, telefone, email, observacao) "
+    "VALUES ('delete', old.id, old.nome, old.telefone, old.email, old.observacao); END",
+    "CREATE TRIGGER IF NOT EXISTS clientes_fts_update AFTER UPDATE OF nome, telefone, email, observacao ON clientes BEGIN "
+    "INSERT INTO clientes_fts (clientes_fts, rowid, nome, telefone, email, observacao) "
+    "VALUES ('delete', old.id, old.nome, old.telefone, old.email, old.observacao); "
+    "INSERT INTO clientes_fts (rowid, nome, telefone, email, observacao) "
+    "VALUES (new.id, new.nome, new.telefone, new.email, new.observacao); END",
+]
+for _comando in DDL_BUSCA_CLIENTES:
+    event.listen(Cliente.__table__, "after_create", DDL(_comando))
+event.listen(Cliente.__table__, "before_drop", DDL("DROP TABLE IF EXISTS clientes_fts"))
+
 class Procedimento(Base):
     """Modelo para procedimentos realizados"""
     __tablename__ = "procedimentos"
+    __table_args__ = (
+        Index("ix_procedimentos_ativo", "ativo"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
@@ -48,9 +92,14 @@ class Procedimento(Base):
 class Material(Base):
     """Modelo para materiais/insumos"""
     __tablename__ = "materiais"
+    __table_args__ = (
+        Index("ix_materiais_ativo", "ativo"),
+        Index("ix_materiais_nome_normalizado", "nome_normalizado"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
+    nome_normalizado = Column(String(100), nullable=False, default="")  # normalizar_nome(nome), mantido por _normalizar_nome
     descricao = Column(Text, nullable=True)
     quantidade_disponivel = Column(Float, nullable=False, default=0.0)
     unidade = Column(String(20), nullable=False, default="un")
@@ -61,10 +110,25 @@ class Material(Base):
     
     # Relacionamento com atendimentos
     atendimento_materiais = relationship("AtendimentoMaterial", back_populates="material")
+    
+    @validates("nome")
+    def _normalizar_nome(self, key, nome):
+        """Mantém nome_normalizado em sincronia sempre que o nome é atribuído"""
+        self.nome_normalizado = normalizar_nome(nome)
+        return nome
+
+# Índice de expressão para o filtro de estoque baixo: as consultas comparam
+# (quantidade_disponivel - estoque_minimo) com 0 para poder usá-lo
+Index("ix_materiais_folga_estoque", Material.quantidade_disponivel - Material.estoque_minimo)
 
 class Atendimento(Base):
     """Modelo para atendimentos realizados"""
     __tablename__ = "atendimentos"
+    __table_args__ = (
+        Index("ix_atendimentos_data_hora", "data_hora"),
+        Index("ix_atendimentos_cliente_data", "cliente_id", "data_hora"),
+        Index("ix_atendimentos_status_data", "status", "data_hora"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     cliente_id = Column(Integer, ForeignKey("clientes.id"), nullable=False)
@@ -79,9 +143,134 @@ class Atendimento(Base):
     procedimentos = relationship("AtendimentoProcedimento", back_populates="atendimento")
     materiais_utilizados = relationship("AtendimentoMaterial", back_populates="atendimento")
 
+class AtendimentoDiario(Base):
+    """
+    Resumo diário dos atendimentos por status (mantido incrementalmente)
+    
+    Atualizado na mesma transação que cria, altera ou remove atendimentos;
+    pode ser reconstruído com scripts/rebuild_atendimento_diario.py
+    """
+    __tablename__ = "atendimento_diario"
+    
+    dia = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)  # "" quando o atendimento não tem status
+    quantidade = Column(Integer, nullable=False, default=0)
+    valor_total = Column(Float, nullable=False, default=0.0)
+
+class ConsumoDiario(Base):
+    """
+    Consumo diário de cada material em atendimentos (mantido incrementalmente)
+
+    Além do consumo do dia guarda o acumulado do material até o dia, então
+    o consumo em qualquer período sai de duas buscas pela chave primária.
+    Sem rowid: as linhas ficam ordenadas por (material_id, dia).
+
+    Atualizado na mesma transação que cria, altera ou remove atendimentos;
+    pode ser reconstruído com scripts/rebuild_consumo_diario.py
+    """
+    __tablename__ = "consumo_diario"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    material_id = Column(Integer, ForeignKey("materiais.id"), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    quantidade = Column(Float, nullable=False, default=0.0)
+    valor_total = Column(Float, nullable=False, default=0.0)  # quantidade x valor_unitario_momento
+    quantidade_acumulada = Column(Float, nullable=False, default=0.0)  # soma de quantidade até o dia, inclusive
+    valor_acumulado = Column(Float, nullable=False, default=0.0)
+
+class ResumoCliente(Base):
+    """
+    Métricas de toda a vida do cliente (mantidas incrementalmente)
+
+    Conta os atendimentos que não foram cancelados. Atualizado na mesma
+    transação que cria, altera ou remove atendimentos; pode ser
+    reconstruído com scripts/rebuild_resumo_clientes.py
+    """
+    __tablename__ = "resumo_clientes"
+
+    cliente_id = Column(Integer, ForeignKey("clientes.id"), primary_key=True)
+    n_atendimentos = Column(Integer, nullable=False, default=0)
+    total_gasto = Column(Float, nullable=False, default=0.0)
+    ultimo_atendimento = Column(DateTime, nullable=True)
+
+class ResumoClienteProcedimento(Base):
+    """
+    Quantas vezes cada cliente fez cada procedimento (mantido com ResumoCliente)
+
+    Sem rowid: as linhas de um cliente ficam juntas, ordenadas por procedimento.
+    """
+    __tablename__ = "resumo_cliente_procedimentos"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    cliente_id = Column(Integer, ForeignKey("clientes.id"), primary_key=True)
+    procedimento_id = Column(Integer, ForeignKey("procedimentos.id"), primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+class MovimentacaoEstoque(Base):
+    """
+    Livro-razão do estoque: cada entrada ou saída de material é um insert
+
+    quantidade é a variação com sinal (saídas negativas); o saldo de um
+    material é o último SnapshotEstoque mais as movimentações posteriores.
+    """
+    __tablename__ = "movimentacoes_estoque"
+    __table_args__ = (
+        Index("ix_movimentacoes_estoque_material", "material_id", "id"),
+        Index("ix_movimentacoes_estoque_material_data", "material_id", "data_hora"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    material_id = Column(Integer, ForeignKey("materiais.id"), nullable=False)
+    quantidade = Column(Float, nullable=False)
+    tipo = Column(String(20), nullable=False)  # inicial, entrada, saida, ajuste, atendimento
+    atendimento_id = Column(Integer, ForeignKey("atendimentos.id"), nullable=True)
+    data_hora = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class SnapshotEstoque(Base):
+    """
+    Saldo consolidado de um material até uma movimentação
+
+    Gerado periodicamente (scripts/gerar_snapshots_estoque.py); data_hora é
+    a da última movimentação incluída no saldo.
+    """
+    __tablename__ = "snapshots_estoque"
+
+    material_id = Column(Integer, ForeignKey("materiais.id"), primary_key=True)
+    movimentacao_id = Column(Integer, primary_key=True)
+    saldo = Column(Float, nullable=False)
+    data_hora = Column(DateTime, nullable=False)
+
+class CatalogoVersao(Base):
+    """
+    Versão do catálogo de materiais (linha única, id = 1)
+
+    Incrementada na mesma transação de qualquer escrita em materiais feita
+    pela aplicação; cada processo compara com a versão do seu cache do
+    catálogo para saber se está desatualizado.
+    """
+    __tablename__ = "catalogo_versao"
+
+    id = Column(Integer, primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+
+class IndiceClientesVersao(Base):
+    """
+    Versão do índice de autocompletar clientes (linha única, id = 1)
+
+    Mesmo mecanismo de CatalogoVersao, para as escritas em clientes.
+    """
+    __tablename__ = "indice_clientes_versao"
+
+    id = Column(Integer, primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+
 class AtendimentoProcedimento(Base):
     """Modelo para relacionamento entre atendimentos e procedimentos realizados"""
     __tablename__ = "atendimento_procedimentos"
+    __table_args__ = (
+        Index("ix_atendimento_procedimentos_atendimento", "atendimento_id"),
+        Index("ix_atendimento_procedimentos_procedimento", "procedimento_id", "atendimento_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     atendimento_id = Column(Integer, ForeignKey("atendimentos.id"), nullable=False)
@@ -96,6 +285,10 @@ class AtendimentoProcedimento(Base):
 class AtendimentoMaterial(Base):
     """Modelo para relacionamento entre atendimentos e materiais utilizados"""
     __tablename__ = "atendimento_materiais"
+    __table_args__ = (
+        Index("ix_atendimento_materiais_atendimento", "atendimento_id"),
+        Index("ix_atendimento_materiais_material", "material_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     atendimento_id = Column(Integer, ForeignKey("atendimentos.id"), nullable=False)
@@ -110,6 +303,10 @@ class AtendimentoMaterial(Base):
 class ProcedimentoMaterial(Base):
     """Modelo para relacionamento entre procedimentos e seus materiais padrão"""
     __tablename__ = "procedimento_materiais"
+    __table_args__ = (
+        Index("ix_procedimento_materiais_procedimento", "procedimento_id"),
+        Index("ix_procedimento_materiais_material", "material_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     procedimento_id = Column(Integer, ForeignKey("procedimentos.id"), nullable=False)
@@ -2,25 +2,152 @@
 Rotas para gerenciamento de atendimentos
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, or_, case, func, insert, select
+from typing import AsyncIterator, Dict, IO, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
+import json
 import logging
+import tempfile
 
-from app.database import get_db
-from app.models import Atendimento, Cliente, Procedimento, Material, AtendimentoMaterial, AtendimentoProcedimento, ProcedimentoMaterial as ProcedimentoMaterialModel
+from app.database import get_db, get_db_leitura
+from app.utils.consumo_diario import itens_do_atendimento, registrar_consumo
+from app.utils.estoque import atualizar_saldo, registrar_movimentacoes
+from app.utils.paginacao import codificar_cursor, decodificar_cursor
+from app.utils.resumo_clientes import AtendimentoResumo, procedimentos_do_atendimento, registrar_historico
+from app.utils.resumo_diario import registrar_atendimentos
+from app.utils.serializacao import resposta_json
+from app.models import Atendimento, AtendimentoDiario, Cliente, Procedimento, Material, AtendimentoMaterial, AtendimentoProcedimento, ProcedimentoMaterial as ProcedimentoMaterialModel
 from app.schemas import (
     AtendimentoCreate, AtendimentoUpdate, Atendimento as AtendimentoSchema,
-    AtendimentoList, AtendimentoFiltro, AtendimentoProcedimentoCreate,
+    AtendimentoList, AtendimentoFiltro, AtendimentoProcedimentoCreate, AtendimentoMaterialCreate,
     ProcedimentoMaterial as ProcedimentoMaterialSchema
 )
 
 router = APIRouter()
 
+# Linhas NDJSON processadas por transação na importação em lote
+TAMANHO_LOTE_BULK = 500
+
+# Plano de carregamento do grafo serializado pelo schema Atendimento:
+# cliente, procedimentos[].procedimento.materiais_padrao[].material e
+# materiais_utilizados[].material. Cada coleção é carregada com um único
+# SELECT ... IN, então a quantidade de consultas não depende do tamanho da página.
+CARREGAMENTO_ATENDIMENTO = (
+    joinedload(Atendimento.cliente),
+    selectinload(Atendimento.procedimentos)
+        .joinedload(AtendimentoProcedimento.procedimento)
+        .selectinload(Procedimento.materiais_padrao)
+        .joinedload(ProcedimentoMaterialModel.material),
+    selectinload(Atendimento.materiais_utilizados)
+        .joinedload(AtendimentoMaterial.material),
+)
+
+def _carregar_atendimento(db: Session, atendimento_id: int) -> Optional[Atendimento]:
+    """Busca um atendimento com todo o grafo da resposta já carregado"""
+    return db.query(Atendimento).options(*CARREGAMENTO_ATENDIMENTO).filter(
+        Atendimento.id == atendimento_id
+    ).first()
+
+def _validar_procedimentos(db: Session, procedimento_ids: List[int]) -> None:
+    """
+    Verifica se todos os procedimentos existem com uma única consulta IN
+    
+    Raises:
+        HTTPException: 404 com o primeiro ID inexistente
+    """
+    encontrados = {
+        id_ for (id_,) in db.query(Procedimento.id).filter(Procedimento.id.in_(set(procedimento_ids)))
+    }
+    for procedimento_id in procedimento_ids:
+        if procedimento_id not in encontrados:
+            raise HTTPException(status_code=404, detail=f"Procedimento ID {procedimento_id} não encontrado")
+
+def _somar_materiais(materiais_utilizados: List[AtendimentoMaterialCreate]) -> Dict[int, float]:
+    """Soma a quantidade utilizada por material (o mesmo material pode aparecer mais de uma vez)"""
+    quantidades: Dict[int, float] = {}
+    for material_data in materiais_utilizados:
+        quantidades[material_data.material_id] = (
+            quantidades.get(material_data.material_id, 0.0) + float(material_data.quantidade_utilizada)
+        )
+    return quantidades
+
+def _validar_materiais(db: Session, quantidades: Dict[int, float]) -> Dict[int, Material]:
+    """
+    Verifica existência e estoque dos materiais com uma única consulta IN
+    
+    Raises:
+        HTTPException: 404 se algum material não existe, 400 se está inativo
+            ou o estoque é insuficiente
+    """
+    if not quantidades:
+        return {}
+    materiais = {m.id: m for m in db.query(Material).filter(Material.id.in_(quantidades.keys()))}
+    for material_id, quantidade in quantidades.items():
+        material = materiais.get(material_id)
+        if not material:
+            raise HTTPException(status_code=404, detail=f"Material ID {material_id} não encontrado")
+        if not material.ativo:
+            raise HTTPException(status_code=400, detail=f"Material {material.nome} está inativo")
+        quantidade_atual = float(material.quantidade_disponivel)
+        if quantidade_atual < quantidade:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Estoque insuficiente para {material.nome}. Disponível: {quantidade_atual}"
+            )
+    return materiais
+
+def _baixar_estoque(db: Session, quantidades: Dict[int, float]) -> None:
+    """
+    Baixa o estoque com um UPDATE condicional por material
+    
+    O filtro quantidade_disponivel >= quantidade é avaliado pelo banco no
+    momento da escrita, então dois atendimentos simultâneos não conseguem
+    consumir o mesmo saldo (sem leitura-modificação-escrita em Python).
+    
+    Raises:
+        HTTPException: 400 se o saldo acabou entre a validação e a baixa
+    """
+    for material_id, quantidade in quantidades.items():
+        if atualizar_saldo(db, material_id, -quantidade, exigir_saldo=True) is None:
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Estoque insuficiente para o material ID {material_id}"
+            )
+
+def _saidas_de_atendimento(materiais_linhas: List[dict]) -> List[dict]:
+    """Movimentações de saída correspondentes às linhas de atendimento_materiais"""
+    return [
+        {
+            "material_id": linha["material_id"],
+            "quantidade": -linha["quantidade_utilizada"],
+            "tipo": "atendimento",
+            "atendimento_id": linha["atendimento_id"]
+        }
+        for linha in materiais_linhas
+    ]
+
+def _itens_consumidos(atendimento: AtendimentoCreate) -> List[Tuple[int, float, float]]:
+    """Materiais do atendimento no formato de registrar_consumo"""
+    return [
+        (m.material_id, m.quantidade_utilizada, m.valor_unitario_momento)
+        for m in atendimento.materiais_utilizados or []
+    ]
+
+def _resumo_do_atendimento(atendimento_id: int, atendimento: AtendimentoCreate) -> AtendimentoResumo:
+    """Atendimento no formato de registrar_historico"""
+    return (
+        atendimento_id, atendimento.cliente_id, atendimento.data_hora, atendimento.status,
+        atendimento.valor_cobrado, [p.procedimento_id for p in atendimento.procedimentos]
+    )
+
 @router.get("/atendimentos", response_model=AtendimentoList)
-async def listar_atendimentos(
+def listar_atendimentos(
     skip: int = Query(0, ge=0, description="Número de registros para pular"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros"),
     cliente_id: Optional[int] = Query(None, description="Filtrar por cliente"),
@@ -28,23 +155,30 @@ async def listar_atendimentos(
     data_inicio: Optional[datetime] = Query(None, description="Data de início"),
     data_fim: Optional[datetime] = Query(None, description="Data de fim"),
     status: Optional[str] = Query(None, description="Status do atendimento"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor retornado em next_cursor (substitui skip)"),
+    incluir_total: bool = Query(True, description="Calcular o total de registros (COUNT)"),
+    db: Session = Depends(get_db_leitura)
 ):
     """
     Lista todos os atendimentos com filtros opcionais
+    
+    A paginação pode ser feita por skip/limit ou por cursor: cada página
+    retorna next_cursor, que posiciona a próxima consulta logo após o
+    último registro (data_hora, id) sem precisar de OFFSET.
     """
-    query = db.query(Atendimento).options(
-        joinedload(Atendimento.procedimentos).joinedload(AtendimentoProcedimento.procedimento)
-    )
+    query = db.query(Atendimento).options(*CARREGAMENTO_ATENDIMENTO)
     
     # Aplicar filtros
     if cliente_id is not None:
         query = query.filter(Atendimento.cliente_id == cliente_id)
     
     if procedimento_id is not None:
-        # Filtrar por procedimento usando a tabela intermediária
-        query = query.join(AtendimentoProcedimento).filter(
-            AtendimentoProcedimento.procedimento_id == procedimento_id
+        # Filtrar por procedimento usando a tabela intermediária (IN via índice, sem duplicar linhas)
+        query = query.filter(
+            Atendimento.id.in_(
+                select(AtendimentoProcedimento.atendimento_id)
+                .where(AtendimentoProcedimento.procedimento_id == procedimento_id)
+            )
         )
     
     if data_inicio is not None:
@@ -56,30 +190,49 @@ async def listar_atendimentos(
     if status is not None:
         query = query.filter(Atendimento.status == status)
     
-    # Contar total antes da paginação
-    total = query.count()
+    # Contar total antes da paginação (opcional, pois exige varrer todo o filtro)
+    total = query.count() if incluir_total else None
     
-    # Aplicar paginação e ordenação
-    atendimentos = query.order_by(Atendimento.data_hora.desc()).offset(skip).limit(limit).all()
+    # Aplicar paginação e ordenação (id desempata registros com mesma data_hora)
+    query = query.order_by(Atendimento.data_hora.desc(), Atendimento.id.desc())
+    if cursor is not None:
+        cursor_data_hora, cursor_id = decodificar_cursor(cursor, datetime, int)
+        query = query.filter(
+            or_(
+                Atendimento.data_hora < cursor_data_hora,
+                and_(Atendimento.data_hora == cursor_data_hora, Atendimento.id < cursor_id)
+            )
+        )
+    else:
+        query = query.offset(skip)
     
-    # Converter modelos para schemas antes de retornar
-    atendimentos_schemas = [AtendimentoSchema.model_validate(atendimento) for atendimento in atendimentos]
+    # Buscar um registro a mais para saber se existe próxima página
+    atendimentos = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(atendimentos) > limit:
+        atendimentos = atendimentos[:limit]
+        ultimo = atendimentos[-1]
+        next_cursor = codificar_cursor(ultimo.data_hora, ultimo.id)
     
-    return AtendimentoList(atendimentos=atendimentos_schemas, total=total)
+    # Validar e serializar a página uma única vez
+    return resposta_json(
+        AtendimentoList,
+        {"atendimentos": atendimentos, "total": total, "next_cursor": next_cursor}
+    )
 
 @router.get("/atendimentos/{atendimento_id}", response_model=AtendimentoSchema)
-async def obter_atendimento(atendimento_id: int, db: Session = Depends(get_db)):
+def obter_atendimento(atendimento_id: int, db: Session = Depends(get_db_leitura)):
     """
     Obtém um atendimento específico por ID
     """
-    atendimento = db.query(Atendimento).filter(Atendimento.id == atendimento_id).first()
+    atendimento = _carregar_atendimento(db, atendimento_id)
     if not atendimento:
         raise HTTPException(status_code=404, detail="Atendimento não encontrado")
     
-    return atendimento
+    return resposta_json(AtendimentoSchema, atendimento)
 
 @router.post("/atendimentos", response_model=AtendimentoSchema, status_code=201)
-async def criar_atendimento(atendimento: AtendimentoCreate, db: Session = Depends(get_db)):
+def criar_atendimento(atendimento: AtendimentoCreate, db: Session = Depends(get_db)):
     """
     Cria um novo atendimento com múltiplos procedimentos
     """
@@ -88,11 +241,12 @@ async def criar_atendimento(atendimento: AtendimentoCreate, db: Session = Depend
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente não encontrado")
     
-    # Verificar se todos os procedimentos existem
-    for proc_data in atendimento.procedimentos:
-        procedimento = db.query(Procedimento).filter(Procedimento.id == proc_data.procedimento_id).first()
-        if not procedimento:
-            raise HTTPException(status_code=404, detail=f"Procedimento ID {proc_data.procedimento_id} não encontrado")
+    # Verificar se todos os procedimentos existem (uma única consulta IN)
+    _validar_procedimentos(db, [p.procedimento_id for p in atendimento.procedimentos])
+    
+    # Verificar materiais e estoque (uma única consulta IN)
+    quantidades = _somar_materiais(atendimento.materiais_utilizados or [])
+    _validar_materiais(db, quantidades)
     
     # Criar atendimento
     db_atendimento = Atendimento(
@@ -106,53 +260,243 @@ async def criar_atendimento(atendimento: AtendimentoCreate, db: Session = Depend
     db.add(db_atendimento)
     db.flush()  # Para obter o ID do atendimento
     
-    # Processar procedimentos
-    for proc_data in atendimento.procedimentos:
-        atendimento_procedimento = AtendimentoProcedimento(
-            atendimento_id=db_atendimento.id,
-            procedimento_id=proc_data.procedimento_id,
-            valor_cobrado=proc_data.valor_cobrado,
-            observacoes=proc_data.observacoes
-        )
-        db.add(atendimento_procedimento)
-    
-    # Processar materiais utilizados
-    if atendimento.materiais_utilizados:
-        for material_data in atendimento.materiais_utilizados:
-            # Verificar se material existe
-            material = db.query(Material).filter(Material.id == material_data.material_id).first()
-            if not material:
-                raise HTTPException(status_code=404, detail=f"Material ID {material_data.material_id} não encontrado")
-            
-            # Verificar estoque
-            quantidade_atual = float(material.quantidade_disponivel)
-            quantidade_solicitada = float(material_data.quantidade_utilizada)
-            if quantidade_atual < quantidade_solicitada:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Estoque insuficiente para {material.nome}. Disponível: {quantidade_atual}"
-                )
-            
-            # Criar registro de material utilizado
-            atendimento_material = AtendimentoMaterial(
-                atendimento_id=db_atendimento.id,
-                material_id=material_data.material_id,
-                quantidade_utilizada=material_data.quantidade_utilizada,
-                valor_unitario_momento=material_data.valor_unitario_momento
-            )
-            
-            db.add(atendimento_material)
-            
-            # Baixar do estoque
-            material.quantidade_disponivel = float(quantidade_atual - quantidade_solicitada)
+    # Processar procedimentos e materiais utilizados (um executemany por tabela)
+    procedimentos_linhas = [
+        {
+            "atendimento_id": db_atendimento.id,
+            "procedimento_id": proc_data.procedimento_id,
+            "valor_cobrado": proc_data.valor_cobrado,
+            "observacoes": proc_data.observacoes
+        }
+        for proc_data in atendimento.procedimentos
+    ]
+    if procedimentos_linhas:
+        db.execute(insert(AtendimentoProcedimento), procedimentos_linhas)
+    materiais_linhas = [
+        {
+            "atendimento_id": db_atendimento.id,
+            "material_id": material_data.material_id,
+            "quantidade_utilizada": material_data.quantidade_utilizada,
+            "valor_unitario_momento": material_data.valor_unitario_momento
+        }
+        for material_data in atendimento.materiais_utilizados or []
+    ]
+    if materiais_linhas:
+        db.execute(insert(AtendimentoMaterial), materiais_linhas)
+    
+    # Atualizar resumos, baixar do estoque e lançar as saídas no livro-razão
+    registrar_atendimentos(db, [(atendimento.data_hora, atendimento.status, atendimento.valor_cobrado)])
+    registrar_consumo(db, [(atendimento.data_hora, _itens_consumidos(atendimento))])
+    registrar_historico(db, [_resumo_do_atendimento(db_atendimento.id, atendimento)])
+    _baixar_estoque(db, quantidades)
+    registrar_movimentacoes(db, _saidas_de_atendimento(materiais_linhas))
     
+    atendimento_id = db_atendimento.id
     db.commit()
-    db.refresh(db_atendimento)
     
-    return db_atendimento
+    return _carregar_atendimento(db, atendimento_id)
+
+async def _ler_linhas_ndjson(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Separa o corpo da requisição em linhas à medida que os blocos chegam
+    
+    Retorna (número da linha, conteúdo), ignorando linhas em branco
+    """
+    numero = 0
+    resto = b""
+    async for bloco in stream:
+        resto += bloco
+        *linhas, resto = resto.split(b"\n")
+        for linha in linhas:
+            numero += 1
+            if linha.strip():
+                yield numero, linha
+    if resto.strip():
+        yield numero + 1, resto
+
+def _processar_lote_bulk(
+    db: Session,
+    lote: List[Tuple[int, Optional[AtendimentoCreate], Optional[str]]]
+) -> List[Dict]:
+    """
+    Valida e grava um lote de atendimentos em uma única transação
+    
+    Clientes, procedimentos e materiais referenciados pelo lote são
+    carregados com uma consulta IN cada; as linhas são inseridas com
+    executemany e o estoque é baixado com um UPDATE condicional por
+    material. Linhas inválidas são reportadas e não impedem as demais.
+    
+    Returns:
+        Resultado por linha, na ordem do arquivo
+    """
+    resultados: Dict[int, Dict] = {}
+    validos: List[Tuple[int, AtendimentoCreate, Dict[int, float]]] = []
+    
+    for linha, atendimento, erro in lote:
+        if erro is not None:
+            resultados[linha] = {"linha": linha, "status": "erro", "erro": erro}
+    
+    atendimentos = [(linha, a) for linha, a, erro in lote if erro is None]
+    cliente_ids = {a.cliente_id for _, a in atendimentos}
+    procedimento_ids = {p.procedimento_id for _, a in atendimentos for p in a.procedimentos}
+    material_ids = {m.material_id for _, a in atendimentos for m in a.materiais_utilizados or []}
+    
+    clientes = {id_ for (id_,) in db.query(Cliente.id).filter(Cliente.id.in_(cliente_ids))} if cliente_ids else set()
+    procedimentos = {
+        id_ for (id_,) in db.query(Procedimento.id).filter(Procedimento.id.in_(procedimento_ids))
+    } if procedimento_ids else set()
+    saldos: Dict[int, float] = {}
+    inativos = set()
+    if material_ids:
+        for material_id, quantidade, ativo in db.query(
+            Material.id, Material.quantidade_disponivel, Material.ativo
+        ).filter(Material.id.in_(material_ids)):
+            saldos[material_id] = quantidade
+            if not ativo:
+                inativos.add(material_id)
+    
+    for linha, atendimento in atendimentos:
+        erro = None
+        quantidades = _somar_materiais(atendimento.materiais_utilizados or [])
+        if atendimento.cliente_id not in clientes:
+            erro = f"Cliente ID {atendimento.cliente_id} não encontrado"
+        else:
+            for proc_data in atendimento.procedimentos:
+                if proc_data.procedimento_id not in procedimentos:
+                    erro = f"Procedimento ID {proc_data.procedimento_id} não encontrado"
+                    break
+        if erro is None:
+            for material_id, quantidade in quantidades.items():
+                if material_id not in saldos:
+                    erro = f"Material ID {material_id} não encontrado"
+                    break
+                if material_id in inativos:
+                    erro = f"Material ID {material_id} está inativo"
+                    break
+                if saldos[material_id] < quantidade:
+                    erro = f"Estoque insuficiente para o material ID {material_id}. Disponível: {saldos[material_id]}"
+                    break
+        if erro is not None:
+            resultados[linha] = {"linha": linha, "status": "erro", "erro": erro}
+            continue
+        for material_id, quantidade in quantidades.items():
+            saldos[material_id] -= quantidade
+        validos.append((linha, atendimento, quantidades))
+    
+    if validos:
+        ids = db.execute(
+            insert(Atendimento).returning(Atendimento.id, sort_by_parameter_order=True),
+            [
+                {
+                    "cliente_id": a.cliente_id,
+                    "data_hora": a.data_hora,
+                    "valor_cobrado": a.valor_cobrado,
+                    "observacoes": a.observacoes,
+                    "status": a.status
+                }
+                for _, a, _ in validos
+            ]
+        ).scalars().all()
+        
+        procedimentos_linhas = [
+            {
+                "atendimento_id": atendimento_id,
+                "procedimento_id": p.procedimento_id,
+                "valor_cobrado": p.valor_cobrado,
+                "observacoes": p.observacoes
+            }
+            for atendimento_id, (_, a, _) in zip(ids, validos) for p in a.procedimentos
+        ]
+        materiais_linhas = [
+            {
+                "atendimento_id": atendimento_id,
+                "material_id": m.material_id,
+                "quantidade_utilizada": m.quantidade_utilizada,
+                "valor_unitario_momento": m.valor_unitario_momento
+            }
+            for atendimento_id, (_, a, _) in zip(ids, validos) for m in a.materiais_utilizados or []
+        ]
+        if procedimentos_linhas:
+            db.execute(insert(AtendimentoProcedimento), procedimentos_linhas)
+        if materiais_linhas:
+            db.execute(insert(AtendimentoMaterial), materiais_linhas)
+        
+        consumo: Dict[int, float] = {}
+        for _, _, quantidades in validos:
+            for material_id, quantidade in quantidades.items():
+                consumo[material_id] = consumo.get(material_id, 0.0) + quantidade
+        registrar_atendimentos(db, [(a.data_hora, a.status, a.valor_cobrado) for _, a, _ in validos])
+        registrar_consumo(db, [(a.data_hora, _itens_consumidos(a)) for _, a, _ in validos])
+        registrar_historico(db, [
+            _resumo_do_atendimento(atendimento_id, a) for atendimento_id, (_, a, _) in zip(ids, validos)
+        ])
+        try:
+            _baixar_estoque(db, consumo)
+        except HTTPException as e:
+            # O saldo mudou desde a leitura: o lote inteiro é descartado
+            for linha, _, _ in validos:
+                resultados[linha] = {"linha": linha, "status": "erro", "erro": e.detail}
+        else:
+            registrar_movimentacoes(db, _saidas_de_atendimento(materiais_linhas))
+            db.commit()
+            for atendimento_id, (linha, _, _) in zip(ids, validos):
+                resultados[linha] = {"linha": linha, "status": "criado", "id": atendimento_id}
+    
+    return [resultados[linha] for linha in sorted(resultados)]
+
+def _ler_relatorio(relatorio: IO[bytes]) -> Iterator[bytes]:
+    """Devolve o relatório gravado em disco/memória e fecha o arquivo ao final"""
+    try:
+        relatorio.seek(0)
+        yield from relatorio
+    finally:
+        relatorio.close()
+
+@router.post("/atendimentos/bulk")
+async def importar_atendimentos_bulk(
+    request: Request,
+    tamanho_lote: int = Query(TAMANHO_LOTE_BULK, ge=1, le=5000, description="Linhas por transação"),
+    db: Session = Depends(get_db)
+):
+    """
+    Importa atendimentos enviados como NDJSON (um AtendimentoCreate por linha)
+    
+    O corpo é lido em streaming e gravado em lotes de tamanho_lote, cada
+    lote em sua própria transação. A resposta é um NDJSON com o resultado
+    de cada linha ({"linha", "status", "id" | "erro"}) seguido de uma
+    linha final com o resumo. O relatório é acumulado em um arquivo
+    temporário, então a memória não cresce com o tamanho da importação.
+    
+    O endpoint é assíncrono para ler o corpo em streaming; a gravação de
+    cada lote roda no threadpool para não bloquear o event loop.
+    """
+    relatorio = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    resumo = {"criados": 0, "erros": 0}
+    lote: List[Tuple[int, Optional[AtendimentoCreate], Optional[str]]] = []
+    
+    def gravar_lote():
+        for resultado in _processar_lote_bulk(db, lote):
+            resumo["criados" if resultado["status"] == "criado" else "erros"] += 1
+            relatorio.write(json.dumps(resultado, ensure_ascii=False).encode("utf-8") + b"\n")
+        lote.clear()
+    
+    async for linha, conteudo in _ler_linhas_ndjson(request.stream()):
+        try:
+            lote.append((linha, AtendimentoCreate.model_validate_json(conteudo), None))
+        except ValidationError as e:
+            lote.append((linha, None, "; ".join(
+                f"{'.'.join(str(p) for p in erro['loc']) or 'linha'}: {erro['msg']}" for erro in e.errors()
+            )))
+        if len(lote) >= tamanho_lote:
+            await run_in_threadpool(gravar_lote)
+    if lote:
+        await run_in_threadpool(gravar_lote)
+    
+    relatorio.write(json.dumps({"resumo": resumo}).encode("utf-8") + b"\n")
+    return StreamingResponse(_ler_relatorio(relatorio), media_type="application/x-ndjson")
 
 @router.put("/atendimentos/{atendimento_id}", response_model=AtendimentoSchema)
-async def atualizar_atendimento(
+def atualizar_atendimento(
     atendimento_id: int, 
     atendimento_update: AtendimentoUpdate, 
     db: Session = Depends(get_db)
@@ -165,17 +509,36 @@ async def atualizar_atendimento(
         raise HTTPException(status_code=404, detail="Atendimento não encontrado")
     
     # Atualizar campos
+    antes = (db_atendimento.data_hora, db_atendimento.status, db_atendimento.valor_cobrado)
+    cliente_antes = db_atendimento.cliente_id
     update_data = atendimento_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_atendimento, field, value)
     
+    # Mover o atendimento no resumo diário se dia, status ou valor mudaram
+    depois = (db_atendimento.data_hora, db_atendimento.status, db_atendimento.valor_cobrado)
+    if antes != depois:
+        registrar_atendimentos(db, [antes], sinal=-1)
+        registrar_atendimentos(db, [depois])
+    
+    # Mover o consumo de materiais se o dia mudou
+    if antes[0].date() != depois[0].date():
+        itens = itens_do_atendimento(db, atendimento_id)
+        registrar_consumo(db, [(antes[0], itens)], sinal=-1)
+        registrar_consumo(db, [(depois[0], itens)])
+    
+    # Mover o atendimento no resumo dos clientes se cliente, data, status ou valor mudaram
+    if antes != depois or cliente_antes != db_atendimento.cliente_id:
+        procedimentos = procedimentos_do_atendimento(db, atendimento_id)
+        registrar_historico(db, [(atendimento_id, cliente_antes, *antes, procedimentos)], sinal=-1)
+        registrar_historico(db, [(atendimento_id, db_atendimento.cliente_id, *depois, procedimentos)])
+    
     db.commit()
-    db.refresh(db_atendimento)
     
-    return db_atendimento
+    return _carregar_atendimento(db, atendimento_id)
 
 @router.delete("/atendimentos/{atendimento_id}", status_code=204)
-async def remover_atendimento(atendimento_id: int, db: Session = Depends(get_db)):
+def remover_atendimento(atendimento_id: int, db: Session = Depends(get_db)):
     """
     Remove um atendimento
     """
@@ -183,35 +546,41 @@ async def remover_atendimento(atendimento_id: int, db: Session = Depends(get_db)
     if not atendimento:
         raise HTTPException(status_code=404, detail="Atendimento não encontrado")
     
-    # Remover procedimentos primeiro
+    # Retirar do resumo do cliente e remover procedimentos primeiro
+    registrar_historico(db, [(
+        atendimento_id, atendimento.cliente_id, atendimento.data_hora, atendimento.status,
+        atendimento.valor_cobrado, procedimentos_do_atendimento(db, atendimento_id)
+    )], sinal=-1)
     db.query(AtendimentoProcedimento).filter(AtendimentoProcedimento.atendimento_id == atendimento_id).delete()
     
-    # Remover materiais utilizados
+    # Remover materiais utilizados e retirá-los do consumo diário
+    registrar_consumo(db, [(atendimento.data_hora, itens_do_atendimento(db, atendimento_id))], sinal=-1)
     db.query(AtendimentoMaterial).filter(AtendimentoMaterial.atendimento_id == atendimento_id).delete()
     
-    # Remover atendimento
+    # Remover atendimento e retirá-lo do resumo diário
+    registrar_atendimentos(db, [(atendimento.data_hora, atendimento.status, atendimento.valor_cobrado)], sinal=-1)
     db.delete(atendimento)
     db.commit()
     
     return None
 
 @router.get("/atendimentos/estatisticas/resumo")
-async def obter_estatisticas_atendimentos(db: Session = Depends(get_db)):
+def obter_estatisticas_atendimentos(db: Session = Depends(get_db_leitura)):
     """
     Obtém estatísticas resumidas dos atendimentos
-    """
-    total_atendimentos = db.query(Atendimento).count()
-    atendimentos_hoje = db.query(Atendimento).filter(
-        Atendimento.data_hora >= datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    ).count()
     
-    atendimentos_mes = db.query(Atendimento).filter(
-        Atendimento.data_hora >= datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    ).count()
+    Lê a tabela atendimento_diario (uma linha por dia e status) em uma
+    única consulta, sem varrer a tabela de atendimentos
+    """
+    hoje = datetime.now().date()
+    inicio_mes = hoje.replace(day=1)
     
-    valor_total_mes = db.query(func.sum(Atendimento.valor_cobrado)).filter(
-        Atendimento.data_hora >= datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    ).scalar() or 0.0
+    total_atendimentos, atendimentos_hoje, atendimentos_mes, valor_total_mes = db.query(
+        func.coalesce(func.sum(AtendimentoDiario.quantidade), 0),
+        func.coalesce(func.sum(case((AtendimentoDiario.dia >= hoje, AtendimentoDiario.quantidade), else_=0)), 0),
+        func.coalesce(func.sum(case((AtendimentoDiario.dia >= inicio_mes, AtendimentoDiario.quantidade), else_=0)), 0),
+        func.coalesce(func.sum(case((AtendimentoDiario.dia >= inicio_mes, AtendimentoDiario.valor_total), else_=0.0)), 0.0),
+    ).one()
     
     return {
         "total_atendimentos": total_atendimentos,
@@ -221,7 +590,7 @@ async def obter_estatisticas_atendimentos(db: Session = Depends(get_db)):
     }
 
 @router.get("/procedimentos/{procedimento_id}/materiais-padrao", response_model=List[ProcedimentoMaterialSchema])
-async def obter_materiais_padrao_procedimento(procedimento_id: int, db: Session = Depends(get_db)):
+def obter_materiais_padrao_procedimento(procedimento_id: int, db: Session = Depends(get_db_leitura)):
     """
     Obtém os materiais padrão de um procedimento
     """
@@ -231,7 +600,9 @@ async def obter_materiais_padrao_procedimento(procedimento_id: int, db: Session
         raise HTTPException(status_code=404, detail="Procedimento não encontrado")
     
     # Buscar materiais padrão
-    materiais_padrao = db.query(ProcedimentoMaterialModel).filter(
+    materiais_padrao = db.query(ProcedimentoMaterialModel).options(
+        joinedload(ProcedimentoMaterialModel.material)
+    ).filter(
         ProcedimentoMaterialModel.procedimento_id == procedimento_id
     ).all()
     
@@ -2,25 +2,87 @@
 Router para endpoints de gestão de clientes
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, or_, select, tuple_
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, Iterator, List, Literal, Optional
+import tempfile
 
-from app.database import get_db
-from app.models import Cliente as ClienteModel
+from app.database import SessionLeitura, get_db, get_db_leitura
+from app.models import (
+    Atendimento, AtendimentoProcedimento, Cliente as ClienteModel, Procedimento,
+    ResumoCliente, ResumoClienteProcedimento
+)
+from app.utils.autocomplete_clientes import autocompletar, estatisticas_indice_clientes
+from app.utils.busca_clientes import buscar_por_telefone, pesquisar_clientes
+from app.utils.importacao_clientes import TAMANHO_LOTE_IMPORTACAO, importar_clientes_csv
+from app.utils.paginacao import codificar_cursor, decodificar_cursor
+from app.utils.telefone import MINIMO_DIGITOS_BUSCA, normalizar_telefone
+from app.utils.serializacao import adaptador, codificar_json, resposta_json
 from app.schemas import (
     ClienteCreate, 
     ClienteUpdate, 
     Cliente, 
-    ClienteListResponse
+    ClienteListResponse,
+    ClienteAutocompleteResponse,
+    ClienteHistorico,
+    ImportacaoClientesResumo
 )
 
 # Criar router para clientes
 router = APIRouter()
 
+# Linhas lidas do banco e serializadas por vez na listagem em streaming
+LOTE_STREAMING = 1000
+
+# Colunas do schema Cliente (a listagem não carrega objetos ORM)
+COLUNAS_LISTAGEM = (
+    ClienteModel.id, ClienteModel.nome, ClienteModel.telefone,
+    ClienteModel.email, ClienteModel.observacao, ClienteModel.data_cadastro
+)
+
+def _consulta_listagem(apos: Optional[List]):
+    """Clientes ordenados por (nome, id), depois da posição do cursor"""
+    consulta = select(*COLUNAS_LISTAGEM).order_by(ClienteModel.nome, ClienteModel.id)
+    if apos is not None:
+        # Comparação de tupla: vira um intervalo no índice ix_clientes_nome (nome, rowid)
+        consulta = consulta.where(tuple_(ClienteModel.nome, ClienteModel.id) > tuple_(*apos))
+    return consulta
+
+def _transmitir_clientes(apos: Optional[List], formato: str) -> Iterator[bytes]:
+    """
+    Gera a listagem completa a partir do cursor, em lotes de LOTE_STREAMING
+    
+    As linhas são lidas do cursor do banco conforme são enviadas (yield_per),
+    então a memória fica constante qualquer que seja o número de clientes.
+    A sessão é própria: a da dependência é fechada ao fim do endpoint.
+    """
+    consulta = _consulta_listagem(apos)
+    tipo = adaptador(List[Cliente])
+    primeiro = True
+    if formato == "json":
+        yield b"["
+    with SessionLeitura() as db:
+        # Core direto na conexão: sem o carregamento do ORM por linha
+        resultado = db.connection().execute(consulta.execution_options(yield_per=LOTE_STREAMING))
+        chaves = list(resultado.keys())
+        for linhas in resultado.partitions():
+            itens = tipo.dump_python(tipo.validate_python([dict(zip(chaves, linha)) for linha in linhas]), mode="json")
+            if formato == "ndjson":
+                yield b"".join(codificar_json(item) + b"\n" for item in itens)
+            else:
+                # Remove os colchetes do lote: os lotes formam um único array
+                lote = codificar_json(itens)[1:-1]
+                yield lote if primeiro else b"," + lote
+                primeiro = False
+    if formato == "json":
+        yield b"]"
+
 @router.post("/clientes", response_model=Cliente, status_code=201)
-async def criar_cliente(
+def criar_cliente(
     cliente: ClienteCreate,
     db: Session = Depends(get_db)
 ):
@@ -49,50 +111,159 @@ async def criar_cliente(
     
     return db_cliente
 
-@router.get("/clientes", response_model=ClienteListResponse)
-async def listar_clientes(
+@router.post("/clientes/importar", response_model=ImportacaoClientesResumo)
+async def importar_clientes(
+    request: Request,
+    tamanho_lote: int = Query(TAMANHO_LOTE_IMPORTACAO, ge=1, le=5000, description="Linhas por transação"),
+    encoding: str = Query("utf-8-sig", description="Codificação do arquivo (ex: cp1252 para planilhas antigas do Excel)"),
     db: Session = Depends(get_db)
 ):
     """
-    Listar todos os clientes ordenados por nome
+    Importa clientes de uma planilha CSV enviada no corpo da requisição
     
-    Args:
-        db: Sessão do banco de dados
+    O cabeçalho precisa ter as colunas nome e telefone (email e
+    observacao são opcionais); o separador pode ser vírgula ou ponto e
+    vírgula. Linhas de clientes já cadastrados (mesmo telefone e nome)
+    são contadas como duplicadas e não são inseridas.
     
-    Returns:
-        ClienteListResponse: Lista de clientes e total
+    O corpo é recebido em blocos em um arquivo temporário (em disco acima
+    de 1 MB) e lido linha a linha no threadpool, gravando em lotes de
+    tamanho_lote, cada lote em sua própria transação.
+    
+    Um erro de leitura antes do primeiro lote gravado recusa o arquivo
+    (400). Depois dele a importação é parcial: a resposta é 207 com o
+    resumo do que foi gravado e a linha em que a leitura parou.
     """
-    # Buscar todos os clientes ordenados por nome
-    clientes = db.query(ClienteModel).order_by(ClienteModel.nome).all()
+    arquivo = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    try:
+        async for bloco in request.stream():
+            arquivo.write(bloco)
+        arquivo.seek(0)
+        resumo = await run_in_threadpool(importar_clientes_csv, db, arquivo, tamanho_lote, encoding)
+        return resposta_json(
+            ImportacaoClientesResumo, resumo,
+            status_code=207 if resumo["interrompida"] else 200
+        )
+    finally:
+        arquivo.close()
+
+@router.get("/clientes", response_model=ClienteListResponse)
+def listar_clientes(
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros"),
+    cursor: Optional[str] = Query(None, description="Cursor retornado em next_cursor"),
+    incluir_total: bool = Query(True, description="Calcular o total de registros (COUNT)"),
+    formato: Literal["pagina", "json", "ndjson"] = Query(
+        "pagina", description="pagina: uma página com next_cursor; json/ndjson: todos os clientes em streaming"
+    ),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Listar clientes ordenados por nome
+    
+    A paginação é por cursor: cada página retorna next_cursor, que
+    posiciona a próxima consulta logo após o último registro (nome, id).
+    Com formato=json (um único array) ou formato=ndjson (um cliente por
+    linha) todos os clientes a partir do cursor são enviados em
+    streaming, sem montar a lista em memória; limit e total não se
+    aplicam.
+    """
+    apos = decodificar_cursor(cursor, str, int) if cursor is not None else None
+    if formato != "pagina":
+        return StreamingResponse(
+            _transmitir_clientes(apos, formato),
+            media_type="application/json" if formato == "json" else "application/x-ndjson"
+        )
+    
+    # Contar total (opcional, pois exige varrer o índice inteiro)
+    total = db.scalar(select(func.count()).select_from(ClienteModel)) if incluir_total else None
+    
+    # Buscar um registro a mais para saber se existe próxima página
+    clientes = db.execute(_consulta_listagem(apos).limit(limit + 1)).all()
+    next_cursor = None
+    if len(clientes) > limit:
+        clientes = clientes[:limit]
+        ultimo = clientes[-1]
+        next_cursor = codificar_cursor(ultimo.nome, ultimo.id)
     
-    return ClienteListResponse(
-        clientes=clientes,
-        total=len(clientes)
+    return resposta_json(
+        ClienteListResponse,
+        {"clientes": clientes, "total": total, "next_cursor": next_cursor}
     )
 
 @router.get("/clientes/busca", response_model=ClienteListResponse)
-async def buscar_clientes(
-    termo: str = Query(..., description="Termo de busca (nome ou telefone)"),
-    db: Session = Depends(get_db)
+def buscar_clientes(
+    termo: str = Query(..., description="Termo de busca (nome, telefone, email ou observação)"),
+    skip: int = Query(0, ge=0, description="Número de registros para pular"),
+    limit: int = Query(50, ge=1, le=500, description="Número máximo de registros"),
+    db: Session = Depends(get_db_leitura)
 ):
     """
-    Buscar clientes por nome ou telefone
+    Buscar clientes por nome, telefone, email ou observação
+    
+    Usa o índice de texto completo: ignora acentos e maiúsculas, cada
+    palavra do termo casa com o início de uma palavra do cadastro e os
+    resultados vêm por relevância, paginados. Termos que parecem
+    telefone são buscados como em /clientes/telefone.
+    """
+    clientes, total = pesquisar_clientes(db, termo, skip, limit)
+    return resposta_json(ClienteListResponse, {"clientes": clientes, "total": total})
+
+@router.get("/clientes/autocomplete", response_model=ClienteAutocompleteResponse)
+def autocompletar_clientes(
+    q: str = Query(..., description="Início do nome (de qualquer palavra) ou do telefone"),
+    limit: int = Query(10, ge=1, le=50, description="Número máximo de sugestões"),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Sugestões de clientes enquanto o nome ou telefone é digitado
+    
+    Responde a partir do índice em memória, ignorando acentos e
+    maiúsculas. O termo casa com o início do nome a partir de qualquer
+    palavra ("maria s" e "silva" encontram "Maria Silva") ou do telefone,
+    com ou sem DDD. O banco só é lido para conferir a versão do índice.
     """
-    clientes = db.query(ClienteModel).filter(
-        or_(
-            ClienteModel.nome.ilike(f"%{termo}%"),
-            ClienteModel.telefone.ilike(f"%{termo}%")
+    sugestoes = autocompletar(db, q, limit)
+    return resposta_json(ClienteAutocompleteResponse, {
+        "clientes": [{"id": id_, "nome": nome, "telefone": telefone} for id_, nome, telefone in sugestoes]
+    })
+
+@router.get("/clientes/autocomplete/estatisticas")
+def obter_estatisticas_autocomplete():
+    """
+    Reconstruções, atualizações no commit e tamanho do índice de autocompletar deste processo
+    """
+    return estatisticas_indice_clientes()
+
+@router.get("/clientes/telefone", response_model=ClienteListResponse)
+def buscar_clientes_por_telefone(
+    numero: str = Query(..., description="Número em qualquer formato, completo ou só o final"),
+    skip: int = Query(0, ge=0, description="Número de registros para pular"),
+    limit: int = Query(50, ge=1, le=500, description="Número máximo de registros"),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Buscar clientes pelo telefone (ex: identificação de chamadas)
+    
+    Compara só os dígitos: "+55 11 99999-1111", "11999991111" e
+    "(11) 99999-1111" são o mesmo número. Com o número completo o
+    cliente correspondente vem primeiro; com só o final, vêm todos os
+    telefones terminados nele.
+    
+    Raises:
+        HTTPException: 400 se o número tem menos de MINIMO_DIGITOS_BUSCA dígitos
+    """
+    if len(normalizar_telefone(numero)) < MINIMO_DIGITOS_BUSCA:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Informe pelo menos {MINIMO_DIGITOS_BUSCA} dígitos do telefone"
         )
-    ).order_by(ClienteModel.nome).all()
-    return ClienteListResponse(
-        clientes=clientes,
-        total=len(clientes)
-    )
+    clientes, total = buscar_por_telefone(db, numero, skip, limit)
+    return resposta_json(ClienteListResponse, {"clientes": clientes, "total": total})
 
 @router.get("/clientes/{cliente_id}", response_model=Cliente)
-async def buscar_cliente_por_id(
+def buscar_cliente_por_id(
     cliente_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_leitura)
 ):
     """
     Buscar cliente por ID
@@ -118,8 +289,83 @@ async def buscar_cliente_por_id(
     
     return cliente
 
+@router.get("/clientes/{cliente_id}/historico", response_model=ClienteHistorico)
+def obter_historico_cliente(
+    cliente_id: int,
+    limit: int = Query(20, ge=1, le=100, description="Atendimentos da linha do tempo"),
+    cursor: Optional[str] = Query(None, description="Cursor retornado em next_cursor"),
+    procedimentos: int = Query(5, ge=0, le=50, description="Procedimentos mais frequentes"),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Ficha do cliente: métricas, procedimentos mais frequentes e linha do tempo
+    
+    As métricas (total gasto, número de atendimentos e último atendimento)
+    e a contagem por procedimento vêm do resumo mantido a cada alteração
+    dos atendimentos; a linha do tempo é uma página do índice
+    (cliente_id, data_hora), do mais recente para o mais antigo.
+    
+    Raises:
+        HTTPException: Se cliente não encontrado
+    """
+    # Cliente e resumo pela chave primária (sem resumo: cliente sem atendimentos)
+    encontrado = db.query(ClienteModel, ResumoCliente).outerjoin(
+        ResumoCliente, ResumoCliente.cliente_id == ClienteModel.id
+    ).filter(ClienteModel.id == cliente_id).first()
+    if not encontrado:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Cliente com ID {cliente_id} não encontrado"
+        )
+    cliente, resumo = encontrado
+    
+    frequentes = db.execute(
+        select(ResumoClienteProcedimento.procedimento_id, Procedimento.nome, ResumoClienteProcedimento.quantidade)
+        .join(Procedimento, Procedimento.id == ResumoClienteProcedimento.procedimento_id)
+        .where(ResumoClienteProcedimento.cliente_id == cliente_id, ResumoClienteProcedimento.quantidade > 0)
+        .order_by(ResumoClienteProcedimento.quantidade.desc(), ResumoClienteProcedimento.procedimento_id)
+        .limit(procedimentos)
+    ).all() if procedimentos else []
+    
+    # Linha do tempo na mesma ordem e com o mesmo cursor de /atendimentos
+    consulta = select(Atendimento.id, Atendimento.data_hora, Atendimento.status, Atendimento.valor_cobrado).where(
+        Atendimento.cliente_id == cliente_id
+    ).order_by(Atendimento.data_hora.desc(), Atendimento.id.desc())
+    if cursor is not None:
+        cursor_data_hora, cursor_id = decodificar_cursor(cursor, datetime, int)
+        consulta = consulta.where(or_(
+            Atendimento.data_hora < cursor_data_hora,
+            and_(Atendimento.data_hora == cursor_data_hora, Atendimento.id < cursor_id)
+        ))
+    atendimentos = db.execute(consulta.limit(limit + 1)).all()
+    next_cursor = None
+    if len(atendimentos) > limit:
+        atendimentos = atendimentos[:limit]
+        next_cursor = codificar_cursor(atendimentos[-1].data_hora, atendimentos[-1].id)
+    
+    # Nomes dos procedimentos da página com uma consulta IN
+    nomes: Dict[int, List[str]] = {a.id: [] for a in atendimentos}
+    if nomes:
+        for atendimento_id, nome in db.execute(
+            select(AtendimentoProcedimento.atendimento_id, Procedimento.nome)
+            .join(Procedimento, Procedimento.id == AtendimentoProcedimento.procedimento_id)
+            .where(AtendimentoProcedimento.atendimento_id.in_(nomes.keys()))
+            .order_by(AtendimentoProcedimento.id)
+        ):
+            nomes[atendimento_id].append(nome)
+    
+    return resposta_json(ClienteHistorico, {
+        "cliente": cliente,
+        "total_gasto": resumo.total_gasto if resumo else 0.0,
+        "n_atendimentos": resumo.n_atendimentos if resumo else 0,
+        "ultimo_atendimento": resumo.ultimo_atendimento if resumo else None,
+        "procedimentos_frequentes": frequentes,
+        "atendimentos": [{**a._asdict(), "procedimentos": nomes[a.id]} for a in atendimentos],
+        "next_cursor": next_cursor
+    })
+
 @router.put("/clientes/{cliente_id}", response_model=Cliente)
-async def editar_cliente(
+def editar_cliente(
     cliente_id: int,
     cliente_update: ClienteUpdate,
     db: Session = Depends(get_db)
@@ -160,7 +406,7 @@ async def editar_cliente(
     return db_cliente
 
 @router.delete("/clientes/{cliente_id}", status_code=204)
-async def remover_cliente(
+def remover_cliente(
     cliente_id: int,
     db: Session = Depends(get_db)
 ):
@@ -183,7 +429,9 @@ async def remover_cliente(
             detail=f"Cliente com ID {cliente_id} não encontrado"
         )
     
-    # Remover cliente
+    # Remover cliente e seu resumo
+    db.query(ResumoClienteProcedimento).filter(ResumoClienteProcedimento.cliente_id == cliente_id).delete()
+    db.query(ResumoCliente).filter(ResumoCliente.cliente_id == cliente_id).delete()
     db.delete(db_cliente)
     db.commit()
     
@@ -3,24 +3,36 @@ Rotas para gerenciamento de materiais/estoque
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from typing import AsyncIterator, Dict, List, Literal, Optional
+from datetime import date, datetime, timedelta
+import asyncio
 
-from app.database import get_db
-from app.models import Material
-from app.schemas import MaterialCreate, MaterialUpdate, Material as MaterialSchema, MaterialList
-from app.utils.material_normalizer import encontrar_materiais_similares, normalizar_nome
+from app.database import SessionLeitura, get_db, get_db_leitura
+from app.utils.serializacao import resposta_json
+from app.models import Material, MovimentacaoEstoque
+from app.schemas import (
+    AjusteEstoque, MaterialCreate, MaterialUpdate, Material as MaterialSchema, MaterialList, MovimentacaoEstoqueList
+)
+from app.utils.catalogo_materiais import (
+    LinhaMaterial, buscar_similares, estatisticas_catalogo, material_por_nome, materiais_estoque_baixo
+)
+from app.utils.alertas_estoque import canal_alertas, formatar_evento
+from app.utils.estoque import atualizar_saldos, movimentar_estoque, registrar_movimentacoes, saldo_em
+from app.utils.material_normalizer import normalizar_nome
+from app.utils.valorizacao_estoque import relatorio_valorizacao
 
 router = APIRouter()
 
 @router.get("/materiais", response_model=MaterialList)
-async def listar_materiais(
+def listar_materiais(
     skip: int = Query(0, ge=0, description="Número de registros para pular"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros"),
     ativo: Optional[bool] = Query(None, description="Filtrar por status ativo"),
     estoque_baixo: Optional[bool] = Query(None, description="Filtrar por estoque baixo"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_leitura)
 ):
     """
     Lista todos os materiais
@@ -31,23 +43,26 @@ async def listar_materiais(
         query = query.filter(Material.ativo == ativo)
     
     if estoque_baixo is not None:
+        # Comparar a folga com 0 permite usar o índice ix_materiais_folga_estoque
+        folga = Material.quantidade_disponivel - Material.estoque_minimo
         if estoque_baixo:
-            query = query.filter(Material.quantidade_disponivel <= Material.estoque_minimo)
+            query = query.filter(folga <= 0)
         else:
-            query = query.filter(Material.quantidade_disponivel > Material.estoque_minimo)
+            query = query.filter(folga > 0)
     
     total = query.count()
     materiais = query.offset(skip).limit(limit).all()
     
-    # Converter os objetos do modelo para schemas
-    materiais_schemas = [MaterialSchema.model_validate(material) for material in materiais]
-    
-    return MaterialList(materiais=materiais_schemas, total=total)
+    # Validar e serializar a página uma única vez
+    return resposta_json(MaterialList, {"materiais": materiais, "total": total})
 
 @router.get("/materiais/{material_id}", response_model=MaterialSchema)
-async def obter_material(material_id: int, db: Session = Depends(get_db)):
+def obter_material(material_id: int, db: Session = Depends(get_db_leitura)):
     """
     Obtém um material específico por ID
+    
+    Materiais removidos (inativos) continuam acessíveis, com ativo=false:
+    atendimentos e o livro-razão ainda apontam para eles.
     """
     material = db.query(Material).filter(Material.id == material_id).first()
     if not material:
@@ -56,7 +71,7 @@ async def obter_material(material_id: int, db: Session = Depends(get_db)):
     return material
 
 @router.post("/materiais", response_model=MaterialSchema, status_code=201)
-async def criar_material(material: MaterialCreate, db: Session = Depends(get_db)):
+def criar_material(material: MaterialCreate, db: Session = Depends(get_db)):
     """
     Cria um novo material
     """
@@ -68,13 +83,16 @@ async def criar_material(material: MaterialCreate, db: Session = Depends(get_db)
     return db_material
 
 @router.put("/materiais/{material_id}", response_model=MaterialSchema)
-async def atualizar_material(
+def atualizar_material(
     material_id: int, 
     material_update: MaterialUpdate, 
     db: Session = Depends(get_db)
 ):
     """
     Atualiza um material existente
+    
+    Também vale para materiais removidos (inativos): enviar ativo=true
+    reativa o material.
     """
     db_material = db.query(Material).filter(Material.id == material_id).first()
     if not db_material:
@@ -90,21 +108,28 @@ async def atualizar_material(
     return db_material
 
 @router.delete("/materiais/{material_id}", status_code=204)
-async def remover_material(material_id: int, db: Session = Depends(get_db)):
+def remover_material(material_id: int, db: Session = Depends(get_db)):
     """
     Remove um material
+
+    O material é desativado, não apagado: movimentações, snapshots, consumo
+    diário e atendimentos continuam apontando para o id, que não pode ser
+    reaproveitado por outro material. Ele sai das listagens com ativo=true,
+    do estoque baixo e da busca por similares; GET e PUT por id continuam
+    respondendo (o PUT com ativo=true o reativa). Remover de novo um
+    material inativo não muda nada.
     """
     material = db.query(Material).filter(Material.id == material_id).first()
     if not material:
         raise HTTPException(status_code=404, detail="Material não encontrado")
     
-    db.delete(material)
+    material.ativo = False
     db.commit()
     
     return None
 
 @router.post("/materiais/{material_id}/ajustar-estoque")
-async def ajustar_estoque(
+def ajustar_estoque(
     material_id: int,
     quantidade: float,
     tipo: str = Query(..., regex="^(entrada|saida)$", description="Tipo de ajuste: entrada ou saida"),
@@ -112,76 +137,234 @@ async def ajustar_estoque(
 ):
     """
     Ajusta o estoque de um material (entrada ou saída)
+    
+    Materiais inativos (removidos) não aceitam ajustes: 400.
     """
     material = db.query(Material).filter(Material.id == material_id).first()
     if not material:
         raise HTTPException(status_code=404, detail="Material não encontrado")
+    if not material.ativo:
+        raise HTTPException(status_code=400, detail="Material inativo não aceita ajuste de estoque")
     
+    # UPDATE atômico + lançamento no livro-razão: ajustes simultâneos não se perdem
     if tipo == "entrada":
-        material.quantidade_disponivel = material.quantidade_disponivel + quantidade
-    elif tipo == "saida":
-        if material.quantidade_disponivel < quantidade:
+        saldo = movimentar_estoque(db, material_id, quantidade, "entrada")
+    else:
+        saldo = movimentar_estoque(db, material_id, -quantidade, "saida", exigir_saldo=True)
+        if saldo is None:
+            db.rollback()
+            disponivel = db.query(Material.quantidade_disponivel).filter(Material.id == material_id).scalar()
             raise HTTPException(
                 status_code=400, 
-                detail=f"Estoque insuficiente. Disponível: {material.quantidade_disponivel}"
+                detail=f"Estoque insuficiente. Disponível: {disponivel}"
             )
-        material.quantidade_disponivel -= quantidade
     
     db.commit()
-    db.refresh(material)
     
     return {
-        "message": f"Estoque ajustado com sucesso. Nova quantidade: {material.quantidade_disponivel}",
-        "quantidade_atual": material.quantidade_disponivel
+        "message": f"Estoque ajustado com sucesso. Nova quantidade: {saldo}",
+        "quantidade_atual": saldo
+    }
+
+MAX_AJUSTES_LOTE = 1000
+
+@router.post("/materiais/ajustar-estoque/lote")
+def ajustar_estoque_lote(ajustes: List[AjusteEstoque], db: Session = Depends(get_db)):
+    """
+    Ajusta o estoque de vários materiais em uma única transação (tudo ou nada)
+    
+    Ajustes do mesmo material são somados e a saída é validada pelo saldo
+    final de cada material. Materiais inativos recusam o lote inteiro.
+    """
+    if not 1 <= len(ajustes) <= MAX_AJUSTES_LOTE:
+        raise HTTPException(status_code=400, detail=f"O lote deve ter de 1 a {MAX_AJUSTES_LOTE} ajustes")
+    
+    movimentacoes = [
+        {
+            "material_id": ajuste.material_id,
+            "quantidade": ajuste.quantidade if ajuste.tipo == "entrada" else -ajuste.quantidade,
+            "tipo": ajuste.tipo
+        }
+        for ajuste in ajustes
+    ]
+    variacoes: Dict[int, float] = {}
+    for movimentacao in movimentacoes:
+        variacoes[movimentacao["material_id"]] = variacoes.get(movimentacao["material_id"], 0.0) + movimentacao["quantidade"]
+    
+    # Validação do lote inteiro com uma única consulta IN
+    linhas = db.query(Material.id, Material.quantidade_disponivel, Material.ativo).filter(Material.id.in_(variacoes)).all()
+    disponiveis = {material_id: quantidade for material_id, quantidade, _ in linhas}
+    inexistentes = sorted(set(variacoes) - set(disponiveis))
+    if inexistentes:
+        raise HTTPException(status_code=404, detail=f"Materiais não encontrados: {inexistentes}")
+    inativos = sorted(material_id for material_id, _, ativo in linhas if not ativo)
+    if inativos:
+        raise HTTPException(status_code=400, detail=f"Materiais inativos: {inativos}")
+    insuficientes = sorted(m for m, variacao in variacoes.items() if variacao < 0 and disponiveis[m] + variacao < 0)
+    if insuficientes:
+        raise HTTPException(status_code=400, detail=f"Estoque insuficiente para os materiais ID {insuficientes}")
+    
+    # Um UPDATE para todos os materiais; a guarda de saldo é reavaliada pelo banco
+    saldos = atualizar_saldos(db, variacoes)
+    if len(saldos) != len(variacoes):
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Estoque insuficiente para os materiais ID {sorted(set(variacoes) - set(saldos))}"
+        )
+    registrar_movimentacoes(db, movimentacoes)
+    db.commit()
+    
+    return {
+        "message": f"{len(ajustes)} ajustes aplicados",
+        "saldos": [{"material_id": m, "quantidade_atual": saldos[m]} for m in sorted(saldos)]
     }
 
+@router.get("/materiais/{material_id}/movimentacoes", response_model=MovimentacaoEstoqueList)
+def listar_movimentacoes(
+    material_id: int,
+    skip: int = Query(0, ge=0, description="Número de registros para pular"),
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros"),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Lista as movimentações de estoque de um material, da mais recente à mais antiga
+    """
+    query = db.query(MovimentacaoEstoque).filter(MovimentacaoEstoque.material_id == material_id)
+    total = query.count()
+    movimentacoes = query.order_by(MovimentacaoEstoque.id.desc()).offset(skip).limit(limit).all()
+    
+    return resposta_json(MovimentacaoEstoqueList, {"movimentacoes": movimentacoes, "total": total})
+
+@router.get("/materiais/{material_id}/saldo")
+def obter_saldo(
+    material_id: int,
+    data: Optional[datetime] = Query(None, description="Saldo nesta data/hora (padrão: atual)"),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Saldo de um material pelo livro-razão: último snapshot mais as movimentações seguintes
+    """
+    if not db.query(Material.id).filter(Material.id == material_id).first():
+        raise HTTPException(status_code=404, detail="Material não encontrado")
+    
+    return {"material_id": material_id, "data": data, "saldo": saldo_em(db, material_id, data)}
+
 @router.get("/materiais/estoque/baixo")
-async def listar_estoque_baixo(db: Session = Depends(get_db)):
+def listar_estoque_baixo(db: Session = Depends(get_db_leitura)):
     """
     Lista materiais com estoque baixo
     """
-    materiais = db.query(Material).filter(
-        Material.quantidade_disponivel <= Material.estoque_minimo,
-        Material.ativo == True
-    ).all()
-    
-    materiais_schemas = [MaterialSchema.model_validate(m) for m in materiais]
+    # Servido pelo cache do catálogo, em ordem de id
+    materiais_schemas = [MaterialSchema.model_validate(m) for m in materiais_estoque_baixo(db)]
     
     return {
         "materiais": materiais_schemas,
         "total": len(materiais_schemas)
     }
 
+# Período padrão do consumo no relatório de valorização
+DIAS_CONSUMO_PADRAO = 30
+
+@router.get("/materiais/relatorios/valorizacao")
+def obter_relatorio_valorizacao(
+    data_inicio: Optional[date] = Query(None, description="Início do período de consumo (padrão: 30 dias até data_fim)"),
+    data_fim: Optional[date] = Query(None, description="Fim do período de consumo (padrão: hoje)"),
+    ordenar_por: Literal["valor_estoque", "valor_consumido", "giro", "dias_cobertura"] = Query("valor_estoque"),
+    limit: int = Query(100, ge=1, le=10000, description="Materiais na lista (os totais consideram todos)"),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Valorização do estoque, consumo no período, giro e dias de cobertura
+    por material e por unidade
+    """
+    data_fim = data_fim or date.today()
+    data_inicio = data_inicio or data_fim - timedelta(days=DIAS_CONSUMO_PADRAO - 1)
+    if data_inicio > data_fim:
+        raise HTTPException(status_code=400, detail="data_inicio deve ser anterior ou igual a data_fim")
+    
+    return relatorio_valorizacao(db, data_inicio, data_fim, ordenar_por, limit)
+
+# Comentário SSE periódico: mantém proxies abertos e detecta conexões encerradas
+INTERVALO_HEARTBEAT = 15.0
+
+def _estoque_baixo_atual() -> dict:
+    with SessionLeitura() as db:
+        materiais = [MaterialSchema.model_validate(m).model_dump(mode="json") for m in materiais_estoque_baixo(db)]
+    return {"materiais": materiais, "total": len(materiais)}
+
+async def _transmitir_alertas(fila: asyncio.Queue, estado_inicial: dict) -> AsyncIterator[str]:
+    try:
+        yield formatar_evento("estoque_baixo_atual", estado_inicial)
+        while True:
+            try:
+                alerta = await asyncio.wait_for(fila.get(), INTERVALO_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            yield formatar_evento(alerta["tipo"], alerta)
+    finally:
+        canal_alertas.cancelar(fila)
+
+@router.get("/materiais/estoque/alertas")
+async def transmitir_alertas_estoque():
+    """
+    Server-sent events de estoque baixo
+    
+    Envia a lista atual (estoque_baixo_atual) e depois um evento
+    estoque_baixo ou estoque_normalizado sempre que um material cruza o
+    estoque mínimo, em vez de o frontend consultar /materiais/estoque/baixo
+    periodicamente.
+    """
+    # Assina antes de ler o estado inicial, para não perder alertas no intervalo
+    fila = canal_alertas.assinar()
+    try:
+        estado_inicial = await run_in_threadpool(_estoque_baixo_atual)
+    except Exception:
+        canal_alertas.cancelar(fila)
+        raise
+    return StreamingResponse(
+        _transmitir_alertas(fila, estado_inicial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/materiais/cache/estatisticas")
+def obter_estatisticas_cache():
+    """
+    Estatísticas do cache do catálogo de materiais neste processo
+    """
+    return estatisticas_catalogo()
+
+def _material_dict(m: LinhaMaterial) -> dict:
+    """Campos do material no formato das respostas de busca por similaridade"""
+    return {
+        'id': m.id,
+        'nome': m.nome,
+        'descricao': m.descricao,
+        'quantidade_disponivel': m.quantidade_disponivel,
+        'unidade': m.unidade,
+        'valor_unitario': m.valor_unitario,
+        'estoque_minimo': m.estoque_minimo,
+        'ativo': m.ativo
+    }
+
 @router.get("/materiais/buscar/similares")
-async def buscar_materiais_similares(
+def buscar_materiais_similares(
     nome: str = Query(..., description="Nome do material para buscar similares"),
     threshold: float = Query(0.8, ge=0.0, le=1.0, description="Limite de similaridade"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_leitura)
 ):
     """
     Busca materiais similares ao nome fornecido
     """
-    # Buscar todos os materiais ativos
-    materiais = db.query(Material).filter(Material.ativo == True).all()
-    
-    # Converter para dicionários
-    materiais_dict = [
-        {
-            'id': m.id,
-            'nome': m.nome,
-            'descricao': m.descricao,
-            'quantidade_disponivel': m.quantidade_disponivel,
-            'unidade': m.unidade,
-            'valor_unitario': m.valor_unitario,
-            'estoque_minimo': m.estoque_minimo,
-            'ativo': m.ativo
-        }
-        for m in materiais
+    # Cache do catálogo: mesmo resultado de encontrar_materiais_similares sem varrer a tabela
+    encontrados = buscar_similares(db, normalizar_nome(nome), threshold) if nome else []
+    similares = [
+        {**_material_dict(material), 'similaridade': similaridade}
+        for material, similaridade in encontrados
     ]
     
-    # Encontrar similares
-    similares = encontrar_materiais_similares(nome, materiais_dict, threshold)
-    
     return {
         "nome_buscado": nome,
         "threshold": threshold,
@@ -190,7 +373,7 @@ async def buscar_materiais_similares(
     }
 
 @router.post("/materiais/criar-ou-buscar", response_model=MaterialSchema)
-async def criar_ou_buscar_material(
+def criar_ou_buscar_material(
     nome: str = Query(..., description="Nome do material"),
     descricao: Optional[str] = Query(None, description="Descrição do material"),
     quantidade_disponivel: float = Query(0.0, ge=0.0, description="Quantidade a somar"),
@@ -202,30 +385,18 @@ async def criar_ou_buscar_material(
     """
     Cria um novo material ou soma a quantidade ao material similar existente
     """
-    materiais = db.query(Material).filter(Material.ativo == True).all()
-    materiais_dict = [
-        {
-            'id': m.id,
-            'nome': m.nome,
-            'descricao': m.descricao,
-            'quantidade_disponivel': m.quantidade_disponivel,
-            'unidade': m.unidade,
-            'valor_unitario': m.valor_unitario,
-            'estoque_minimo': m.estoque_minimo,
-            'ativo': m.ativo
-        }
-        for m in materiais
-    ]
-    similares = encontrar_materiais_similares(nome, materiais_dict, threshold=0.9)
-    if similares:
+    nome_norm = normalizar_nome(nome)
+    
+    # Nome igual após a normalização e depois o mais similar, ambos pelo cache do catálogo
+    encontrado = material_por_nome(db, nome_norm) if nome_norm else None
+    if encontrado is None and nome:
+        similares = buscar_similares(db, nome_norm, threshold=0.9)
+        encontrado = similares[0][0] if similares else None
+    if encontrado is not None:
         # Se encontrou material muito similar, apenas soma a quantidade ao estoque
-        material_similar = similares[0]
-        db_material = db.query(Material).filter(Material.id == material_similar['id']).first()
-        if db_material:
-            db_material.quantidade_disponivel += quantidade_disponivel
+        if movimentar_estoque(db, encontrado.id, quantidade_disponivel, "entrada") is not None:
             db.commit()
-            db.refresh(db_material)
-            return MaterialSchema.model_validate(db_material)
+            return MaterialSchema.model_validate(db.get(Material, encontrado.id))
     # Se não encontrou similar, criar novo material
     novo_material = Material(
         nome=nome,
@@ -3,10 +3,11 @@ Rotas para gerenciamento de procedimentos
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_db, get_db_leitura
+from app.utils.serializacao import resposta_json
 from app.models import Procedimento, ProcedimentoMaterial, Material
 from app.schemas import (
     ProcedimentoCreate, ProcedimentoUpdate, Procedimento as ProcedimentoSchema, 
@@ -15,8 +16,20 @@ from app.schemas import (
 
 router = APIRouter()
 
+# Plano de carregamento do grafo serializado pelo schema Procedimento
+# (materiais_padrao[].material), com um SELECT ... IN por coleção
+CARREGAMENTO_PROCEDIMENTO = (
+    selectinload(Procedimento.materiais_padrao).joinedload(ProcedimentoMaterial.material),
+)
+
+def _carregar_procedimento(db: Session, procedimento_id: int) -> Optional[Procedimento]:
+    """Busca um procedimento com os materiais padrão já carregados"""
+    return db.query(Procedimento).options(*CARREGAMENTO_PROCEDIMENTO).filter(
+        Procedimento.id == procedimento_id
+    ).first()
+
 @router.get("/procedimentos/teste")
-async def teste_procedimentos(db: Session = Depends(get_db)):
+def teste_procedimentos(db: Session = Depends(get_db_leitura)):
     """
     Endpoint de teste para verificar se o problema é específico
     """
@@ -27,66 +40,39 @@ async def teste_procedimentos(db: Session = Depends(get_db)):
         return {"error": str(e)}
 
 @router.get("/procedimentos", response_model=ProcedimentoList)
-async def listar_procedimentos(
+def listar_procedimentos(
     skip: int = Query(0, ge=0, description="Número de registros para pular"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros"),
     ativo: Optional[bool] = Query(None, description="Filtrar por status ativo"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_leitura)
 ):
     """
     Lista todos os procedimentos
     """
-    try:
-        query = db.query(Procedimento)
-        
-        if ativo is not None:
-            query = query.filter(Procedimento.ativo == ativo)
-        
-        total = query.count()
-        procedimentos = query.offset(skip).limit(limit).all()
-        
-        # Converter para schemas - VERSÃO SIMPLIFICADA
-        procedimentos_schemas = []
-        for p in procedimentos:
-            try:
-                # Usar conversão automática do Pydantic
-                p_schema = ProcedimentoSchema.model_validate(p)
-                procedimentos_schemas.append(p_schema)
-            except Exception as e:
-                print(f"⚠️  Erro ao converter procedimento {p.id}: {e}")
-                # Fallback: criar schema básico
-                p_schema = ProcedimentoSchema(
-                    id=p.id,
-                    nome=p.nome,
-                    descricao=p.descricao,
-                    valor_padrao=p.valor_padrao,
-                    ativo=p.ativo,
-                    data_cadastro=p.data_cadastro,
-                    materiais_padrao=[]
-                )
-                procedimentos_schemas.append(p_schema)
-        
-        return ProcedimentoList(procedimentos=procedimentos_schemas, total=total)
-        
-    except Exception as e:
-        print(f"❌ Erro ao listar procedimentos: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+    query = db.query(Procedimento).options(*CARREGAMENTO_PROCEDIMENTO)
+    
+    if ativo is not None:
+        query = query.filter(Procedimento.ativo == ativo)
+    
+    total = query.count()
+    procedimentos = query.offset(skip).limit(limit).all()
+    
+    # Validar e serializar a página uma única vez
+    return resposta_json(ProcedimentoList, {"procedimentos": procedimentos, "total": total})
 
 @router.get("/procedimentos/{procedimento_id}", response_model=ProcedimentoSchema)
-async def obter_procedimento(procedimento_id: int, db: Session = Depends(get_db)):
+def obter_procedimento(procedimento_id: int, db: Session = Depends(get_db_leitura)):
     """
     Obtém um procedimento específico por ID
     """
-    procedimento = db.query(Procedimento).filter(Procedimento.id == procedimento_id).first()
+    procedimento = _carregar_procedimento(db, procedimento_id)
     if not procedimento:
         raise HTTPException(status_code=404, detail="Procedimento não encontrado")
     
     return ProcedimentoSchema.model_validate(procedimento)
 
 @router.post("/procedimentos", response_model=ProcedimentoSchema, status_code=201)
-async def criar_procedimento(procedimento: ProcedimentoCreate, db: Session = Depends(get_db)):
+def criar_procedimento(procedimento: ProcedimentoCreate, db: Session = Depends(get_db)):
     """
     Cria um novo procedimento
     """
@@ -117,10 +103,9 @@ async def criar_procedimento(procedimento: ProcedimentoCreate, db: Session = Dep
             db.add(db_material)
         
         db.commit()
-        db.refresh(db_procedimento)
         
         print(f"✅ Procedimento finalizado: {db_procedimento.id}")
-        return ProcedimentoSchema.model_validate(db_procedimento)
+        return ProcedimentoSchema.model_validate(_carregar_procedimento(db, db_procedimento.id))
         
     except Exception as e:
         print(f"❌ Erro ao criar procedimento: {e}")
@@ -129,7 +114,7 @@ async def criar_procedimento(procedimento: ProcedimentoCreate, db: Session = Dep
         raise
 
 @router.put("/procedimentos/{procedimento_id}", response_model=ProcedimentoSchema)
-async def atualizar_procedimento(
+def atualizar_procedimento(
     procedimento_id: int, 
     procedimento_update: ProcedimentoUpdate, 
     db: Session = Depends(get_db)
@@ -165,12 +150,11 @@ async def atualizar_procedimento(
             db.add(db_material)
     
     db.commit()
-    db.refresh(db_procedimento)
     
-    return ProcedimentoSchema.model_validate(db_procedimento)
+    return ProcedimentoSchema.model_validate(_carregar_procedimento(db, procedimento_id))
 
 @router.delete("/procedimentos/{procedimento_id}", status_code=204)
-async def remover_procedimento(procedimento_id: int, db: Session = Depends(get_db)):
+def remover_procedimento(procedimento_id: int, db: Session = Depends(get_db)):
     """
     Remove um procedimento
     """
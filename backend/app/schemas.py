@@ -2,8 +2,8 @@
 Schemas Pydantic para validação de dados
 """
 
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Sequence, TYPE_CHECKING
+from pydantic import BaseModel, EmailStr, Field
+from typing import Literal, Optional, List, Sequence, TYPE_CHECKING
 from datetime import datetime
 
 # Schemas para Clientes
@@ -44,7 +44,64 @@ class ClienteListResponse(BaseModel):
     Schema para resposta de lista de clientes
     """
     clientes: Sequence[Cliente]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class ClienteSugestao(BaseModel):
+    id: int
+    nome: str
+    telefone: str
+
+class ClienteAutocompleteResponse(BaseModel):
+    """
+    Schema para resposta do autocompletar de clientes
+    """
+    clientes: List[ClienteSugestao]
+
+class ErroImportacao(BaseModel):
+    linha: int
+    erro: str
+
+class ImportacaoClientesResumo(BaseModel):
+    """
+    Schema para o resumo da importação de clientes (erros: primeiras linhas inválidas)
+
+    interrompida: linha em que a leitura parou por um erro no arquivo,
+    depois de lotes já gravados (importação parcial)
+    """
+    linhas: int
+    inseridos: int
+    duplicados: int
+    invalidos: int
+    erros: List[ErroImportacao] = []
+    interrompida: Optional[ErroImportacao] = None
+
+class ProcedimentoFrequente(BaseModel):
+    procedimento_id: int
+    nome: str
+    quantidade: int
+
+class AtendimentoHistorico(BaseModel):
+    id: int
+    data_hora: datetime
+    status: Optional[str] = None
+    valor_cobrado: float
+    procedimentos: List[str] = []
+
+class ClienteHistorico(BaseModel):
+    """
+    Schema para o histórico do cliente (ficha)
+
+    As métricas não contam atendimentos cancelados; next_cursor continua
+    a linha do tempo em /clientes/{id}/historico ou em /atendimentos?cliente_id=
+    """
+    cliente: Cliente
+    total_gasto: float = 0.0
+    n_atendimentos: int = 0
+    ultimo_atendimento: Optional[datetime] = None
+    procedimentos_frequentes: List[ProcedimentoFrequente] = []
+    atendimentos: List[AtendimentoHistorico] = []
+    next_cursor: Optional[str] = None
 
 class ErrorResponse(BaseModel):
     """
@@ -128,6 +185,26 @@ class MaterialList(BaseModel):
     materiais: List[Material]
     total: int
 
+class AjusteEstoque(BaseModel):
+    material_id: int
+    quantidade: float = Field(gt=0)
+    tipo: Literal["entrada", "saida"]
+
+class MovimentacaoEstoque(BaseModel):
+    id: int
+    material_id: int
+    quantidade: float
+    tipo: str
+    atendimento_id: Optional[int] = None
+    data_hora: datetime
+    
+    class Config:
+        from_attributes = True
+
+class MovimentacaoEstoqueList(BaseModel):
+    movimentacoes: List[MovimentacaoEstoque]
+    total: int
+
 # Schemas para Atendimentos
 class AtendimentoProcedimentoBase(BaseModel):
     procedimento_id: int
@@ -189,7 +266,8 @@ class Atendimento(AtendimentoBase):
 
 class AtendimentoList(BaseModel):
     atendimentos: List[Atendimento]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 # Schemas para filtros
 class AtendimentoFiltro(BaseModel):
@@ -0,0 +1,146 @@
+"""
+Agrupamento de materiais similares em catálogos grandes
+
+Em vez de comparar todos os pares de materiais, cada nome normalizado
+distinto consulta o IndiceNgramas de todos os nomes e só os candidatos
+devolvidos (no máximo MAXIMO_CANDIDATOS, os que compartilham mais
+palavras) são pontuados com o SequenceMatcher. Os pares com similaridade
+>= threshold são unidos em uma union-find: cada grupo é uma componente
+conexa, então A ~ B e B ~ C colocam A, B e C no mesmo grupo.
+
+O trabalho por nome é limitado, então o agrupamento é aproximado: todo par
+de um grupo foi ligado por nomes com similaridade >= threshold, mas nomes
+parecidos que não aparecem nos candidatos um do outro podem ficar em grupos
+separados. O resultado não depende da ordem nem do pool: no processo atual
+pares já ligados pela union-find não são pontuados, e a busca e a pontuação
+também podem ser distribuídas em um pool de processos, cada um com o
+próprio índice construído a partir da lista de nomes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.indice_materiais import MAXIMO_CANDIDATOS, IndiceNgramas
+from app.utils.material_normalizer import normalizar_nomes, similaridade_normalizada
+
+TAMANHO_BLOCO = 500
+
+class UniaoBusca:
+    """Union-find com compressão de caminho e união por tamanho"""
+
+    def __init__(self, tamanho: int):
+        self.pai = list(range(tamanho))
+        self.tamanho = [1] * tamanho
+
+    def encontrar(self, x: int) -> int:
+        raiz = x
+        while self.pai[raiz] != raiz:
+            raiz = self.pai[raiz]
+        while self.pai[x] != raiz:
+            self.pai[x], x = raiz, self.pai[x]
+        return raiz
+
+    def unir(self, a: int, b: int) -> None:
+        a, b = self.encontrar(a), self.encontrar(b)
+        if a == b:
+            return
+        if self.tamanho[a] < self.tamanho[b]:
+            a, b = b, a
+        self.pai[b] = a
+        self.tamanho[a] += self.tamanho[b]
+
+class _Comparador:
+    """Índice completo dos nomes distintos"""
+
+    def __init__(self, nomes: List[str]):
+        self.nomes = nomes
+        self.posicao = {nome: i for i, nome in enumerate(nomes)}
+        self.indice = IndiceNgramas((i, nome, True) for i, nome in enumerate(nomes))
+
+    def vizinhos(self, i: int, threshold: float) -> List[int]:
+        """Posições dos candidatos do nome i, sem ele mesmo"""
+        nome = self.nomes[i]
+        # O próprio nome vem primeiro e não conta no limite
+        candidatos = self.indice.candidatos(nome, threshold, MAXIMO_CANDIDATOS + 1)
+        return [self.posicao[candidato] for candidato in candidatos if candidato != nome]
+
+    def pares(self, inicio: int, fim: int, threshold: float) -> List[Tuple[int, int]]:
+        """Pares (i, j), i em [inicio, fim), com j candidato de i e similaridade >= threshold"""
+        pares = []
+        for i in range(inicio, fim):
+            for j in self.vizinhos(i, threshold):
+                if similaridade_normalizada(self.nomes[j], self.nomes[i]) >= threshold:
+                    pares.append((i, j))
+        return pares
+
+_comparador_processo: Optional[_Comparador] = None
+
+def _iniciar_processo(nomes: List[str]) -> None:
+    global _comparador_processo
+    _comparador_processo = _Comparador(nomes)
+
+def _pares_no_processo(inicio: int, fim: int, threshold: float) -> List[Tuple[int, int]]:
+    return _comparador_processo.pares(inicio, fim, threshold)
+
+def _unir_no_processo_atual(nomes: List[str], threshold: float, uniao: UniaoBusca) -> None:
+    """Mesmos pares do pool; os que já estão no mesmo grupo não precisam ser pontuados"""
+    comparador = _Comparador(nomes)
+    for i, nome in enumerate(nomes):
+        for j in comparador.vizinhos(i, threshold):
+            if uniao.encontrar(j) != uniao.encontrar(i) and similaridade_normalizada(nomes[j], nome) >= threshold:
+                uniao.unir(j, i)
+
+def agrupar_indices(nomes: List[str], threshold: float = 0.8, processos: Optional[int] = None) -> List[List[int]]:
+    """
+    Agrupa nomes de materiais similares
+
+    Args:
+        nomes: Nomes (não normalizados) na ordem do catálogo; nomes vazios
+            nunca são agrupados, como em calcular_similaridade
+        threshold: Similaridade mínima entre dois nomes do mesmo grupo
+        processos: Tamanho do pool de processos; None ou 1 pontua no processo atual
+
+    Returns:
+        Grupos de posições em `nomes`, cada grupo em ordem crescente e os
+        grupos ordenados pela primeira posição
+    """
+    if threshold <= 0:
+        return [list(range(len(nomes)))] if nomes else []
+
+    # Nomes normalizados iguais têm similaridade 1.0: são comparados uma vez só
+    distintos: Dict[str, int] = {}
+    distinto_de: List[Optional[int]] = []
+    for nome, nome_norm in zip(nomes, normalizar_nomes(nomes)):
+        if not nome:
+            distinto_de.append(None)
+            continue
+        distinto_de.append(distintos.setdefault(nome_norm, len(distintos)))
+    lista_distintos = list(distintos)
+
+    uniao = UniaoBusca(len(lista_distintos))
+    # Com threshold acima de 1.0 nem nomes iguais são agrupados
+    if lista_distintos and threshold <= 1.0:
+        if processos and processos > 1:
+            blocos = [
+                (inicio, min(inicio + TAMANHO_BLOCO, len(lista_distintos)), threshold)
+                for inicio in range(0, len(lista_distintos), TAMANHO_BLOCO)
+            ]
+            with ProcessPoolExecutor(
+                max_workers=processos, initializer=_iniciar_processo, initargs=(lista_distintos,)
+            ) as executor:
+                for pares in executor.map(_pares_no_processo, *zip(*blocos)):
+                    for i, j in pares:
+                        uniao.unir(i, j)
+        else:
+            _unir_no_processo_atual(lista_distintos, threshold, uniao)
+
+    grupos: Dict[object, List[int]] = {}
+    for posicao, distinto in enumerate(distinto_de):
+        if distinto is None:
+            chave = ("sem_nome", posicao)
+        elif threshold > 1.0:
+            chave = ("sozinho", posicao)
+        else:
+            chave = uniao.encontrar(distinto)
+        grupos.setdefault(chave, []).append(posicao)
+    return list(grupos.values())
@@ -0,0 +1,110 @@
+"""
+Alertas de estoque baixo transmitidos por server-sent events
+
+Quando uma variação de estoque faz um material cruzar o estoque mínimo
+(quantidade_disponivel - estoque_minimo passa a ser <= 0, ou deixa de
+ser), o alerta é guardado na sessão e publicado no commit para todos os
+assinantes de GET /materiais/estoque/alertas. Rollback descarta os
+alertas da transação. Materiais inativos não geram alertas, como não
+aparecem na listagem de estoque baixo.
+
+O canal é por processo: cada conexão SSE recebe os alertas das escritas
+feitas pelo mesmo processo do servidor.
+"""
+
+import asyncio
+import json
+from threading import Lock
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+TAMANHO_FILA = 100
+
+def estoque_baixo(quantidade: float, estoque_minimo: float) -> bool:
+    """Mesmo critério da listagem de estoque baixo"""
+    return quantidade - estoque_minimo <= 0
+
+class CanalAlertas:
+    """Distribui alertas para as filas asyncio das conexões abertas"""
+
+    def __init__(self, tamanho_fila: int = TAMANHO_FILA):
+        self.tamanho_fila = tamanho_fila
+        self._assinantes: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._lock = Lock()
+
+    def assinar(self) -> asyncio.Queue:
+        """Cria a fila de uma conexão; chamar dentro do event loop que vai consumi-la"""
+        fila = asyncio.Queue(self.tamanho_fila)
+        with self._lock:
+            self._assinantes[fila] = asyncio.get_running_loop()
+        return fila
+
+    def cancelar(self, fila: asyncio.Queue) -> None:
+        with self._lock:
+            self._assinantes.pop(fila, None)
+
+    def publicar(self, alertas: List[dict]) -> None:
+        """Entrega os alertas a todas as filas; pode ser chamado de qualquer thread"""
+        with self._lock:
+            assinantes = list(self._assinantes.items())
+        for fila, loop in assinantes:
+            try:
+                loop.call_soon_threadsafe(_enfileirar, fila, alertas)
+            except RuntimeError:
+                # Event loop já encerrado
+                self.cancelar(fila)
+
+def _enfileirar(fila: asyncio.Queue, alertas: List[dict]) -> None:
+    for alerta in alertas:
+        # Conexão que não consome a fila perde os alertas mais antigos
+        if fila.full():
+            fila.get_nowait()
+        fila.put_nowait(alerta)
+
+canal_alertas = CanalAlertas()
+
+def formatar_evento(tipo: str, dados: dict) -> str:
+    """Mensagem no formato text/event-stream"""
+    return f"event: {tipo}\ndata: {json.dumps(dados, default=str, ensure_ascii=False)}\n\n"
+
+def verificar_cruzamento(
+    session: Session,
+    material: Tuple[int, str],
+    anterior: Tuple[float, float],
+    atual: Tuple[float, float],
+    ativo: bool = True
+) -> None:
+    """
+    Guarda um alerta se o material entrou ou saiu do estoque baixo
+
+    Args:
+        material: (id, nome)
+        anterior: (quantidade, estoque_minimo) antes da alteração
+        atual: (quantidade, estoque_minimo) depois da alteração
+        ativo: Material ativo depois da alteração; inativos não geram alerta
+    """
+    if not ativo:
+        return
+    baixo_antes, baixo_agora = estoque_baixo(*anterior), estoque_baixo(*atual)
+    if baixo_antes == baixo_agora:
+        return
+    material_id, nome = material
+    session.info.setdefault("alertas_estoque", []).append({
+        "tipo": "estoque_baixo" if baixo_agora else "estoque_normalizado",
+        "material_id": material_id,
+        "nome": nome,
+        "quantidade_disponivel": atual[0],
+        "estoque_minimo": atual[1],
+    })
+
+@event.listens_for(Session, "after_commit")
+def _publicar_alertas(session):
+    alertas = session.info.pop("alertas_estoque", None)
+    if alertas:
+        canal_alertas.publicar(alertas)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_alertas(session, previous_transaction):
+    session.info.pop("alertas_estoque", None)
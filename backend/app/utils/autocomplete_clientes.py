@@ -0,0 +1,231 @@
+"""
+Índice em memória para o autocompletar de clientes
+
+Cada processo guarda um array ordenado de chaves (nome sem acentos a
+partir de cada palavra e dígitos do telefone, com e sem DDD) com o id do
+cliente. A busca por prefixo é uma busca binária seguida da leitura das
+chaves seguintes até completar o limite, sem consultar o banco além da
+versão do índice.
+
+Coerência entre processos: o mesmo mecanismo do catálogo de materiais
+(app.utils.catalogo_materiais), com a versão em indice_clientes_versao.
+Escritas do ORM em clientes incrementam a versão no after_flush e são
+aplicadas ao índice deste processo no commit; inserções em lote pelo Core
+chamam registrar_clientes_em_massa. Escritas por SQL direto precisam
+incrementar a versão ou chamar invalidar_indice_clientes().
+"""
+
+import time
+from bisect import bisect_left, bisect_right
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import Cliente, IndiceClientesVersao
+from app.utils.material_normalizer import normalizar_nome_sem_cache
+from app.utils.telefone import normalizar_telefone, parece_telefone
+
+# Dígitos de DDD: o telefone também é indexado sem eles
+DIGITOS_DDD = 2
+
+# Cliente no índice: (id, nome, telefone)
+Sugestao = Tuple[int, str, str]
+
+def chaves_do_cliente(nome: str, telefone: str) -> List[str]:
+    """Chaves de um cliente: "Maria da Silva" -> "maria da silva", "da silva", "silva" e o telefone"""
+    palavras = normalizar_nome_sem_cache(nome).split()
+    chaves = {" ".join(palavras[i:]) for i in range(len(palavras))}
+    digitos = normalizar_telefone(telefone)
+    if digitos:
+        chaves.add(digitos)
+        if len(digitos) > DIGITOS_DDD + 4:
+            chaves.add(digitos[DIGITOS_DDD:])
+    return sorted(chaves)
+
+def normalizar_termo(termo: str) -> str:
+    """Termo digitado no formato das chaves (dígitos para telefone, nome sem acentos)"""
+    if parece_telefone(termo):
+        return normalizar_telefone(termo)
+    return normalizar_nome_sem_cache(termo)
+
+class IndicePrefixos:
+    """
+    Chaves ordenadas por (chave, id) em dois arrays paralelos
+
+    Inclusões e remoções são uma busca binária e um insert/pop na lista.
+    """
+
+    def __init__(self, versao: int, clientes: Iterable[Sugestao] = ()):
+        self.versao = versao
+        self.clientes: Dict[int, Tuple[str, str]] = {}
+        entradas = []
+        for cliente_id, nome, telefone in clientes:
+            self.clientes[cliente_id] = (nome, telefone)
+            entradas.extend((chave, cliente_id) for chave in chaves_do_cliente(nome, telefone))
+        entradas.sort()
+        self.chaves: List[str] = [chave for chave, _ in entradas]
+        self.ids: List[int] = [cliente_id for _, cliente_id in entradas]
+
+    def __len__(self) -> int:
+        return len(self.clientes)
+
+    def _posicao(self, chave: str, cliente_id: int) -> int:
+        """Posição de (chave, id) na ordem do índice"""
+        inicio = bisect_left(self.chaves, chave)
+        fim = bisect_right(self.chaves, chave, inicio)
+        return bisect_left(self.ids, cliente_id, inicio, fim)
+
+    def remover(self, cliente_id: int) -> None:
+        """Retira um cliente do índice, se estiver nele"""
+        dados = self.clientes.pop(cliente_id, None)
+        if dados is None:
+            return
+        for chave in chaves_do_cliente(*dados):
+            posicao = self._posicao(chave, cliente_id)
+            if posicao < len(self.ids) and self.chaves[posicao] == chave and self.ids[posicao] == cliente_id:
+                del self.chaves[posicao]
+                del self.ids[posicao]
+
+    def aplicar(self, cliente_id: int, dados: Optional[Tuple[str, str]]) -> None:
+        """Inclui, atualiza ou (dados None) retira um cliente"""
+        if self.clientes.get(cliente_id) == dados:
+            return
+        self.remover(cliente_id)
+        if dados is None:
+            return
+        self.clientes[cliente_id] = dados
+        for chave in chaves_do_cliente(*dados):
+            posicao = self._posicao(chave, cliente_id)
+            self.chaves.insert(posicao, chave)
+            self.ids.insert(posicao, cliente_id)
+
+    def buscar(self, prefixo: str, limit: int) -> List[Sugestao]:
+        """Até limit clientes com alguma chave começando pelo prefixo, na ordem das chaves"""
+        if not prefixo:
+            return []
+        encontrados: Dict[int, None] = {}
+        posicao = bisect_left(self.chaves, prefixo)
+        while posicao < len(self.chaves) and len(encontrados) < limit and self.chaves[posicao].startswith(prefixo):
+            encontrados[self.ids[posicao]] = None
+            posicao += 1
+        return [(cliente_id, *self.clientes[cliente_id]) for cliente_id in encontrados]
+
+_indice: Optional[IndicePrefixos] = None
+_lock = Lock()
+_estatisticas = {
+    "reconstrucoes": 0,
+    "atualizacoes": 0,
+    "ultima_reconstrucao_ms": None,
+}
+
+def versao_no_banco(db: Session) -> int:
+    """Versão atual do índice (0 se nenhuma escrita foi registrada)"""
+    return db.execute(select(IndiceClientesVersao.versao).where(IndiceClientesVersao.id == 1)).scalar() or 0
+
+def _obter(db: Session) -> IndicePrefixos:
+    """Índice atualizado (chamar com _lock); reconstrói se a versão do banco mudou"""
+    global _indice
+    # Versão lida antes das linhas: uma escrita no meio só causa outra reconstrução
+    versao = versao_no_banco(db)
+    if _indice is not None and _indice.versao == versao:
+        return _indice
+
+    inicio = time.perf_counter()
+    _indice = IndicePrefixos(versao, db.execute(select(Cliente.id, Cliente.nome, Cliente.telefone)))
+    _estatisticas["reconstrucoes"] += 1
+    _estatisticas["ultima_reconstrucao_ms"] = (time.perf_counter() - inicio) * 1000
+    return _indice
+
+def carregar_indice_clientes(db: Session) -> int:
+    """Constrói o índice (na inicialização da aplicação); retorna o número de clientes"""
+    with _lock:
+        return len(_obter(db))
+
+def autocompletar(db: Session, termo: str, limit: int) -> List[Sugestao]:
+    """Clientes cujo nome (a partir de qualquer palavra) ou telefone começa com o termo"""
+    prefixo = normalizar_termo(termo)
+    with _lock:
+        return _obter(db).buscar(prefixo, limit)
+
+def estatisticas_indice_clientes() -> dict:
+    """Reconstruções, atualizações no commit e tamanho do índice"""
+    with _lock:
+        return {
+            **_estatisticas,
+            "versao": _indice.versao if _indice is not None else None,
+            "clientes": len(_indice) if _indice is not None else 0,
+            "chaves": len(_indice.chaves) if _indice is not None else 0,
+        }
+
+def invalidar_indice_clientes() -> None:
+    """Descarta o índice; a próxima consulta o reconstrói a partir do banco"""
+    global _indice
+    with _lock:
+        _indice = None
+
+def _incrementar_versao(session: Session) -> None:
+    """Incrementa indice_clientes_versao na transação da sessão e guarda a versão resultante"""
+    stmt = sqlite_insert(IndiceClientesVersao).values(id=1, versao=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IndiceClientesVersao.id],
+        set_={"versao": IndiceClientesVersao.versao + 1}
+    ).returning(IndiceClientesVersao.versao)
+    session.info["clientes_versao"] = session.connection().execute(stmt).scalar_one()
+    session.info["clientes_incrementos"] = session.info.get("clientes_incrementos", 0) + 1
+
+def registrar_clientes_em_massa(db: Session) -> None:
+    """
+    Incrementa a versão após inserções em clientes feitas sem o ORM
+
+    Não faz commit; o índice deste processo e dos demais é reconstruído
+    na próxima consulta.
+    """
+    _incrementar_versao(db)
+    db.info["clientes_invalidar"] = True
+
+@event.listens_for(Session, "after_flush")
+def _registrar_alteracoes(session, flush_context):
+    """Guarda nome e telefone dos clientes criados/alterados/removidos até o commit"""
+    alterados = session.info.setdefault("clientes_alterados", {})
+    houve_alteracao = False
+    for cliente in session.new | session.dirty:
+        if isinstance(cliente, Cliente):
+            alterados[cliente.id] = (cliente.nome, cliente.telefone)
+            houve_alteracao = True
+    for cliente in session.deleted:
+        if isinstance(cliente, Cliente):
+            alterados[cliente.id] = None
+            houve_alteracao = True
+    if houve_alteracao:
+        _incrementar_versao(session)
+
+@event.listens_for(Session, "after_commit")
+def _atualizar_indice(session):
+    """Aplica ao índice as alterações confirmadas, se ele estava na versão anterior a elas"""
+    global _indice
+    alterados = session.info.pop("clientes_alterados", None) or {}
+    incrementos = session.info.pop("clientes_incrementos", 0)
+    versao = session.info.pop("clientes_versao", None)
+    invalidar = session.info.pop("clientes_invalidar", False)
+    if not incrementos:
+        return
+    with _lock:
+        if _indice is None:
+            return
+        # Outro processo (ou sessão) escreveu no meio: a próxima consulta reconstrói
+        if invalidar or _indice.versao != versao - incrementos:
+            _indice = None
+            return
+        for cliente_id, dados in alterados.items():
+            _indice.aplicar(cliente_id, dados)
+        _indice.versao = versao
+        _estatisticas["atualizacoes"] += 1
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_alteracoes(session, previous_transaction):
+    """Alterações desfeitas não chegam ao índice"""
+    for chave in ("clientes_alterados", "clientes_incrementos", "clientes_versao", "clientes_invalidar"):
+        session.info.pop(chave, None)
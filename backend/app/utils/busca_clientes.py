@@ -0,0 +1,93 @@
+"""
+Busca de clientes pelo índice FTS5 (tabela clientes_fts, ver app.models)
+e pelo telefone normalizado
+
+O termo digitado é quebrado em palavras, e cada uma vira uma busca por
+prefixo. Todas precisam aparecer em algum dos campos (nome, telefone,
+email ou observação). Os resultados são ordenados por relevância (bm25,
+com mais peso para o nome) e depois por id.
+
+Termos que parecem telefone (só dígitos e pontuação) vão antes para a
+busca pelo final do número na coluna telefone_invertido: "11999991111"
+encontra "(11) 99999-1111", o que a busca por palavras não faria.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from app.models import Cliente
+from app.utils.telefone import MINIMO_DIGITOS_BUSCA, inverter_telefone, normalizar_telefone, parece_telefone
+
+# Pesos do bm25 por coluna: nome, telefone, email, observacao
+PESOS_BM25 = (10.0, 5.0, 2.0, 1.0)
+
+def expressao_fts(termo: str) -> Optional[str]:
+    """
+    Converte o termo digitado em uma consulta FTS5 (palavras com prefixo, AND)
+
+    Returns:
+        None se o termo não tem letras nem dígitos
+    """
+    palavras = re.findall(r"\w+", termo)
+    if not palavras:
+        return None
+    # Entre aspas, a palavra é tratada como texto e não como sintaxe FTS5
+    return " ".join(f'"{p}"*' for p in palavras)
+
+def buscar_por_telefone(db: Session, numero: str, skip: int = 0, limit: int = 50) -> Tuple[List[Cliente], int]:
+    """
+    Clientes cujo telefone termina com os dígitos do número, em uma busca
+    por intervalo no índice ix_clientes_telefone_invertido
+
+    O número completo casa exatamente e vem primeiro; só o final (ex: sem
+    DDD) casa com todos os telefones terminados nele. Finais com menos de
+    MINIMO_DIGITOS_BUSCA dígitos casariam com quase todo o cadastro e não
+    são buscados.
+
+    Returns:
+        (clientes da página, total de clientes encontrados)
+    """
+    final = inverter_telefone(normalizar_telefone(numero))
+    if len(final) < MINIMO_DIGITOS_BUSCA:
+        return [], 0
+    # ':' é o caractere seguinte a '9': o intervalo cobre tudo que começa com final
+    filtro = (Cliente.telefone_invertido >= final, Cliente.telefone_invertido < final + ":")
+    total = db.query(func.count()).select_from(Cliente).filter(*filtro).scalar()
+    clientes = db.query(Cliente).filter(*filtro).order_by(
+        Cliente.telefone_invertido, Cliente.id
+    ).offset(skip).limit(limit).all()
+    return clientes, total
+
+def pesquisar_clientes(db: Session, termo: str, skip: int = 0, limit: int = 50) -> Tuple[List[Cliente], int]:
+    """
+    Página de clientes que casam com o termo, por relevância
+
+    Returns:
+        (clientes da página, total de clientes encontrados)
+    """
+    if parece_telefone(termo):
+        clientes, total = buscar_por_telefone(db, termo, skip, limit)
+        # Sem telefone terminado no número, procura o trecho como palavra (ex: "99999")
+        if total:
+            return clientes, total
+    expressao = expressao_fts(termo)
+    if expressao is None:
+        return [], 0
+    total = db.execute(
+        text("SELECT COUNT(*) FROM clientes_fts WHERE clientes_fts MATCH :expressao"),
+        {"expressao": expressao}
+    ).scalar()
+    if total <= skip:
+        return [], total
+    pesos = ", ".join(str(p) for p in PESOS_BM25)
+    # Ordena só o índice; a tabela clientes é lida apenas para a página
+    clientes = db.query(Cliente).from_statement(text(
+        "SELECT clientes.* FROM ("
+        f"SELECT rowid, bm25(clientes_fts, {pesos}) AS relevancia FROM clientes_fts "
+        "WHERE clientes_fts MATCH :expressao ORDER BY relevancia, rowid LIMIT :limit OFFSET :skip"
+        ") AS pagina JOIN clientes ON clientes.id = pagina.rowid ORDER BY pagina.relevancia, pagina.rowid"
+    )).params(expressao=expressao, limit=limit, skip=skip).all()
+    return clientes, total
@@ -0,0 +1,229 @@
+"""
+Cache em memória do catálogo de materiais ativos
+
+Cada processo guarda as linhas dos materiais ativos (LinhaMaterial) e o
+IndiceNgramas dos nomes, usados pela busca de similares, pelo
+criar-ou-buscar e pela listagem de estoque baixo sem recarregar a tabela.
+
+Coerência entre processos: toda escrita em materiais feita pela aplicação
+incrementa catalogo_versao na mesma transação (pelo ORM no after_flush,
+pelas variações de estoque em registrar_saldos_estoque). Cada consulta lê a
+versão do banco; se for diferente da versão do cache, o catálogo é
+reconstruído. No processo que fez a escrita o cache é atualizado no
+commit (write-through), sem reconstrução, quando nenhum outro processo
+escreveu no meio. Escritas feitas por fora da aplicação (SQL direto)
+precisam incrementar catalogo_versao ou chamar invalidar_catalogo().
+"""
+
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import CatalogoVersao, Material
+from app.utils.indice_materiais import IndiceNgramas
+
+class LinhaMaterial(NamedTuple):
+    """Material ativo como guardado no cache (mesmos campos do schema Material)"""
+    id: int
+    nome: str
+    nome_normalizado: str
+    descricao: Optional[str]
+    quantidade_disponivel: float
+    unidade: str
+    valor_unitario: float
+    estoque_minimo: float
+    ativo: bool
+    data_cadastro: Optional[datetime]
+
+COLUNAS = [getattr(Material, campo) for campo in LinhaMaterial._fields]
+
+class CatalogoMateriais:
+    """Linhas dos materiais ativos e índice de n-gramas dos nomes, numa versão do catálogo"""
+
+    def __init__(self, versao: int, linhas: Iterable[LinhaMaterial]):
+        self.versao = versao
+        self.linhas: Dict[int, LinhaMaterial] = {linha.id: linha for linha in linhas}
+        self.indice = IndiceNgramas(
+            (linha.id, linha.nome_normalizado, bool(linha.nome)) for linha in self.linhas.values()
+        )
+
+    def aplicar(self, material_id: int, linha: Optional[LinhaMaterial]) -> None:
+        """Inclui, atualiza ou (linha None ou inativa) retira um material"""
+        anterior = self.linhas.pop(material_id, None)
+        if linha is None or not linha.ativo:
+            self.indice.remover(material_id)
+            return
+        self.linhas[material_id] = linha
+        if anterior is None or anterior.nome != linha.nome:
+            self.indice.adicionar(material_id, linha.nome_normalizado, bool(linha.nome))
+
+    def buscar_similares(self, nome_norm: str, threshold: float) -> List[Tuple[LinhaMaterial, float]]:
+        """Materiais com similaridade >= threshold, na ordem de encontrar_materiais_similares"""
+        return [
+            (self.linhas[material_id], similaridade)
+            for material_id, similaridade in self.indice.buscar(nome_norm, threshold)
+        ]
+
+    def por_nome_normalizado(self, nome_norm: str) -> Optional[LinhaMaterial]:
+        """Material de menor id com exatamente esse nome normalizado"""
+        ids = self.indice.ids_por_nome.get(nome_norm)
+        return self.linhas[min(ids)] if ids else None
+
+    def estoque_baixo(self) -> List[LinhaMaterial]:
+        """Materiais com quantidade disponível <= estoque mínimo, por id"""
+        return sorted(
+            (linha for linha in self.linhas.values() if linha.quantidade_disponivel - linha.estoque_minimo <= 0),
+            key=lambda linha: linha.id
+        )
+
+_catalogo: Optional[CatalogoMateriais] = None
+_lock = Lock()
+_estatisticas = {
+    "acertos": 0,
+    "reconstrucoes": 0,
+    "atualizacoes": 0,
+    "tempo_reconstrucao_ms": 0.0,
+    "ultima_reconstrucao_ms": None,
+}
+
+def versao_no_banco(db: Session) -> int:
+    """Versão atual do catálogo (0 se nenhuma escrita foi registrada)"""
+    return db.execute(select(CatalogoVersao.versao).where(CatalogoVersao.id == 1)).scalar() or 0
+
+def _obter(db: Session) -> CatalogoMateriais:
+    """Catálogo atualizado (chamar com _lock); reconstrói se a versão do banco mudou"""
+    global _catalogo
+    # Versão lida antes das linhas: uma escrita no meio só causa outra reconstrução
+    versao = versao_no_banco(db)
+    if _catalogo is not None and _catalogo.versao == versao:
+        _estatisticas["acertos"] += 1
+        return _catalogo
+
+    inicio = time.perf_counter()
+    linhas = db.execute(select(*COLUNAS).where(Material.ativo == True))
+    _catalogo = CatalogoMateriais(versao, (LinhaMaterial(*linha) for linha in linhas))
+    duracao = (time.perf_counter() - inicio) * 1000
+    _estatisticas["reconstrucoes"] += 1
+    _estatisticas["tempo_reconstrucao_ms"] += duracao
+    _estatisticas["ultima_reconstrucao_ms"] = duracao
+    return _catalogo
+
+def buscar_similares(db: Session, nome_norm: str, threshold: float) -> List[Tuple[LinhaMaterial, float]]:
+    """Busca aproximada no catálogo dos materiais ativos"""
+    with _lock:
+        return _obter(db).buscar_similares(nome_norm, threshold)
+
+def material_por_nome(db: Session, nome_norm: str) -> Optional[LinhaMaterial]:
+    """Material ativo com o mesmo nome normalizado, se houver"""
+    with _lock:
+        return _obter(db).por_nome_normalizado(nome_norm)
+
+def materiais_estoque_baixo(db: Session) -> List[LinhaMaterial]:
+    """Materiais ativos com estoque baixo"""
+    with _lock:
+        return _obter(db).estoque_baixo()
+
+def estatisticas_catalogo() -> dict:
+    """Acertos, reconstruções, atualizações no commit e tempo de reconstrução do cache"""
+    with _lock:
+        consultas = _estatisticas["acertos"] + _estatisticas["reconstrucoes"]
+        return {
+            **_estatisticas,
+            "taxa_acerto": _estatisticas["acertos"] / consultas if consultas else None,
+            "versao": _catalogo.versao if _catalogo is not None else None,
+            "materiais": len(_catalogo.linhas) if _catalogo is not None else 0,
+        }
+
+def invalidar_catalogo() -> None:
+    """Descarta o cache; a próxima consulta o reconstrói a partir do banco"""
+    global _catalogo
+    with _lock:
+        _catalogo = None
+
+def _incrementar_versao(session: Session) -> None:
+    """Incrementa catalogo_versao na transação da sessão e guarda a versão resultante"""
+    stmt = sqlite_insert(CatalogoVersao).values(id=1, versao=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CatalogoVersao.id],
+        set_={"versao": CatalogoVersao.versao + 1}
+    ).returning(CatalogoVersao.versao)
+    session.info["catalogo_versao"] = session.connection().execute(stmt).scalar_one()
+    session.info["catalogo_incrementos"] = session.info.get("catalogo_incrementos", 0) + 1
+
+def registrar_saldos_estoque(db: Session, quantidades: Iterable[Tuple[int, float]]) -> None:
+    """
+    Registra as quantidades resultantes de um UPDATE feito sem o ORM
+
+    Não faz commit: deve rodar na mesma transação do UPDATE.
+    """
+    quantidades = dict(quantidades)
+    if not quantidades:
+        return
+    db.info.setdefault("catalogo_saldos", {}).update(quantidades)
+    _incrementar_versao(db)
+
+def registrar_alteracao_em_massa(db: Session) -> None:
+    """
+    Incrementa a versão após escritas em materiais feitas por SQL direto
+
+    O cache deste processo e dos demais é reconstruído na próxima consulta.
+    """
+    _incrementar_versao(db)
+    db.info["catalogo_invalidar"] = True
+
+@event.listens_for(Session, "after_flush")
+def _registrar_alteracoes(session, flush_context):
+    """Guarda as linhas dos materiais criados/alterados/removidos até o commit"""
+    alterados = session.info.setdefault("catalogo_alterados", {})
+    houve_alteracao = False
+    for material in session.new | session.dirty:
+        if isinstance(material, Material):
+            # O ORM não enxerga os saldos gravados por UPDATE direto: sem linha confiável, reconstrói
+            if material.id in session.info.get("catalogo_saldos", ()):
+                session.info["catalogo_invalidar"] = True
+            alterados[material.id] = LinhaMaterial(*(getattr(material, campo) for campo in LinhaMaterial._fields))
+            houve_alteracao = True
+    for material in session.deleted:
+        if isinstance(material, Material):
+            alterados[material.id] = None
+            houve_alteracao = True
+    if houve_alteracao:
+        _incrementar_versao(session)
+
+@event.listens_for(Session, "after_commit")
+def _atualizar_catalogo(session):
+    """Aplica ao cache as alterações confirmadas, se ele estava na versão anterior a elas"""
+    global _catalogo
+    alterados = session.info.pop("catalogo_alterados", None) or {}
+    saldos = session.info.pop("catalogo_saldos", None) or {}
+    incrementos = session.info.pop("catalogo_incrementos", 0)
+    versao = session.info.pop("catalogo_versao", None)
+    invalidar = session.info.pop("catalogo_invalidar", False)
+    if not incrementos:
+        return
+    with _lock:
+        if _catalogo is None:
+            return
+        # Outro processo (ou sessão) escreveu no meio: a próxima consulta reconstrói
+        if invalidar or _catalogo.versao != versao - incrementos:
+            _catalogo = None
+            return
+        for material_id, linha in alterados.items():
+            _catalogo.aplicar(material_id, linha)
+        for material_id, quantidade in saldos.items():
+            linha = _catalogo.linhas.get(material_id)
+            if linha is not None:
+                _catalogo.linhas[material_id] = linha._replace(quantidade_disponivel=quantidade)
+        _catalogo.versao = versao
+        _estatisticas["atualizacoes"] += 1
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_alteracoes(session, previous_transaction):
+    """Alterações desfeitas não chegam ao cache"""
+    for chave in ("catalogo_alterados", "catalogo_saldos", "catalogo_incrementos", "catalogo_versao", "catalogo_invalidar"):
+        session.info.pop(chave, None)
@@ -0,0 +1,221 @@
+"""
+Consolidação de materiais duplicados
+
+Materiais ativos com o mesmo nome_normalizado (normalizar_nome do nome,
+mantido pelo modelo) são fundidos no
+de maior id (o mesmo critério do antigo consolidar_materiais.sql): o
+principal recebe a soma das quantidades e o maior estoque mínimo e valor
+unitário. Os duplicados são desativados com quantidade zero.
+
+Todas as referências aos duplicados são repontadas para o principal com
+um UPDATE por tabela. As tabelas vêm das chaves estrangeiras declaradas
+nos modelos. O mapa duplicado -> principal fica numa tabela temporária.
+Os snapshots de saldo dos materiais envolvidos são descartados, pois o
+livro-razão repontado passa a ser a fonte do saldo do principal. O
+consumo diário dos duplicados é somado ao do principal no mesmo dia.
+
+Sem aplicar=True nada é gravado, e o relatório mostra o que mudaria.
+"""
+
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import List, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.models import Base, ConsumoDiario, Material, SnapshotEstoque
+from app.utils.catalogo_materiais import registrar_alteracao_em_massa
+from app.utils.consumo_diario import recalcular_acumulados
+
+TABELA_MAPA = "consolidacao_mapa"
+
+@dataclass
+class GrupoConsolidacao:
+    """Materiais com o mesmo nome normalizado e os valores do principal após a fusão"""
+    principal_id: int
+    nome: str
+    quantidade_total: float
+    estoque_minimo: float
+    valor_unitario: float
+    descricao: Optional[str]
+    duplicados: List[int] = field(default_factory=list)
+    nomes_duplicados: List[str] = field(default_factory=list)
+
+def planejar_consolidacao(db: Session) -> List[GrupoConsolidacao]:
+    """
+    Grupos de materiais ativos duplicados, em ordem de id do principal
+
+    Os nomes repetidos são encontrados pelo banco (GROUP BY no índice de
+    nome_normalizado); só as linhas desses grupos são lidas.
+    """
+    # Nomes sem letras nem dígitos (normalizado vazio) não identificam o material: não são fundidos
+    repetidos = (
+        select(Material.nome_normalizado)
+        .where(Material.ativo == True, Material.nome_normalizado != "")
+        .group_by(Material.nome_normalizado)
+        .having(func.count() > 1)
+    )
+    linhas = db.execute(
+        select(
+            Material.nome_normalizado, Material.id, Material.nome, Material.quantidade_disponivel,
+            Material.estoque_minimo, Material.valor_unitario, Material.descricao
+        ).where(Material.ativo == True, Material.nome_normalizado.in_(repetidos))
+        .order_by(Material.nome_normalizado, Material.id)
+    ).tuples().all()
+
+    grupos = []
+    # O principal é o de maior id (último do grupo), como no antigo script SQL
+    for _, membros in groupby(linhas, key=lambda linha: linha[0]):
+        _, ids, nomes, quantidades, minimos, valores, descricoes = zip(*membros)
+        grupos.append(GrupoConsolidacao(
+            principal_id=ids[-1],
+            nome=nomes[-1],
+            quantidade_total=sum(quantidades),
+            estoque_minimo=max(minimos),
+            valor_unitario=max(valores),
+            descricao=next((d for d in reversed(descricoes) if d), None),
+            duplicados=list(ids[:-1]),
+            nomes_duplicados=list(nomes[:-1]),
+        ))
+    grupos.sort(key=lambda g: g.principal_id)
+    return grupos
+
+def _referencias_a_materiais() -> List[tuple]:
+    """
+    (tabela, coluna) de todas as chaves estrangeiras para materiais.id, exceto
+    as que fazem parte da chave primária (snapshots e consumo diário)
+    """
+    referencias = []
+    for tabela in Base.metadata.sorted_tables:
+        if tabela in (SnapshotEstoque.__table__, ConsumoDiario.__table__):
+            continue
+        for coluna in tabela.columns:
+            if any(fk.column is Material.__table__.c.id for fk in coluna.foreign_keys):
+                referencias.append((tabela.name, coluna.name))
+    return referencias
+
+def _contar_materiais_padrao_repetidos(db: Session) -> int:
+    """Linhas de procedimento_materiais que a fusão torna repetidas (antes de repontar)"""
+    return db.execute(text(
+        f"SELECT COALESCE(SUM(n - 1), 0) FROM ("
+        f"SELECT COUNT(*) AS n FROM procedimento_materiais p "
+        f"LEFT JOIN {TABELA_MAPA} m ON m.duplicado_id = p.material_id "
+        f"WHERE COALESCE(m.principal_id, p.material_id) IN (SELECT principal_id FROM {TABELA_MAPA}) "
+        f"GROUP BY p.procedimento_id, COALESCE(m.principal_id, p.material_id) HAVING COUNT(*) > 1)"
+    )).scalar()
+
+def _mesclar_materiais_padrao(db: Session) -> None:
+    """
+    Procedimento com o principal e um duplicado nos materiais padrão fica com
+    uma linha só (a de menor id), somando as quantidades
+    """
+    chave = (
+        "p2.procedimento_id = procedimento_materiais.procedimento_id "
+        "AND p2.material_id = procedimento_materiais.material_id"
+    )
+    repetidas = (
+        f"material_id IN (SELECT principal_id FROM {TABELA_MAPA}) "
+        f"AND EXISTS (SELECT 1 FROM procedimento_materiais p2 WHERE {chave} AND p2.id != procedimento_materiais.id)"
+    )
+    db.execute(text(
+        f"UPDATE procedimento_materiais SET quantidade_padrao = "
+        f"(SELECT SUM(p2.quantidade_padrao) FROM procedimento_materiais p2 WHERE {chave}) "
+        f"WHERE {repetidas} AND id = (SELECT MIN(p2.id) FROM procedimento_materiais p2 WHERE {chave})"
+    ))
+    db.execute(text(
+        f"DELETE FROM procedimento_materiais "
+        f"WHERE {repetidas} AND id > (SELECT MIN(p2.id) FROM procedimento_materiais p2 WHERE {chave})"
+    ))
+
+def _mesclar_consumo_diario(db: Session) -> int:
+    """Soma o consumo dos duplicados ao do principal em cada dia e remove as linhas dos duplicados"""
+    db.execute(text(
+        f"INSERT INTO consumo_diario (material_id, dia, quantidade, valor_total, quantidade_acumulada, valor_acumulado) "
+        f"SELECT m.principal_id, c.dia, SUM(c.quantidade), SUM(c.valor_total), 0, 0 "
+        f"FROM consumo_diario c JOIN {TABELA_MAPA} m ON m.duplicado_id = c.material_id "
+        f"WHERE true GROUP BY m.principal_id, c.dia "
+        f"ON CONFLICT (material_id, dia) DO UPDATE SET "
+        f"quantidade = quantidade + excluded.quantidade, valor_total = valor_total + excluded.valor_total"
+    ))
+    removidas = db.execute(text(
+        f"DELETE FROM consumo_diario WHERE material_id IN (SELECT duplicado_id FROM {TABELA_MAPA})"
+    )).rowcount
+    recalcular_acumulados(db, f"SELECT principal_id FROM {TABELA_MAPA}")
+    return removidas
+
+def consolidar_materiais(db: Session, aplicar: bool = False) -> dict:
+    """
+    Funde os materiais duplicados; não faz commit
+
+    Args:
+        aplicar: False (padrão) só calcula o relatório, sem gravar nada
+
+    Returns:
+        Relatório com os grupos (valores do principal após a fusão) e o
+        número de referências repontadas por tabela
+    """
+    grupos = planejar_consolidacao(db)
+    relatorio = {
+        "aplicado": aplicar,
+        "grupos": [dict(vars(g)) for g in grupos],
+        "materiais_desativados": sum(len(g.duplicados) for g in grupos),
+        "referencias": {},
+        "materiais_padrao_mesclados": 0,
+    }
+    if not grupos:
+        return relatorio
+
+    db.execute(text(f"DROP TABLE IF EXISTS temp.{TABELA_MAPA}"))
+    db.execute(text(f"CREATE TEMP TABLE {TABELA_MAPA} (duplicado_id INTEGER PRIMARY KEY, principal_id INTEGER NOT NULL)"))
+    try:
+        db.execute(
+            text(f"INSERT INTO {TABELA_MAPA} (duplicado_id, principal_id) VALUES (:duplicado, :principal)"),
+            [{"duplicado": d, "principal": g.principal_id} for g in grupos for d in g.duplicados]
+        )
+        duplicados = f"IN (SELECT duplicado_id FROM {TABELA_MAPA})"
+        relatorio["materiais_padrao_mesclados"] = _contar_materiais_padrao_repetidos(db)
+
+        for tabela, coluna in _referencias_a_materiais():
+            if aplicar:
+                quantidade = db.execute(text(
+                    f"UPDATE {tabela} SET {coluna} = "
+                    f"(SELECT principal_id FROM {TABELA_MAPA} WHERE duplicado_id = {tabela}.{coluna}) "
+                    f"WHERE {coluna} {duplicados}"
+                )).rowcount
+            else:
+                quantidade = db.execute(text(f"SELECT COUNT(*) FROM {tabela} WHERE {coluna} {duplicados}")).scalar()
+            relatorio["referencias"][tabela] = quantidade
+
+        if not aplicar:
+            relatorio["referencias"]["consumo_diario"] = db.execute(
+                text(f"SELECT COUNT(*) FROM consumo_diario WHERE material_id {duplicados}")
+            ).scalar()
+        else:
+            relatorio["referencias"]["consumo_diario"] = _mesclar_consumo_diario(db)
+            _mesclar_materiais_padrao(db)
+            db.execute(text(
+                f"DELETE FROM snapshots_estoque WHERE material_id {duplicados} "
+                f"OR material_id IN (SELECT principal_id FROM {TABELA_MAPA})"
+            ))
+            db.execute(
+                text(
+                    "UPDATE materiais SET quantidade_disponivel = :quantidade_total, estoque_minimo = :estoque_minimo, "
+                    "valor_unitario = :valor_unitario, descricao = :descricao WHERE id = :principal_id"
+                ),
+                [
+                    {
+                        "principal_id": g.principal_id,
+                        "quantidade_total": g.quantidade_total,
+                        "estoque_minimo": g.estoque_minimo,
+                        "valor_unitario": g.valor_unitario,
+                        "descricao": g.descricao,
+                    }
+                    for g in grupos
+                ]
+            )
+            db.execute(text(f"UPDATE materiais SET ativo = 0, quantidade_disponivel = 0 WHERE id {duplicados}"))
+            registrar_alteracao_em_massa(db)
+    finally:
+        db.execute(text(f"DROP TABLE IF EXISTS temp.{TABELA_MAPA}"))
+    return relatorio
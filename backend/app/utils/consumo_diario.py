@@ -0,0 +1,125 @@
+"""
+Manutenção do consumo diário de materiais (tabela consumo_diario)
+
+Uma linha por (material, dia) com a quantidade usada em atendimentos, o
+valor correspondente (quantidade x valor_unitario_momento) e o acumulado
+do material até o dia. O consumo de um período é a diferença entre os
+acumulados no fim e na véspera do início, então os relatórios não
+percorrem atendimento_materiais nem as linhas do período.
+
+Variações em um dia somam o consumo à linha do dia e o acumulado a ela e
+às linhas posteriores do mesmo material; como os atendimentos costumam
+ser lançados no dia, normalmente só a última linha é tocada.
+"""
+
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models import AtendimentoMaterial
+
+# Item consumido: (material_id, quantidade, valor_unitario_momento)
+ItemConsumo = Tuple[int, float, float]
+
+def aplicar_variacoes(db: Session, variacoes: Dict[Tuple[int, date], Tuple[float, float]]) -> None:
+    """
+    Soma variações de (quantidade, valor) ao consumo e aos acumulados
+
+    Não faz commit: deve rodar na mesma transação da alteração dos atendimentos.
+    """
+    linhas = [
+        {"material_id": material_id, "dia": dia.isoformat(), "quantidade": quantidade, "valor": valor}
+        for (material_id, dia), (quantidade, valor) in variacoes.items()
+        if quantidade or valor
+    ]
+    if not linhas:
+        return
+    # Linha nova começa com o acumulado da véspera; o UPDATE abaixo soma a variação
+    anterior = (
+        "(SELECT {coluna} FROM consumo_diario c WHERE c.material_id = :material_id AND c.dia < :dia "
+        "ORDER BY c.dia DESC LIMIT 1)"
+    )
+    db.execute(text(
+        "INSERT INTO consumo_diario (material_id, dia, quantidade, valor_total, quantidade_acumulada, valor_acumulado) "
+        f"SELECT :material_id, :dia, :quantidade, :valor, "
+        f"COALESCE({anterior.format(coluna='quantidade_acumulada')}, 0), "
+        f"COALESCE({anterior.format(coluna='valor_acumulado')}, 0) "
+        "WHERE true ON CONFLICT (material_id, dia) DO UPDATE SET "
+        "quantidade = quantidade + excluded.quantidade, valor_total = valor_total + excluded.valor_total"
+    ), linhas)
+    db.execute(text(
+        "UPDATE consumo_diario SET quantidade_acumulada = quantidade_acumulada + :quantidade, "
+        "valor_acumulado = valor_acumulado + :valor WHERE material_id = :material_id AND dia >= :dia"
+    ), linhas)
+
+def registrar_consumo(db: Session, consumos: Iterable[Tuple[datetime, Iterable[ItemConsumo]]], sinal: int = 1) -> None:
+    """
+    Registra (sinal=1) ou remove (sinal=-1) o consumo de atendimentos
+
+    Args:
+        consumos: Tuplas (data_hora do atendimento, itens consumidos)
+    """
+    variacoes: Dict[Tuple[int, date], Tuple[float, float]] = {}
+    for data_hora, itens in consumos:
+        dia = data_hora.date()
+        for material_id, quantidade, valor_unitario in itens:
+            quantidade_atual, valor_atual = variacoes.get((material_id, dia), (0.0, 0.0))
+            variacoes[(material_id, dia)] = (
+                quantidade_atual + sinal * quantidade,
+                valor_atual + sinal * quantidade * valor_unitario
+            )
+    aplicar_variacoes(db, variacoes)
+
+def itens_do_atendimento(db: Session, atendimento_id: int) -> List[ItemConsumo]:
+    """Materiais já gravados de um atendimento, no formato de registrar_consumo"""
+    return db.query(
+        AtendimentoMaterial.material_id,
+        AtendimentoMaterial.quantidade_utilizada,
+        AtendimentoMaterial.valor_unitario_momento
+    ).filter(AtendimentoMaterial.atendimento_id == atendimento_id).all()
+
+def recalcular_acumulados(db: Session, materiais: Optional[str] = None) -> None:
+    """
+    Recalcula os acumulados a partir do consumo de cada dia; não faz commit
+
+    Args:
+        materiais: Subconsulta SQL com os ids dos materiais (padrão: todos)
+    """
+    filtro = f"WHERE material_id IN ({materiais}) " if materiais else ""
+    db.execute(text(
+        "UPDATE consumo_diario SET quantidade_acumulada = a.quantidade, valor_acumulado = a.valor "
+        "FROM (SELECT material_id, dia, SUM(quantidade) OVER w AS quantidade, SUM(valor_total) OVER w AS valor "
+        f"FROM consumo_diario {filtro}WINDOW w AS (PARTITION BY material_id ORDER BY dia)) AS a "
+        "WHERE consumo_diario.material_id = a.material_id AND consumo_diario.dia = a.dia"
+    ))
+
+def popular_consumo_diario(db: Session) -> int:
+    """
+    Grava o consumo de todos os atendimentos em consumo_diario (vazia); não faz commit
+
+    Returns:
+        Número de linhas (material, dia) gravadas
+    """
+    resultado = db.execute(text(
+        "INSERT INTO consumo_diario (material_id, dia, quantidade, valor_total, quantidade_acumulada, valor_acumulado) "
+        "SELECT am.material_id, date(a.data_hora), SUM(am.quantidade_utilizada), "
+        "SUM(am.quantidade_utilizada * am.valor_unitario_momento), 0, 0 "
+        "FROM atendimento_materiais am JOIN atendimentos a ON a.id = am.atendimento_id "
+        "GROUP BY am.material_id, date(a.data_hora)"
+    ))
+    recalcular_acumulados(db)
+    return resultado.rowcount
+
+def reconstruir_consumo_diario(db: Session) -> int:
+    """
+    Recalcula todo o consumo a partir de atendimento_materiais
+
+    Returns:
+        Número de linhas (material, dia) gravadas
+    """
+    db.execute(text("DELETE FROM consumo_diario"))
+    linhas = popular_consumo_diario(db)
+    db.commit()
+    return linhas
@@ -0,0 +1,219 @@
+"""
+Movimentações de estoque (livro-razão) e snapshots de saldo
+
+Toda variação de materiais.quantidade_disponivel gera um insert em
+movimentacoes_estoque, na mesma transação:
+
+- variações relativas (entrada, saída, atendimento) usam
+  atualizar_saldo, um UPDATE atômico quantidade = quantidade + variação
+  (com a guarda de saldo nas saídas), sem leitura-modificação-escrita em
+  Python;
+- quantidades gravadas pelo ORM (cadastro, PUT) viram movimentações
+  "inicial"/"ajuste" pela diferença, no after_flush.
+
+Materiais inativos (removidos) não recebem variações relativas: as
+funções abaixo os tratam como inexistentes.
+
+quantidade_disponivel continua sendo o saldo atual usado pelas listagens.
+O saldo em uma data vem do último SnapshotEstoque até ela mais as
+movimentações posteriores; gerar_snapshots consolida o livro-razão e
+deve rodar periodicamente (scripts/gerar_snapshots_estoque.py).
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event, func, inspect, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from app.models import Material, MovimentacaoEstoque, SnapshotEstoque
+from app.utils.alertas_estoque import verificar_cruzamento
+from app.utils.catalogo_materiais import registrar_saldos_estoque
+
+def atualizar_saldo(db: Session, material_id: int, variacao: float, exigir_saldo: bool = False) -> Optional[float]:
+    """
+    Soma a variação ao saldo do material com um UPDATE atômico
+
+    Não registra a movimentação nem faz commit.
+
+    Args:
+        exigir_saldo: Só aplica se quantidade_disponivel + variacao >= 0
+
+    Returns:
+        Saldo resultante, ou None se o material não existe, está inativo ou o saldo não bastou
+    """
+    condicoes = [Material.id == material_id, Material.ativo == True]
+    if exigir_saldo:
+        condicoes.append(Material.quantidade_disponivel >= -variacao)
+    resultado = db.execute(
+        update(Material)
+        .where(*condicoes)
+        .values(quantidade_disponivel=Material.quantidade_disponivel + variacao)
+        .returning(Material.quantidade_disponivel, Material.estoque_minimo, Material.nome)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if resultado is None:
+        return None
+    # Valores inteiros gravados em colunas REAL voltam como int no RETURNING
+    saldo, estoque_minimo, nome = float(resultado[0]), float(resultado[1]), resultado[2]
+    registrar_saldos_estoque(db, [(material_id, saldo)])
+    verificar_cruzamento(db, (material_id, nome), (saldo - variacao, estoque_minimo), (saldo, estoque_minimo))
+    return saldo
+
+def atualizar_saldos(db: Session, variacoes: Dict[int, float]) -> Dict[int, float]:
+    """
+    Soma as variações aos saldos de vários materiais com um único UPDATE ... FROM (VALUES ...)
+
+    Variações negativas só são aplicadas se o saldo resultante não ficar
+    negativo. Não registra as movimentações nem faz commit.
+
+    Returns:
+        Saldo resultante dos materiais atualizados; quem ficou de fora não
+        existe, está inativo ou não tinha saldo
+    """
+    if not variacoes:
+        return {}
+    parametros = {}
+    valores = []
+    for i, (material_id, variacao) in enumerate(variacoes.items()):
+        parametros[f"m{i}"], parametros[f"v{i}"] = material_id, variacao
+        valores.append(f"(:m{i}, :v{i})")
+    linhas = db.execute(text(
+        "UPDATE materiais SET quantidade_disponivel = quantidade_disponivel + v.column2 "
+        f"FROM (VALUES {', '.join(valores)}) AS v "
+        "WHERE materiais.id = v.column1 AND materiais.ativo AND (v.column2 >= 0 OR quantidade_disponivel + v.column2 >= 0) "
+        "RETURNING id, quantidade_disponivel, estoque_minimo, nome"
+    ), parametros).all()
+
+    saldos = {}
+    for material_id, saldo, estoque_minimo, nome in linhas:
+        saldo, estoque_minimo = float(saldo), float(estoque_minimo)
+        saldos[material_id] = saldo
+        anterior = saldo - variacoes[material_id]
+        verificar_cruzamento(db, (material_id, nome), (anterior, estoque_minimo), (saldo, estoque_minimo))
+    registrar_saldos_estoque(db, saldos.items())
+    return saldos
+
+def _linhas_movimentacao(movimentacoes: Iterable[dict]) -> List[dict]:
+    agora = datetime.utcnow()
+    return [{"atendimento_id": None, "data_hora": agora, **m} for m in movimentacoes]
+
+def registrar_movimentacoes(db: Session, movimentacoes: Iterable[dict]) -> None:
+    """Insere movimentações (material_id, quantidade, tipo[, atendimento_id]) com um executemany"""
+    linhas = _linhas_movimentacao(movimentacoes)
+    if linhas:
+        db.execute(insert(MovimentacaoEstoque), linhas)
+
+def movimentar_estoque(db: Session, material_id: int, quantidade: float, tipo: str, exigir_saldo: bool = False) -> Optional[float]:
+    """
+    Aplica uma variação ao saldo e registra a movimentação; não faz commit
+
+    Returns:
+        Saldo resultante, ou None se o material não existe, está inativo ou o saldo não bastou
+    """
+    saldo = atualizar_saldo(db, material_id, quantidade, exigir_saldo)
+    if saldo is not None:
+        registrar_movimentacoes(db, [{"material_id": material_id, "quantidade": quantidade, "tipo": tipo}])
+    return saldo
+
+def saldo_em(db: Session, material_id: int, momento: Optional[datetime] = None) -> float:
+    """
+    Saldo do material em um momento (ou o atual): último snapshot até o
+    momento mais as movimentações posteriores a ele
+    """
+    snapshot = select(SnapshotEstoque.movimentacao_id, SnapshotEstoque.saldo).where(
+        SnapshotEstoque.material_id == material_id
+    )
+    if momento is not None:
+        snapshot = snapshot.where(SnapshotEstoque.data_hora <= momento)
+    base = db.execute(snapshot.order_by(SnapshotEstoque.movimentacao_id.desc()).limit(1)).first()
+    ultimo_id, saldo = base if base else (0, 0.0)
+
+    variacao = select(func.coalesce(func.sum(MovimentacaoEstoque.quantidade), 0.0)).where(
+        MovimentacaoEstoque.material_id == material_id,
+        MovimentacaoEstoque.id > ultimo_id
+    )
+    if momento is not None:
+        variacao = variacao.where(MovimentacaoEstoque.data_hora <= momento)
+    return saldo + db.execute(variacao).scalar()
+
+def gerar_snapshots(db: Session) -> int:
+    """
+    Consolida as movimentações desde o último snapshot de cada material
+
+    Não faz commit. Returns: número de snapshots criados
+    """
+    ultimo = select(
+        SnapshotEstoque.material_id, func.max(SnapshotEstoque.movimentacao_id).label("movimentacao_id")
+    ).group_by(SnapshotEstoque.material_id).subquery()
+    anteriores: Dict[int, float] = dict(db.execute(
+        select(SnapshotEstoque.material_id, SnapshotEstoque.saldo).join(
+            ultimo,
+            (ultimo.c.material_id == SnapshotEstoque.material_id)
+            & (ultimo.c.movimentacao_id == SnapshotEstoque.movimentacao_id)
+        )
+    ).all())
+
+    # Corte fixo: movimentações inseridas durante a consolidação ficam para a próxima
+    corte = db.execute(select(func.max(MovimentacaoEstoque.id))).scalar()
+    if corte is None:
+        return 0
+    variacoes = db.execute(
+        select(
+            MovimentacaoEstoque.material_id,
+            func.sum(MovimentacaoEstoque.quantidade),
+            func.max(MovimentacaoEstoque.id),
+            func.max(MovimentacaoEstoque.data_hora)
+        )
+        .outerjoin(ultimo, ultimo.c.material_id == MovimentacaoEstoque.material_id)
+        .where(
+            MovimentacaoEstoque.id > func.coalesce(ultimo.c.movimentacao_id, 0),
+            MovimentacaoEstoque.id <= corte
+        )
+        .group_by(MovimentacaoEstoque.material_id)
+    ).all()
+    linhas = [
+        {
+            "material_id": material_id,
+            "movimentacao_id": movimentacao_id,
+            "saldo": anteriores.get(material_id, 0.0) + soma,
+            "data_hora": data_hora
+        }
+        for material_id, soma, movimentacao_id, data_hora in variacoes
+    ]
+    if linhas:
+        db.execute(insert(SnapshotEstoque), linhas)
+    return len(linhas)
+
+@event.listens_for(Session, "after_flush")
+def _registrar_quantidades_do_orm(session, flush_context):
+    """Quantidades gravadas pelo ORM viram movimentações pela diferença (e alertas, se cruzarem o mínimo)"""
+    movimentacoes = []
+    for material in session.new:
+        if isinstance(material, Material) and material.quantidade_disponivel:
+            movimentacoes.append({
+                "material_id": material.id, "quantidade": material.quantidade_disponivel, "tipo": "inicial"
+            })
+    for material in session.dirty:
+        if isinstance(material, Material):
+            atributos = inspect(material).attrs
+            historico = atributos.quantidade_disponivel.history
+            if historico.added and historico.deleted:
+                variacao = historico.added[0] - historico.deleted[0]
+                if variacao:
+                    movimentacoes.append({"material_id": material.id, "quantidade": variacao, "tipo": "ajuste"})
+            # PUT pode mudar a quantidade e/ou o estoque mínimo
+            anterior = [
+                (h.deleted or h.unchanged or [None])[0]
+                for h in (historico, atributos.estoque_minimo.history)
+            ]
+            if None not in anterior:
+                verificar_cruzamento(
+                    session,
+                    (material.id, material.nome),
+                    tuple(anterior),
+                    (material.quantidade_disponivel, material.estoque_minimo),
+                    ativo=material.ativo
+                )
+    if movimentacoes:
+        session.connection().execute(insert(MovimentacaoEstoque), _linhas_movimentacao(movimentacoes))
@@ -0,0 +1,232 @@
+"""
+Importação de clientes a partir de planilha CSV
+
+O arquivo é lido linha a linha e gravado em lotes, cada lote em sua
+própria transação, então a memória não depende do tamanho do arquivo.
+Cada linha válida é comparada com os clientes já cadastrados pelo índice
+ix_clientes_telefone_invertido (uma consulta IN por lote): é duplicada se
+já existe cliente com o mesmo telefone e o mesmo nome sem acentos. Linhas
+repetidas dentro do arquivo caem na mesma regra, porque os lotes
+anteriores já estão gravados quando o seguinte é conferido.
+
+Um erro de leitura no meio do arquivo (bytes fora do encoding, CSV
+malformado) interrompe a importação. Se nenhum lote foi gravado o
+arquivo é recusado inteiro (400). Senão, o lote pendente é gravado e o
+resumo indica em que linha a leitura parou, pois os lotes anteriores já
+estão no banco.
+
+As inserções são feitas pelo Core (executemany): as colunas de telefone
+normalizado são preenchidas aqui, o índice de busca FTS5 é mantido pelos
+triggers e o índice do autocompletar é avisado por registrar_clientes_em_massa.
+"""
+
+import codecs
+import csv
+import io
+from itertools import chain
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Cliente
+from app.utils.autocomplete_clientes import registrar_clientes_em_massa
+from app.utils.material_normalizer import normalizar_nome_sem_cache
+from app.utils.telefone import DIGITOS_NUMERO_NACIONAL, inverter_telefone, normalizar_telefone
+
+# Linhas gravadas por transação
+TAMANHO_LOTE_IMPORTACAO = 1000
+
+# Linhas inválidas detalhadas no resumo (as demais só entram na contagem)
+MAXIMO_ERROS_RESUMO = 100
+
+# Menor telefone aceito: número fixo sem DDD
+MINIMO_DIGITOS_TELEFONE = 8
+
+# Cabeçalhos aceitos (sem acentos e em minúsculas) para cada coluna
+COLUNAS = {
+    "nome": ("nome", "cliente", "nome completo"),
+    "telefone": ("telefone", "celular", "fone", "whatsapp"),
+    "email": ("email", "e mail"),
+    "observacao": ("observacao", "observacoes", "obs"),
+}
+TAMANHO_MAXIMO = {"nome": 100, "telefone": 20, "email": 100}
+
+def _colunas_do_cabecalho(cabecalho: List[str]) -> Dict[str, int]:
+    """
+    Posição de cada coluna conhecida no cabeçalho
+
+    Raises:
+        HTTPException: 400 se faltar nome ou telefone
+    """
+    posicoes: Dict[str, int] = {}
+    for posicao, titulo in enumerate(cabecalho):
+        titulo = normalizar_nome_sem_cache(titulo)
+        for coluna, aceitos in COLUNAS.items():
+            if titulo in aceitos and coluna not in posicoes:
+                posicoes[coluna] = posicao
+    faltando = [coluna for coluna in ("nome", "telefone") if coluna not in posicoes]
+    if faltando:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cabeçalho sem a coluna {', '.join(faltando)} (encontrado: {'; '.join(cabecalho)})"
+        )
+    return posicoes
+
+class ErroLeitura(Exception):
+    """Arquivo ilegível a partir da linha informada (a primeira não lida)"""
+
+    def __init__(self, linha: int, erro: str):
+        super().__init__(erro)
+        self.linha = linha
+        self.erro = erro
+
+def _ler_linhas(arquivo: IO[bytes], encoding: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    (número da linha, campos) de cada registro do CSV, pelo cabeçalho
+
+    O separador (vírgula ou ponto e vírgula, comum em planilhas em
+    português) é detectado pelo cabeçalho.
+
+    Raises:
+        HTTPException: 400 se o cabeçalho não pôde ser lido
+        ErroLeitura: se um registro após o cabeçalho não pôde ser lido
+    """
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        raise HTTPException(status_code=400, detail=f"Encoding desconhecido: {encoding}")
+    texto = io.TextIOWrapper(arquivo, encoding=encoding, newline="")
+    leitor = None
+    try:
+        primeira = next(texto, "")
+        separador = ";" if primeira.count(";") > primeira.count(",") else ","
+        leitor = csv.reader(chain([primeira], texto), delimiter=separador)
+        cabecalho = next(leitor, None)
+        if not cabecalho:
+            raise HTTPException(status_code=400, detail="Arquivo vazio")
+        posicoes = _colunas_do_cabecalho(cabecalho)
+        for campos in leitor:
+            if not any(campo.strip() for campo in campos):
+                continue
+            yield leitor.line_num, {
+                coluna: campos[posicao].strip() if posicao < len(campos) else ""
+                for coluna, posicao in posicoes.items()
+            }
+    except (UnicodeDecodeError, csv.Error) as e:
+        if isinstance(e, UnicodeDecodeError):
+            erro = f"Arquivo não está em {encoding}: {e.reason}"
+        else:
+            erro = f"CSV inválido: {e}"
+        if leitor is None or leitor.line_num <= 1:
+            raise HTTPException(status_code=400, detail=erro)
+        # O texto é decodificado em blocos: o erro pode estar algumas linhas adiante
+        raise ErroLeitura(leitor.line_num + 1, erro)
+    finally:
+        # O arquivo é de quem chamou
+        texto.detach()
+
+def preparar_cliente(campos: Dict[str, str]) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Normaliza uma linha da planilha no formato da tabela clientes
+
+    Returns:
+        (valores para o insert, None) ou (None, motivo da linha ser inválida)
+    """
+    nome = " ".join(campos["nome"].split())
+    telefone = " ".join(campos["telefone"].split())
+    email = campos.get("email") or None
+    observacao = campos.get("observacao") or None
+    if not nome:
+        return None, "nome vazio"
+    digitos = normalizar_telefone(telefone)
+    if not MINIMO_DIGITOS_TELEFONE <= len(digitos) <= DIGITOS_NUMERO_NACIONAL:
+        return None, f"telefone inválido: {telefone!r}"
+    for coluna, valor in (("nome", nome), ("telefone", telefone), ("email", email)):
+        if valor and len(valor) > TAMANHO_MAXIMO[coluna]:
+            return None, f"{coluna} com mais de {TAMANHO_MAXIMO[coluna]} caracteres"
+    return {
+        "nome": nome,
+        "telefone": telefone,
+        "telefone_normalizado": digitos,
+        "telefone_invertido": inverter_telefone(digitos),
+        "email": email,
+        "observacao": observacao,
+    }, None
+
+def _gravar_lote(db: Session, lote: List[dict]) -> Tuple[int, int]:
+    """
+    Insere as linhas do lote que ainda não estão cadastradas, em uma transação
+
+    Returns:
+        (inseridos, duplicados)
+    """
+    existentes: Set[Tuple[str, str]] = {
+        (telefone_invertido, normalizar_nome_sem_cache(nome))
+        for telefone_invertido, nome in db.execute(
+            select(Cliente.telefone_invertido, Cliente.nome)
+            .where(Cliente.telefone_invertido.in_({linha["telefone_invertido"] for linha in lote}))
+        )
+    }
+    novos = []
+    for linha in lote:
+        chave = (linha["telefone_invertido"], normalizar_nome_sem_cache(linha["nome"]))
+        if chave not in existentes:
+            existentes.add(chave)
+            novos.append(linha)
+    if novos:
+        db.execute(insert(Cliente), novos)
+        registrar_clientes_em_massa(db)
+    db.commit()
+    return len(novos), len(lote) - len(novos)
+
+def importar_clientes_csv(
+    db: Session,
+    arquivo: IO[bytes],
+    tamanho_lote: int = TAMANHO_LOTE_IMPORTACAO,
+    encoding: str = "utf-8-sig"
+) -> dict:
+    """
+    Importa os clientes de um CSV com cabeçalho (nome e telefone obrigatórios)
+
+    Returns:
+        Resumo: linhas lidas, inseridos, duplicados, inválidos, as
+        primeiras MAXIMO_ERROS_RESUMO linhas inválidas com o motivo e,
+        se a leitura parou no meio, a linha e o erro em interrompida
+
+    Raises:
+        HTTPException: 400 se o arquivo não pôde ser lido antes de algum lote ser gravado
+    """
+    resumo = {"linhas": 0, "inseridos": 0, "duplicados": 0, "invalidos": 0, "erros": [], "interrompida": None}
+    lote: List[dict] = []
+    lotes_gravados = 0
+
+    def gravar():
+        nonlocal lotes_gravados
+        inseridos, duplicados = _gravar_lote(db, lote)
+        resumo["inseridos"] += inseridos
+        resumo["duplicados"] += duplicados
+        lotes_gravados += 1
+        lote.clear()
+
+    try:
+        for numero, campos in _ler_linhas(arquivo, encoding):
+            resumo["linhas"] += 1
+            valores, erro = preparar_cliente(campos)
+            if erro is not None:
+                resumo["invalidos"] += 1
+                if len(resumo["erros"]) < MAXIMO_ERROS_RESUMO:
+                    resumo["erros"].append({"linha": numero, "erro": erro})
+                continue
+            lote.append(valores)
+            if len(lote) >= tamanho_lote:
+                gravar()
+    except ErroLeitura as e:
+        # Nada gravado ainda: o arquivo é recusado sem importar nada
+        if not lotes_gravados:
+            raise HTTPException(status_code=400, detail=f"{e.erro} (linha {e.linha})")
+        resumo["interrompida"] = {"linha": e.linha, "erro": e.erro}
+    if lote:
+        gravar()
+    return resumo
@@ -0,0 +1,238 @@
+"""
+Índice de palavras para a busca aproximada de materiais
+
+encontrar_materiais_similares compara o nome buscado com todos os
+materiais do catálogo usando difflib.SequenceMatcher. O índice guarda, para
+cada palavra dos nomes normalizados, os nomes que a contêm, e os trigramas
+das palavras (vocabulario) para achar palavras parecidas com as que não
+estão no catálogo (erros de digitação, códigos com um dígito trocado).
+
+Os candidatos saem das interseções dessas listas: primeiro os nomes com
+todas as palavras buscadas e depois os que dispensam algumas delas, das
+combinações que omitem menos caracteres para as que omitem mais, sem
+passar do que o threshold permite (2*(1 - threshold)*la). Só nomes de
+tamanho compatível com o threshold (ratio <= 2*min(la, lb)/(la+lb)) entram,
+e só os MAXIMO_CANDIDATOS primeiros são pontuados.
+
+A similaridade e a ordem dos resultados são as da busca linear, mas a
+busca é aproximada: devolve no máximo MAXIMO_CANDIDATOS nomes distintos e
+pode deixar de fora nomes acima do threshold que não compartilham palavras
+com o nome buscado. Com threshold 0 a busca não usa o índice e devolve o
+catálogo todo.
+
+O índice dos materiais ativos fica no cache do catálogo
+(app.utils.catalogo_materiais), que o mantém em dia com as escritas.
+"""
+
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+from app.utils.material_normalizer import similaridade_normalizada
+
+# Nomes distintos pontuados com o SequenceMatcher em cada busca
+MAXIMO_CANDIDATOS = 10
+
+# Palavras do vocabulário consideradas para uma palavra que não está nele
+MAXIMO_PALAVRAS_PARECIDAS = 5
+SIMILARIDADE_PALAVRA = 0.75
+
+def trigramas(texto: str) -> List[str]:
+    """
+    Trigramas do texto com um espaço em cada ponta; repetições recebem um
+    sufixo com a ocorrência, para que a contagem seja a do multiconjunto
+    """
+    texto = f" {texto} " if texto else ""
+    tokens = [texto[i:i + 3] for i in range(len(texto) - 2)]
+    if len(set(tokens)) == len(tokens):
+        return tokens
+    ocorrencias = Counter()
+    for i, grama in enumerate(tokens):
+        ocorrencias[grama] += 1
+        if ocorrencias[grama] > 1:
+            tokens[i] = f"{grama}\x00{ocorrencias[grama]}"
+    return tokens
+
+def minimo_coincidentes(la: int, lb: int, threshold: float) -> int:
+    """Menor número de caracteres coincidentes com ratio >= threshold (mesma conta do difflib)"""
+    total = la + lb
+    if total == 0:
+        return 0
+    m = max(0, int(threshold * total / 2) - 1)
+    while 2.0 * m / total < threshold:
+        m += 1
+    return m
+
+def tamanhos_compativeis(la: int, threshold: float) -> Tuple[int, int]:
+    """
+    Menor e maior tamanho de nome que ainda podem ter ratio >= threshold
+    com um nome de tamanho la (ratio <= 2*min(la, lb)/(la+lb))
+    """
+    menor = la
+    while menor > 0 and minimo_coincidentes(la, menor - 1, threshold) <= menor - 1:
+        menor -= 1
+    maior = la
+    while minimo_coincidentes(la, maior + 1, threshold) <= la:
+        maior += 1
+    return menor, maior
+
+def omissoes(tamanhos: List[int], maximo: float) -> List[Tuple[int, int, Tuple[int, ...]]]:
+    """
+    (custo, quantidade, índices) das combinações de palavras que podem ser
+    omitidas sem passar de `maximo` caracteres, da mais barata para a mais
+    cara; `tamanhos` vem em ordem crescente
+    """
+    encontradas = [(0, 0, ())]
+
+    def estender(inicio: int, custo: int, omitidas: Tuple[int, ...]) -> None:
+        for i in range(inicio, len(tamanhos)):
+            novo_custo = custo + tamanhos[i]
+            if novo_custo > maximo or len(omitidas) + 1 == len(tamanhos):
+                break
+            encontradas.append((novo_custo, len(omitidas) + 1, omitidas + (i,)))
+            estender(i + 1, novo_custo, omitidas + (i,))
+
+    estender(0, 0, ())
+    encontradas.sort()
+    return encontradas
+
+class IndiceNgramas:
+    """
+    Índice dos nomes normalizados de um catálogo de materiais
+
+    Nomes normalizados repetidos (materiais duplicados) são indexados e
+    comparados uma vez só.
+
+    Args:
+        entradas: (id, nome_normalizado, tem_nome); materiais sem nome têm
+            similaridade 0.0, como na busca linear
+    """
+
+    def __init__(self, entradas: Iterable[Tuple[int, str, bool]] = ()):
+        self.nomes: Dict[int, str] = {}
+        self.sem_nome: Set[int] = set()
+        self.ids_por_nome: Dict[str, Set[int]] = {}
+        self.por_palavra: Dict[str, Set[str]] = {}
+        self.vocabulario: Dict[str, Set[str]] = defaultdict(set)
+        for material_id, nome_norm, tem_nome in entradas:
+            self.adicionar(material_id, nome_norm, tem_nome)
+
+    def __len__(self) -> int:
+        return len(self.nomes) + len(self.sem_nome)
+
+    def adicionar(self, material_id: int, nome_norm: str, tem_nome: bool = True) -> None:
+        """Inclui (ou atualiza) um material no índice"""
+        self.remover(material_id)
+        if not tem_nome:
+            self.sem_nome.add(material_id)
+            return
+        self.nomes[material_id] = nome_norm
+        ids = self.ids_por_nome.get(nome_norm)
+        if ids is None:
+            ids = self.ids_por_nome[nome_norm] = set()
+            for palavra in set(nome_norm.split()):
+                nomes = self.por_palavra.get(palavra)
+                if nomes is None:
+                    nomes = self.por_palavra[palavra] = set()
+                    for token in trigramas(palavra):
+                        self.vocabulario[token].add(palavra)
+                nomes.add(nome_norm)
+        ids.add(material_id)
+
+    def remover(self, material_id: int) -> None:
+        """Retira um material do índice, se estiver nele"""
+        self.sem_nome.discard(material_id)
+        nome_norm = self.nomes.pop(material_id, None)
+        if nome_norm is None:
+            return
+        ids = self.ids_por_nome[nome_norm]
+        ids.discard(material_id)
+        if ids:
+            return
+        del self.ids_por_nome[nome_norm]
+        for palavra in set(nome_norm.split()):
+            nomes = self.por_palavra[palavra]
+            nomes.discard(nome_norm)
+            if nomes:
+                continue
+            del self.por_palavra[palavra]
+            for token in trigramas(palavra):
+                self.vocabulario[token].discard(palavra)
+                if not self.vocabulario[token]:
+                    del self.vocabulario[token]
+
+    def buscar(self, nome_norm: str, threshold: float) -> List[Tuple[int, float]]:
+        """
+        (id, similaridade) dos materiais com similaridade >= threshold entre
+        os MAXIMO_CANDIDATOS candidatos, na ordem de encontrar_materiais_similares
+        sobre o catálogo ordenado por id
+        """
+        encontrados = []
+        if threshold <= 0:
+            for nome, ids in self.ids_por_nome.items():
+                similaridade = similaridade_normalizada(nome_norm, nome)
+                encontrados.extend((material_id, similaridade) for material_id in ids)
+            encontrados.extend((material_id, 0.0) for material_id in self.sem_nome)
+        else:
+            for nome in self.candidatos(nome_norm, threshold):
+                similaridade = similaridade_normalizada(nome_norm, nome)
+                if similaridade >= threshold:
+                    encontrados.extend((material_id, similaridade) for material_id in self.ids_por_nome[nome])
+
+        # Ordem do catálogo e depois sort estável por similaridade, como na busca linear
+        encontrados.sort()
+        encontrados.sort(key=lambda r: r[1], reverse=True)
+        return encontrados
+
+    def candidatos(self, nome_norm: str, threshold: float, limite: int = MAXIMO_CANDIDATOS) -> List[str]:
+        """
+        Até `limite` nomes do índice parecidos com nome_norm, dos que omitem
+        menos caracteres do nome buscado para os que omitem mais
+        """
+        la = len(nome_norm)
+        if la == 0:
+            return [""] if "" in self.ids_por_nome and threshold <= 1.0 else []
+        menor, maior = tamanhos_compativeis(la, threshold)
+        palavras = sorted(dict.fromkeys(nome_norm.split()), key=len)
+        conjuntos = [self._nomes_com_palavra(p) for p in palavras]
+        ordem = sorted(range(len(palavras)), key=lambda i: len(conjuntos[i]))
+        intersecoes: Dict[Tuple[int, ...], Set[str]] = {}
+
+        def intersecao(mantidas: Tuple[int, ...]) -> Set[str]:
+            # Prefixos (das palavras mais raras) se repetem entre as omissões
+            if len(mantidas) == 1:
+                return conjuntos[mantidas[0]]
+            nomes = intersecoes.get(mantidas)
+            if nomes is None:
+                nomes = intersecoes[mantidas] = intersecao(mantidas[:-1]) & conjuntos[mantidas[-1]]
+            return nomes
+
+        # O próprio nome, se estiver no índice, vem antes dos demais
+        escolhidos = [nome_norm] if nome_norm in self.ids_por_nome else []
+        vistos = set(escolhidos)
+        custo_atual = None
+        for custo, _, omitidas in omissoes([len(p) for p in palavras], 2 * (1 - threshold) * la + 1e-9):
+            if custo != custo_atual and len(escolhidos) >= limite:
+                break
+            custo_atual = custo
+            mantidas = tuple(i for i in ordem if i not in omitidas)
+            if not conjuntos[mantidas[0]]:
+                continue
+            novos = [nome for nome in intersecao(mantidas) if nome not in vistos and menor <= len(nome) <= maior]
+            vistos.update(novos)
+            novos.sort(key=lambda nome: (abs(len(nome) - la), nome))
+            escolhidos.extend(novos)
+        return escolhidos[:limite]
+
+    def _nomes_com_palavra(self, palavra: str) -> Set[str]:
+        """Nomes com a palavra ou, se ela não estiver no índice, com as palavras mais parecidas"""
+        nomes = self.por_palavra.get(palavra)
+        if nomes is not None:
+            return nomes
+        parecidas = Counter()
+        for token in trigramas(palavra):
+            parecidas.update(self.vocabulario.get(token, ()))
+        resultado = set()
+        for parecida, _ in parecidas.most_common(MAXIMO_PALAVRAS_PARECIDAS):
+            if similaridade_normalizada(palavra, parecida) >= SIMILARIDADE_PALAVRA:
+                resultado |= self.por_palavra[parecida]
+        return resultado
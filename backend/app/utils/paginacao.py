@@ -0,0 +1,43 @@
+"""
+Utilitários para paginação por cursor (keyset)
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+
+from fastapi import HTTPException
+
+def codificar_cursor(*valores: Any) -> str:
+    """
+    Codifica os valores da chave de ordenação em um cursor opaco
+    - Datas são serializadas em ISO 8601
+    - Resultado em base64 url-safe, sem padding
+    """
+    serializados = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    bruto = json.dumps(serializados, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor: str, *tipos: type) -> List[Any]:
+    """
+    Decodifica um cursor gerado por codificar_cursor
+
+    Args:
+        cursor: Cursor opaco recebido do cliente
+        tipos: Tipo esperado de cada posição da chave (ex: datetime, int)
+
+    Raises:
+        HTTPException: Se o cursor estiver malformado
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if not isinstance(valores, list) or len(valores) != len(tipos):
+            raise ValueError("quantidade de campos inválida")
+        return [
+            datetime.fromisoformat(v) if tipo is datetime else tipo(v)
+            for v, tipo in zip(valores, tipos)
+        ]
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Cursor inválido: {e}")
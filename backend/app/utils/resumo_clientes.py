@@ -0,0 +1,138 @@
+"""
+Manutenção do resumo de cada cliente (tabelas resumo_clientes e
+resumo_cliente_procedimentos)
+
+Cada atendimento que não foi cancelado soma 1 a n_atendimentos, o valor
+cobrado a total_gasto e 1 a cada procedimento realizado. O último
+atendimento avança com um MAX na inclusão; na remoção só é recalculado
+(uma busca no índice (cliente_id, data_hora)) quando o atendimento
+removido era o último do cliente.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, bindparam, func, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import Atendimento, AtendimentoProcedimento, ResumoCliente, ResumoClienteProcedimento
+
+# Status que não entra nas métricas do cliente
+STATUS_FORA_DO_RESUMO = "cancelado"
+
+# Atendimento no resumo: (atendimento_id, cliente_id, data_hora, status, valor_cobrado, procedimento_ids)
+AtendimentoResumo = Tuple[int, int, datetime, Optional[str], float, Sequence[int]]
+
+def procedimentos_do_atendimento(db: Session, atendimento_id: int) -> List[int]:
+    """Procedimentos já gravados de um atendimento (um id por procedimento realizado)"""
+    return [
+        procedimento_id for (procedimento_id,) in db.query(AtendimentoProcedimento.procedimento_id)
+        .filter(AtendimentoProcedimento.atendimento_id == atendimento_id)
+    ]
+
+def registrar_historico(db: Session, atendimentos: Iterable[AtendimentoResumo], sinal: int = 1) -> None:
+    """
+    Registra (sinal=1) ou remove (sinal=-1) atendimentos do resumo dos clientes
+
+    Na remoção o atendimento ainda pode estar gravado (ou não ter sido
+    enviado ao banco, na alteração): o último atendimento é recalculado
+    sem ele. Não faz commit: deve rodar na mesma transação da alteração
+    dos atendimentos.
+    """
+    clientes: Dict[int, Tuple[int, float, Optional[datetime]]] = {}
+    procedimentos: Dict[Tuple[int, int], int] = {}
+    removidos = []
+    for atendimento_id, cliente_id, data_hora, status, valor, procedimento_ids in atendimentos:
+        if status == STATUS_FORA_DO_RESUMO:
+            continue
+        n, total, ultimo = clientes.get(cliente_id, (0, 0.0, None))
+        if sinal > 0:
+            ultimo = data_hora if ultimo is None else max(ultimo, data_hora)
+        else:
+            removidos.append({"b_cliente_id": cliente_id, "b_atendimento_id": atendimento_id, "b_data_hora": data_hora})
+        clientes[cliente_id] = (n + sinal, total + sinal * float(valor or 0.0), ultimo)
+        for procedimento_id in procedimento_ids:
+            chave = (cliente_id, procedimento_id)
+            procedimentos[chave] = procedimentos.get(chave, 0) + sinal
+    if not clientes:
+        return
+
+    stmt = sqlite_insert(ResumoCliente)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ResumoCliente.cliente_id],
+        set_={
+            "n_atendimentos": ResumoCliente.n_atendimentos + stmt.excluded.n_atendimentos,
+            "total_gasto": ResumoCliente.total_gasto + stmt.excluded.total_gasto,
+            # MAX de vários argumentos é NULL se algum for NULL: o COALESCE mantém o valor existente
+            "ultimo_atendimento": func.max(
+                func.coalesce(ResumoCliente.ultimo_atendimento, stmt.excluded.ultimo_atendimento),
+                func.coalesce(stmt.excluded.ultimo_atendimento, ResumoCliente.ultimo_atendimento)
+            ),
+        }
+    )
+    db.execute(stmt, [
+        {"cliente_id": cliente_id, "n_atendimentos": n, "total_gasto": total, "ultimo_atendimento": ultimo}
+        for cliente_id, (n, total, ultimo) in clientes.items()
+    ])
+
+    if removidos:
+        ultimo_restante = select(func.max(Atendimento.data_hora)).where(
+            Atendimento.cliente_id == ResumoCliente.cliente_id,
+            Atendimento.id != bindparam("b_atendimento_id"),
+            Atendimento.status.is_distinct_from(STATUS_FORA_DO_RESUMO)
+        ).scalar_subquery()
+        # executemany do Core (o update do ORM com lista seria por chave primária)
+        db.connection().execute(
+            update(ResumoCliente).where(
+                ResumoCliente.cliente_id == bindparam("b_cliente_id"),
+                ResumoCliente.ultimo_atendimento <= bindparam("b_data_hora", type_=DateTime())
+            ).values(ultimo_atendimento=ultimo_restante),
+            removidos
+        )
+
+    linhas = [
+        {"cliente_id": cliente_id, "procedimento_id": procedimento_id, "quantidade": quantidade}
+        for (cliente_id, procedimento_id), quantidade in procedimentos.items()
+        if quantidade
+    ]
+    if linhas:
+        stmt = sqlite_insert(ResumoClienteProcedimento)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ResumoClienteProcedimento.cliente_id, ResumoClienteProcedimento.procedimento_id],
+            set_={"quantidade": ResumoClienteProcedimento.quantidade + stmt.excluded.quantidade}
+        )
+        db.execute(stmt, linhas)
+
+def popular_resumo_clientes(db: Session) -> int:
+    """
+    Grava o resumo de todos os clientes com atendimentos (tabelas vazias); não faz commit
+
+    Returns:
+        Número de clientes no resumo
+    """
+    resultado = db.execute(text(
+        "INSERT INTO resumo_clientes (cliente_id, n_atendimentos, total_gasto, ultimo_atendimento) "
+        "SELECT cliente_id, COUNT(*), SUM(valor_cobrado), MAX(data_hora) FROM atendimentos "
+        "WHERE status IS NOT :cancelado GROUP BY cliente_id"
+    ), {"cancelado": STATUS_FORA_DO_RESUMO})
+    db.execute(text(
+        "INSERT INTO resumo_cliente_procedimentos (cliente_id, procedimento_id, quantidade) "
+        "SELECT a.cliente_id, ap.procedimento_id, COUNT(*) "
+        "FROM atendimento_procedimentos ap JOIN atendimentos a ON a.id = ap.atendimento_id "
+        "WHERE a.status IS NOT :cancelado GROUP BY a.cliente_id, ap.procedimento_id"
+    ), {"cancelado": STATUS_FORA_DO_RESUMO})
+    return resultado.rowcount
+
+def reconstruir_resumo_clientes(db: Session) -> int:
+    """
+    Recalcula todo o resumo dos clientes a partir dos atendimentos
+
+    Returns:
+        Número de clientes no resumo
+    """
+    db.execute(text("DELETE FROM resumo_cliente_procedimentos"))
+    db.execute(text("DELETE FROM resumo_clientes"))
+    clientes = popular_resumo_clientes(db)
+    db.commit()
+    return clientes
@@ -0,0 +1,82 @@
+"""
+Manutenção do resumo diário de atendimentos (tabela atendimento_diario)
+"""
+
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import Atendimento, AtendimentoDiario
+
+# Chave do resumo: (dia, status)
+ChaveDiaria = Tuple[date, str]
+
+def chave_diaria(data_hora: datetime, status: Optional[str]) -> ChaveDiaria:
+    """Converte data/hora e status de um atendimento na chave do resumo"""
+    return data_hora.date(), status or ""
+
+def aplicar_variacoes(db: Session, variacoes: Dict[ChaveDiaria, Tuple[int, float]]) -> None:
+    """
+    Soma variações de (quantidade, valor) ao resumo com um único upsert
+
+    Não faz commit: deve rodar na mesma transação da alteração dos atendimentos.
+    """
+    linhas = [
+        {"dia": dia, "status": status, "quantidade": quantidade, "valor_total": valor}
+        for (dia, status), (quantidade, valor) in variacoes.items()
+        if quantidade or valor
+    ]
+    if not linhas:
+        return
+    stmt = sqlite_insert(AtendimentoDiario)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AtendimentoDiario.dia, AtendimentoDiario.status],
+        set_={
+            "quantidade": AtendimentoDiario.quantidade + stmt.excluded.quantidade,
+            "valor_total": AtendimentoDiario.valor_total + stmt.excluded.valor_total,
+        }
+    )
+    db.execute(stmt, linhas)
+
+def registrar_atendimentos(db: Session, atendimentos: Iterable[Tuple[datetime, Optional[str], float]], sinal: int = 1) -> None:
+    """
+    Registra (sinal=1) ou remove (sinal=-1) atendimentos do resumo
+
+    Args:
+        atendimentos: Tuplas (data_hora, status, valor_cobrado)
+    """
+    variacoes: Dict[ChaveDiaria, Tuple[int, float]] = {}
+    for data_hora, status, valor in atendimentos:
+        chave = chave_diaria(data_hora, status)
+        quantidade_atual, valor_atual = variacoes.get(chave, (0, 0.0))
+        variacoes[chave] = (quantidade_atual + sinal, valor_atual + sinal * float(valor or 0.0))
+    aplicar_variacoes(db, variacoes)
+
+def reconstruir_resumo_diario(db: Session) -> int:
+    """
+    Recalcula todo o resumo a partir da tabela atendimentos
+
+    Returns:
+        Número de linhas (dia, status) gravadas
+    """
+    dia = func.date(Atendimento.data_hora)
+    status = func.coalesce(Atendimento.status, "")
+    db.execute(delete(AtendimentoDiario))
+    resultado = db.execute(
+        insert(AtendimentoDiario).from_select(
+            ["dia", "status", "quantidade", "valor_total"],
+            select(dia, status, func.count(Atendimento.id), func.coalesce(func.sum(Atendimento.valor_cobrado), 0.0))
+            .group_by(dia, status)
+        )
+    )
+    db.commit()
+    return resultado.rowcount
+
+def garantir_resumo_diario(db: Session) -> None:
+    """Reconstrói o resumo se ele estiver vazio e já existirem atendimentos (ex: banco antigo)"""
+    vazio = db.query(AtendimentoDiario.dia).first() is None
+    if vazio and db.query(Atendimento.id).first() is not None:
+        reconstruir_resumo_diario(db)
@@ -0,0 +1,72 @@
+"""
+Serialização das respostas em uma única passada
+
+Os endpoints convertiam cada linha com Schema.model_validate e o FastAPI
+validava e serializava tudo de novo por causa do response_model. Aqui a
+resposta é validada uma vez (TypeAdapter em cache, lendo os atributos do
+ORM) e codificada direto em bytes, devolvendo um Response que o FastAPI
+não processa novamente.
+
+A saída é idêntica byte a byte à do JSONResponse do FastAPI. O orjson é
+usado quando disponível; como ele formata alguns floats de outra forma
+(1e16 contra 1e+16, 0.00005 contra 5e-05), respostas com números nessas
+faixas voltam para o json da biblioteca padrão.
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+# Números que o orjson escreve diferente do json: com expoente (1e16, 1e-7)
+# ou 0 < |x| < 1e-4 (0.00005). Textos que casem por acaso só custam o fallback.
+_EXPOENTE_ORJSON = re.compile(rb"e[-\d]")
+_DECIMAL_PEQUENO_ORJSON = b"0.0000"
+
+@lru_cache(maxsize=None)
+def adaptador(tipo: Any) -> TypeAdapter:
+    """TypeAdapter em cache por tipo (construir o schema é caro)"""
+    return TypeAdapter(tipo)
+
+def _json_padrao(dados: Any) -> bytes:
+    """Mesma codificação do JSONResponse do Starlette"""
+    return json.dumps(
+        dados, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+def codificar_json(dados: Any) -> bytes:
+    """Codifica tipos JSON nativos com orjson, mantendo a saída do json padrão"""
+    if orjson is None:
+        return _json_padrao(dados)
+    saida = orjson.dumps(dados)
+    if _DECIMAL_PEQUENO_ORJSON in saida or _EXPOENTE_ORJSON.search(saida):
+        return _json_padrao(dados)
+    return saida
+
+def serializar(tipo: Any, conteudo: Any) -> bytes:
+    """
+    Valida o conteúdo (objetos ORM, dicts ou schemas) contra o tipo e gera o JSON
+
+    Args:
+        tipo: Schema Pydantic ou tipo genérico (ex: List[Material])
+        conteudo: Dados a serializar; atributos de objetos ORM são lidos diretamente
+    """
+    tipo_adaptador = adaptador(tipo)
+    valor = tipo_adaptador.validate_python(conteudo, from_attributes=True)
+    return codificar_json(tipo_adaptador.dump_python(valor, mode="json"))
+
+def resposta_json(tipo: Any, conteudo: Any, status_code: int = 200) -> Response:
+    """Response JSON pronto, sem a segunda validação do response_model"""
+    return Response(
+        content=serializar(tipo, conteudo),
+        status_code=status_code,
+        media_type="application/json"
+    )
@@ -0,0 +1,41 @@
+"""
+Normalização de telefones para busca
+
+O telefone é guardado como digitado; ao lado ficam só os dígitos do
+número nacional (DDD + número) e esses dígitos invertidos. A coluna
+invertida é indexada: o número completo vira uma igualdade e o final do
+número (ex: sem DDD) vira um intervalo de prefixo, ambos uma única
+busca no índice.
+"""
+
+import re
+
+# DDD (2 dígitos) + celular (9 dígitos)
+DIGITOS_NUMERO_NACIONAL = 11
+
+# Menor final de número aceito na busca por telefone
+MINIMO_DIGITOS_BUSCA = 4
+
+_NAO_DIGITOS = re.compile(r"\D")
+
+def normalizar_telefone(telefone: str) -> str:
+    """
+    Dígitos do número nacional: "+55 (11) 99999-1111" -> "11999991111"
+
+    Números mais longos que DDD + celular perdem o zero de discagem e o
+    código do país (55).
+    """
+    digitos = _NAO_DIGITOS.sub("", telefone or "")
+    if len(digitos) > DIGITOS_NUMERO_NACIONAL:
+        digitos = digitos.lstrip("0")
+    if len(digitos) > DIGITOS_NUMERO_NACIONAL and digitos.startswith("55"):
+        digitos = digitos[2:]
+    return digitos
+
+def inverter_telefone(telefone_normalizado: str) -> str:
+    """Dígitos invertidos: busca pelo final do número vira busca por prefixo"""
+    return telefone_normalizado[::-1]
+
+def parece_telefone(termo: str) -> bool:
+    """Termo só com dígitos e pontuação de telefone, com dígitos suficientes para a busca"""
+    return bool(re.fullmatch(r"[\d\s()+\-.]+", termo)) and len(normalizar_telefone(termo)) >= MINIMO_DIGITOS_BUSCA
@@ -0,0 +1,142 @@
+"""
+Relatório de valorização e giro do estoque
+
+Uma única consulta agregada traz, para cada material ativo, o saldo, o
+valor em estoque e o consumo no período. O consumo vem dos acumulados de
+consumo_diario (acumulado no fim menos o acumulado antes do início, duas
+buscas pela chave primária por material), então o custo não depende do
+tamanho do período nem de atendimento_materiais. Os totais por unidade e
+a ordenação são feitos sobre as linhas da consulta.
+
+- giro: valor consumido no período / valor em estoque
+- dias_cobertura: dias que o saldo dura no ritmo de consumo do período
+  (quantidade por material e unidade, valor nos totais)
+
+Ambos ficam None quando o divisor é zero (sem estoque ou sem consumo).
+"""
+
+import heapq
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import ConsumoDiario, Material
+
+def _razao(numerador: float, denominador: float) -> Optional[float]:
+    return numerador / denominador if denominador > 0 else None
+
+def _indicadores(estoque: float, consumido: float, valor_estoque: float, valor_consumido: float, dias: int) -> dict:
+    return {
+        "giro": _razao(valor_consumido, valor_estoque),
+        "dias_cobertura": _razao(estoque * dias, consumido),
+    }
+
+# Critérios de ordenação da lista de materiais sobre as linhas
+# (id, nome, unidade, quantidade, valor_unitario, consumido, valor_consumido):
+# valor usado na ordenação e se ela é decrescente
+ORDENACOES: Dict[str, Tuple[Callable[[tuple, int], Optional[float]], bool]] = {
+    "valor_estoque": (lambda l, dias: l[3] * l[4], True),
+    "valor_consumido": (lambda l, dias: l[6], True),
+    "giro": (lambda l, dias: _razao(l[6], l[3] * l[4]), True),
+    "dias_cobertura": (lambda l, dias: _razao(l[3] * dias, l[5]), False),
+}
+
+def _acumulado(coluna, ate):
+    """Acumulado do material na última linha de consumo_diario que satisfaz ate (0 se não houver)"""
+    return func.coalesce(
+        select(coluna)
+        .where(ConsumoDiario.material_id == Material.id, ate)
+        .order_by(ConsumoDiario.dia.desc())
+        .limit(1)
+        .scalar_subquery(),
+        0.0
+    )
+
+def relatorio_valorizacao(
+    db: Session,
+    data_inicio: date,
+    data_fim: date,
+    ordenar_por: str = "valor_estoque",
+    limit: int = 100
+) -> dict:
+    """
+    Valorização, consumo, giro e cobertura por material e por unidade
+
+    Args:
+        data_inicio, data_fim: Período de consumo (inclusive)
+        ordenar_por: Chave de ORDENACOES para a lista de materiais
+        limit: Quantidade de materiais na lista (os totais consideram todos)
+    """
+    dias = (data_fim - data_inicio).days + 1
+    # Consulta Core pela conexão: as 10k+ linhas não passam pelo carregamento do ORM
+    linhas = db.connection().execute(
+        select(
+            Material.id, Material.nome, Material.unidade, Material.quantidade_disponivel, Material.valor_unitario,
+            _acumulado(ConsumoDiario.quantidade_acumulada, ConsumoDiario.dia <= data_fim)
+            - _acumulado(ConsumoDiario.quantidade_acumulada, ConsumoDiario.dia < data_inicio),
+            _acumulado(ConsumoDiario.valor_acumulado, ConsumoDiario.dia <= data_fim)
+            - _acumulado(ConsumoDiario.valor_acumulado, ConsumoDiario.dia < data_inicio),
+        ).where(Material.ativo == True)
+    ).all()
+
+    unidades: Dict[str, List[float]] = {}
+    for _, _, unidade, quantidade, valor_unitario, consumido, valor_consumido in linhas:
+        soma = unidades.get(unidade)
+        if soma is None:
+            soma = unidades[unidade] = [0, 0.0, 0.0, 0.0, 0.0]
+        soma[0] += 1
+        soma[1] += quantidade
+        soma[2] += quantidade * valor_unitario
+        soma[3] += consumido
+        soma[4] += valor_consumido
+    por_unidade = [
+        {
+            "unidade": unidade,
+            "materiais": n,
+            "quantidade_disponivel": quantidade,
+            "valor_estoque": valor_estoque,
+            "quantidade_consumida": consumido,
+            "valor_consumido": valor_consumido,
+            **_indicadores(quantidade, consumido, valor_estoque, valor_consumido, dias),
+        }
+        for unidade, (n, quantidade, valor_estoque, consumido, valor_consumido) in sorted(unidades.items())
+    ]
+    valor_estoque = sum(u["valor_estoque"] for u in por_unidade)
+    valor_consumido = sum(u["valor_consumido"] for u in por_unidade)
+
+    # Só os materiais da página viram dicionários; None (divisor zero) fica no fim
+    valor, decrescente = ORDENACOES[ordenar_por]
+    def chave(linha):
+        v = valor(linha, dias)
+        return (v is None, -v if decrescente and v is not None else v or 0, linha[0])
+    materiais = [
+        {
+            "id": id_,
+            "nome": nome,
+            "unidade": unidade,
+            "quantidade_disponivel": quantidade,
+            "valor_unitario": valor_unitario,
+            "valor_estoque": quantidade * valor_unitario,
+            "quantidade_consumida": consumido,
+            "valor_consumido": valor_consumido_material,
+            **_indicadores(quantidade, consumido, quantidade * valor_unitario, valor_consumido_material, dias),
+        }
+        for id_, nome, unidade, quantidade, valor_unitario, consumido, valor_consumido_material
+        in heapq.nsmallest(limit, linhas, key=chave)
+    ]
+
+    return {
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "dias": dias,
+        "totais": {
+            "materiais": len(linhas),
+            "valor_estoque": valor_estoque,
+            "valor_consumido": valor_consumido,
+            **_indicadores(valor_estoque, valor_consumido, valor_estoque, valor_consumido, dias),
+        },
+        "por_unidade": por_unidade,
+        "materiais": materiais,
+    }
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark do agrupamento de materiais similares (catálogos sintéticos)
+
+Mede agrupar_indices (blocking pelo IndiceNgramas, no máximo
+MAXIMO_CANDIDATOS pontuados por nome, + union-find) com 1k, 10k e 100k
+materiais, no processo atual e em um pool de processos. A comparação de
+todos os pares usada antes só roda até --limite-anterior materiais.
+
+Uso:
+    python scripts/benchmark_agrupamento.py [--tamanhos 1000 10000 100000] [--processos 4]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.utils.agrupamento_materiais import agrupar_indices
+from app.utils.material_normalizer import calcular_similaridade
+from benchmark_busca_materiais import nome_material
+
+def agrupamento_anterior(nomes, threshold):
+    """Comparação de todos os pares, como o agrupar_materiais_similares anterior"""
+    processados = set()
+    grupos = []
+    for i in range(len(nomes)):
+        if i in processados:
+            continue
+        grupo = [i]
+        processados.add(i)
+        for j in range(i + 1, len(nomes)):
+            if j not in processados and calcular_similaridade(nomes[i], nomes[j]) >= threshold:
+                grupo.append(j)
+                processados.add(j)
+        grupos.append(grupo)
+    return grupos
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--processos", type=int, default=os.cpu_count())
+    parser.add_argument("--limite-anterior", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"📊 Agrupamento com threshold {args.threshold} ({os.cpu_count()} CPUs)")
+    for tamanho in args.tamanhos:
+        rng = random.Random(tamanho)
+        # Catálogo de várias clínicas: parte dos nomes repetida com outra grafia
+        nomes = [nome_material(rng) for _ in range(tamanho)]
+        nomes = [n.upper() if rng.random() < 0.2 else n for n in nomes]
+
+        grupos, t_atual = cronometrar(lambda: agrupar_indices(nomes, args.threshold))
+        linha = f"   {tamanho:>7} materiais: {len(grupos):>7} grupos   atual {t_atual:8.2f} s"
+        if args.processos and args.processos > 1:
+            grupos_pool, t_pool = cronometrar(lambda: agrupar_indices(nomes, args.threshold, args.processos))
+            assert grupos_pool == grupos
+            linha += f"   {args.processos} processos {t_pool:8.2f} s"
+        if tamanho <= args.limite_anterior:
+            grupos_anterior, t_anterior = cronometrar(lambda: agrupamento_anterior(nomes, args.threshold))
+            linha += f"   todos os pares {t_anterior:8.2f} s ({len(grupos_anterior)} grupos)"
+        print(linha)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark do autocompletar de clientes (banco SQLite temporário)
+
+Gera um cadastro sintético de clientes, mede a construção do índice em
+memória e o tempo de cada sugestão (índice + leitura da versão no banco)
+para prefixos curtos e longos de nome e de telefone, comparando com a
+busca pelo índice FTS5. Mede também a atualização do índice no commit.
+
+Uso:
+    python scripts/benchmark_autocomplete_clientes.py [--clientes 100000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Cliente
+from app.utils.autocomplete_clientes import autocompletar, carregar_indice_clientes, estatisticas_indice_clientes
+from app.utils.busca_clientes import pesquisar_clientes
+
+sys.path.append(os.path.dirname(__file__))
+from benchmark_busca_clientes import popular
+
+TERMOS = ["a", "jo", "Mar", "conceica", "maria simoes", "11", "9987", "(21) 98", "zzzz"]
+
+def medir(funcao, repeticoes: int = 200) -> float:
+    """Mediana em ms"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = create_engine(f"sqlite:///{os.path.join(diretorio, 'benchmark.db')}")
+        Base.metadata.create_all(bind=engine)
+        Sessao = sessionmaker(bind=engine)
+        with Sessao() as sessao:
+            popular(sessao, args.clientes, random.Random(42))
+
+        with Sessao() as sessao:
+            carregar_indice_clientes(sessao)
+            estatisticas = estatisticas_indice_clientes()
+            print(f"📊 {args.clientes} clientes, {estatisticas['chaves']} chaves "
+                  f"({estatisticas['ultima_reconstrucao_ms']:.0f} ms para construir o índice)")
+            for termo in TERMOS:
+                sugestoes = autocompletar(sessao, termo, 10)
+                t_indice = medir(lambda: autocompletar(sessao, termo, 10))
+                t_fts = medir(lambda: pesquisar_clientes(sessao, termo, 0, 10), repeticoes=5)
+                print(f"   {termo!r:16} {len(sugestoes):3d} sugestões   índice {t_indice:6.3f} ms   FTS5 {t_fts:7.1f} ms")
+
+        with Sessao() as sessao:
+            cliente = sessao.get(Cliente, 1)
+            inicio = time.perf_counter()
+            for i in range(100):
+                cliente.nome = f"Cliente Renomeado {i}"
+                sessao.commit()
+            t_commit = (time.perf_counter() - inicio) * 10
+            print(f"✅ Alteração com atualização do índice no commit: {t_commit:.2f} ms "
+                  f"(reconstruções: {estatisticas_indice_clientes()['reconstrucoes']})")
+
+if __name__ == "__main__":
+    main()
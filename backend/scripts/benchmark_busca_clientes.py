@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark da busca de clientes (banco SQLite temporário)
+
+Gera um cadastro sintético de clientes e compara a busca antiga
+(ilike '%termo%' em nome e telefone) com a busca pelo índice FTS5, para
+termos com e sem acento, prefixos e telefone.
+
+Uso:
+    python scripts/benchmark_busca_clientes.py [--clientes 500000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine, insert, or_
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Cliente
+from app.utils.busca_clientes import pesquisar_clientes
+
+NOMES = ["João", "Maria", "José", "Ana", "Antônio", "Francisca", "Carlos", "Paula", "Lúcia", "Marcos",
+         "Juliana", "Fábio", "Patrícia", "Sérgio", "Fernanda", "Márcio", "Cláudia", "Rafael", "Débora", "Vinícius"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima",
+              "Gomes", "Ribeiro", "Carvalho", "Araújo", "Conceição", "Gonçalves", "Magalhães", "Brandão", "Simões"]
+TERMOS = ["joao", "Conceicao", "magal", "maria simoes", "99871", "zzzz"]
+
+def popular(sessao, quantidade: int, rng: random.Random) -> None:
+    for inicio in range(0, quantidade, 50000):
+        sessao.execute(insert(Cliente), [
+            {
+                "nome": f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}",
+                "telefone": f"({rng.randint(11, 99)}) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                "email": None,
+                "observacao": "Cliente antigo" if rng.random() < 0.1 else None,
+            }
+            for _ in range(min(50000, quantidade - inicio))
+        ])
+    sessao.commit()
+
+def medir(funcao, repeticoes: int = 5) -> float:
+    """Mediana em ms"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+def busca_ilike(sessao, termo: str):
+    """Busca anterior ao índice: varre a tabela e não ignora acentos"""
+    return sessao.query(Cliente).filter(
+        or_(Cliente.nome.ilike(f"%{termo}%"), Cliente.telefone.ilike(f"%{termo}%"))
+    ).order_by(Cliente.nome).limit(50).all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=500000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = create_engine(f"sqlite:///{os.path.join(diretorio, 'benchmark.db')}")
+        Base.metadata.create_all(bind=engine)
+        Sessao = sessionmaker(bind=engine)
+        with Sessao() as sessao:
+            inicio = time.perf_counter()
+            popular(sessao, args.clientes, random.Random(42))
+            t_carga = time.perf_counter() - inicio
+
+        print(f"📊 {args.clientes} clientes ({t_carga:.1f} s para inserir, com os triggers do índice)")
+        with Sessao() as sessao:
+            for termo in TERMOS:
+                _, total = pesquisar_clientes(sessao, termo)
+                t_fts = medir(lambda: pesquisar_clientes(sessao, termo))
+                t_ilike = medir(lambda: busca_ilike(sessao, termo), repeticoes=3)
+                print(f"   {termo!r:16} {total:7d} encontrados   FTS5 {t_fts:7.1f} ms   ilike {t_ilike:7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark da busca aproximada de materiais (catálogo sintético)
+
+Compara a varredura linear de encontrar_materiais_similares com o
+IndiceNgramas nos thresholds usados pelas rotas (0.9 no criar-ou-buscar,
+0.8 na busca de similares). O tempo do índice é o melhor de --repeticoes
+execuções de cada busca, com o coletor de lixo desligado (como o timeit).
+
+A busca pelo índice é aproximada; o benchmark confere que ela devolve
+parte da busca linear com as mesmas similaridades e na mesma ordem, e
+mostra quantas buscas acharam o material mais parecido e quantos dos
+MAXIMO_CANDIDATOS nomes mais parecidos da busca linear foram encontrados.
+
+Uso:
+    python scripts/benchmark_busca_materiais.py [--materiais 50000] [--buscas 50] [--repeticoes 5]
+"""
+
+import argparse
+import gc
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.utils.indice_materiais import MAXIMO_CANDIDATOS, IndiceNgramas
+from app.utils.material_normalizer import encontrar_materiais_similares, normalizar_nome, normalizar_nomes
+
+PRODUTOS = [
+    "Seringa", "Agulha", "Ácido Hialurônico", "Toxina Botulínica", "Luva", "Gaze", "Algodão",
+    "Lidocaína", "Fio de PDO", "Cateter", "Esparadrapo", "Máscara", "Álcool 70%", "Soro Fisiológico",
+    "Bisturi", "Anestésico Tópico", "Creme Hidratante", "Peeling Químico", "Preenchedor", "Bioestimulador",
+    "Microcânula", "Ampola de Vitamina C", "Frasco Coletor", "Kit de Microagulhamento", "Touca", "Avental",
+    "Compressa", "Clorexidina", "Protetor Solar", "Sérum", "Máscara Facial", "Dermaroller", "Lâmina",
+    "Hidroxiapatita de Cálcio", "Ácido Polilático", "Enzima Hialuronidase", "Esfoliante", "Tônico Facial",
+]
+MARCAS = [
+    "BD", "Descarpack", "Juvederm", "Restylane", "Rennova", "Botox", "Dysport", "Xeomin", "Sculptra",
+    "Radiesse", "Cremer", "Medix", "Supermax", "Nipro", "Injex", "Labor", "Cristália", "Vichy", "Isdin",
+    "La Roche", "Adcos", "Mesoestetic", "Skinceuticals", "Galderma", "Allergan", "Merz", "Sanobiol",
+]
+APRESENTACOES = ["1ml", "3ml", "5ml", "10ml", "100un", "50un", "30g", "13x4,5mm", "22G", "25G", "30G", "P", "M", "G"]
+
+def nome_material(rng: random.Random) -> str:
+    """Nome no formato usado nos cadastros: produto, marca, apresentação e às vezes um código"""
+    partes = [rng.choice(PRODUTOS), rng.choice(MARCAS), rng.choice(APRESENTACOES)]
+    if rng.random() < 0.5:
+        partes.append(f"Ref {rng.randint(100, 99999)}")
+    return " ".join(partes)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--materiais", type=int, default=50000)
+    parser.add_argument("--buscas", type=int, default=50)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    materiais = [{"id": i + 1, "nome": nome_material(rng)} for i in range(args.materiais)]
+    for material, nome_norm in zip(materiais, normalizar_nomes(m["nome"] for m in materiais)):
+        material["nome_normalizado"] = nome_norm
+    # Buscas com nomes do catálogo levemente alterados e nomes novos
+    buscas = [rng.choice(materiais)["nome"].replace("a", "", 1) for _ in range(args.buscas // 2)]
+    buscas += [nome_material(rng) for _ in range(args.buscas - len(buscas))]
+
+    inicio = time.perf_counter()
+    indice = IndiceNgramas((m["id"], m["nome_normalizado"], bool(m["nome"])) for m in materiais)
+    print(f"📊 {args.materiais} materiais, índice construído em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    for threshold in (0.9, 0.8):
+        linear, indexada = [], []
+        coerentes, com_melhor, encontrados, mais_parecidos = True, 0, 0, 0
+        for nome in buscas:
+            inicio = time.perf_counter()
+            esperado = [(m["id"], m["similaridade"]) for m in encontrar_materiais_similares(nome, materiais, threshold)]
+            linear.append(time.perf_counter() - inicio)
+
+            gc.disable()
+            melhor = math.inf
+            for _ in range(args.repeticoes):
+                inicio = time.perf_counter()
+                obtido = indice.buscar(normalizar_nome(nome), threshold)
+                melhor = min(melhor, time.perf_counter() - inicio)
+            gc.enable()
+            indexada.append(melhor)
+
+            ids = {material_id for material_id, _ in obtido}
+            coerentes &= obtido == [r for r in esperado if r[0] in ids]
+            com_melhor += not esperado or esperado[0][0] in ids
+            nomes_obtidos = {indice.nomes[material_id] for material_id in ids}
+            nomes_esperados = list(dict.fromkeys(indice.nomes[material_id] for material_id, _ in esperado))
+            nomes_esperados = nomes_esperados[:MAXIMO_CANDIDATOS]
+            encontrados += len(nomes_obtidos.intersection(nomes_esperados))
+            mais_parecidos += len(nomes_esperados)
+
+        linear.sort()
+        indexada.sort()
+        print(
+            f"   threshold {threshold}: linear p50 {linear[len(linear) // 2] * 1000:8.1f} ms   "
+            f"índice p50 {indexada[len(indexada) // 2] * 1000:5.2f} ms   "
+            f"p99 {indexada[math.ceil(len(indexada) * 0.99) - 1] * 1000:5.2f} ms   "
+            f"melhor resultado em {com_melhor}/{len(buscas)}   "
+            f"{encontrados}/{mais_parecidos} dos {MAXIMO_CANDIDATOS} mais parecidos"
+            f"{'' if coerentes else '   ❌ SIMILARIDADES OU ORDEM DIFERENTES'}"
+        )
+
+if __name__ == "__main__":
+    main()
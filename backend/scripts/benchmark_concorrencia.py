@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark de requisições concorrentes contra a API
+
+Compara a listagem de atendimentos executada como antes (async def
+chamando a sessão síncrona direto no event loop) e como agora (def, no
+threadpool). Mede vazão da listagem e latência de /health sob carga: com
+o event loop bloqueado, requisições leves esperam as consultas pesadas.
+
+As duas versões rodam no mesmo processo, com o ajuste do coletor de lixo
+de app.main (--sem-ajuste-gc volta ao padrão do Python), alternadas por
+--rodadas; o resultado é a mediana das rodadas. A versão atual roda com o
+threadpool limitado na inicialização (THREADPOOL_TAMANHO).
+
+Uso:
+    python scripts/benchmark_concorrencia.py [--atendimentos 5000] [--concorrencia 16] [--segundos 5]
+                                             [--rodadas 3] [--sem-ajuste-gc]
+"""
+
+import argparse
+import asyncio
+import functools
+import gc
+import inspect
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Tuple
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import _criar_engine_leitura, get_db, get_db_leitura
+from app.main import app as app_atual, health_check
+from app.models import Base, Cliente, Procedimento, Atendimento, AtendimentoProcedimento
+from app.routers.atendimentos import listar_atendimentos
+from app.schemas import AtendimentoList
+
+def popular_banco(url: str, quantidade: int, conexoes: int) -> Tuple[sessionmaker, sessionmaker]:
+    """
+    Cria um banco temporário com `quantidade` atendimentos
+
+    Returns:
+        (sessões de escrita, sessões somente leitura) ligadas ao banco
+        temporário, como get_db e get_db_leitura na aplicação
+    """
+    engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=conexoes)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Cliente), [{"nome": f"Cliente {i}", "telefone": f"11{i:09d}"} for i in range(100)])
+        conn.execute(insert(Procedimento), [{"nome": "Botox", "valor_padrao": 800.0}])
+        inicio = datetime(2023, 1, 1)
+        conn.execute(insert(Atendimento), [
+            {"cliente_id": i % 100 + 1, "data_hora": inicio + timedelta(hours=i), "valor_cobrado": 800.0}
+            for i in range(quantidade)
+        ])
+        conn.execute(insert(AtendimentoProcedimento), [
+            {"atendimento_id": i + 1, "procedimento_id": 1, "valor_cobrado": 800.0}
+            for i in range(quantidade)
+        ])
+    engine_leitura = _criar_engine_leitura(url)
+    return (
+        sessionmaker(autocommit=False, autoflush=False, bind=engine),
+        sessionmaker(autocommit=False, autoflush=False, bind=engine_leitura),
+    )
+
+def app_bloqueante() -> FastAPI:
+    """Recria o comportamento anterior: a listagem como async def no event loop"""
+    app = FastAPI()
+
+    @functools.wraps(listar_atendimentos)
+    async def listar_no_event_loop(*args, **kwargs):
+        return listar_atendimentos(*args, **kwargs)
+    listar_no_event_loop.__signature__ = inspect.signature(listar_atendimentos)
+
+    app.add_api_route("/api/v1/atendimentos", listar_no_event_loop, response_model=AtendimentoList)
+    app.add_api_route("/health", health_check)
+    return app
+
+async def medir(app: FastAPI, concorrencia: int, segundos: float) -> dict:
+    """Dispara listagens concorrentes e mede /health em paralelo"""
+    # O ASGITransport não dispara o lifespan: executa a inicialização aqui,
+    # no event loop da medição (o limite do threadpool é por event loop)
+    for inicializar in app.router.on_startup:
+        await inicializar()
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as client:
+        fim = time.perf_counter() + segundos
+        concluidas = 0
+        latencias_health = []
+
+        async def carga():
+            nonlocal concluidas
+            while time.perf_counter() < fim:
+                response = await client.get("/api/v1/atendimentos", params={"limit": 100, "incluir_total": False})
+                response.raise_for_status()
+                # Página vazia: a listagem não está lendo o banco do benchmark
+                assert len(response.json()["atendimentos"]) == 100
+                concluidas += 1
+
+        async def sonda():
+            # A latência conta a partir do horário agendado, para incluir o
+            # tempo em que o event loop ficou bloqueado e não acordou a sonda
+            while time.perf_counter() < fim:
+                agendado = time.perf_counter() + 0.05
+                await asyncio.sleep(0.05)
+                (await client.get("/health")).raise_for_status()
+                latencias_health.append((time.perf_counter() - agendado) * 1000)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(sonda(), *(carga() for _ in range(concorrencia)))
+        duracao = time.perf_counter() - inicio
+
+    latencias_health.sort()
+    return {
+        "req_s": concluidas / duracao,
+        "health_p50_ms": statistics.median(latencias_health),
+        "health_p95_ms": latencias_health[int(len(latencias_health) * 0.95) - 1],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--atendimentos", type=int, default=5000)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--rodadas", type=int, default=3)
+    parser.add_argument("--sem-ajuste-gc", action="store_true", help="Coletor de lixo com a configuração padrão do Python")
+    args = parser.parse_args()
+
+    if args.sem_ajuste_gc:
+        gc.unfreeze()
+        gc.set_threshold(700, 10, 10)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        SessionBenchmark, SessionBenchmarkLeitura = popular_banco(
+            f"sqlite:///{diretorio}/benchmark.db", args.atendimentos, args.concorrencia + 1
+        )
+
+        def sessao(fabrica: sessionmaker):
+            def get_db_benchmark():
+                db = fabrica()
+                try:
+                    yield db
+                finally:
+                    db.close()
+            return get_db_benchmark
+
+        # As duas dependências apontam para o banco temporário: a listagem usa a de leitura
+        overrides = {get_db: sessao(SessionBenchmark), get_db_leitura: sessao(SessionBenchmarkLeitura)}
+        versoes = (("antes (async def)", app_bloqueante()), ("agora (threadpool)", app_atual))
+        rodadas = {nome: [] for nome, _ in versoes}
+        # Versões alternadas: variações da máquina afetam as duas igualmente
+        for _ in range(args.rodadas):
+            for nome, app in versoes:
+                app.dependency_overrides.update(overrides)
+                try:
+                    rodadas[nome].append(asyncio.run(medir(app, args.concorrencia, args.segundos)))
+                finally:
+                    for dependencia in overrides:
+                        app.dependency_overrides.pop(dependencia, None)
+
+    print(
+        f"📊 {args.atendimentos} atendimentos, {args.concorrencia} requisições simultâneas, "
+        f"{args.rodadas} rodadas de {args.segundos:.0f}s (mediana), "
+        f"coletor de lixo {'padrão' if args.sem_ajuste_gc else 'ajustado'}"
+    )
+    for nome, medicoes in rodadas.items():
+        mediana = {chave: statistics.median(m[chave] for m in medicoes) for chave in medicoes[0]}
+        print(
+            f"   {nome:<20} {mediana['req_s']:8.1f} req/s   "
+            f"/health p50 {mediana['health_p50_ms']:7.1f} ms   p95 {mediana['health_p95_ms']:7.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark da consolidação de materiais duplicados (banco SQLite temporário)
+
+Gera um catálogo sintético em que parte dos nomes se repete com outra
+grafia (maiúsculas, acentos removidos, espaços), com referências em
+atendimento_materiais, procedimento_materiais e no livro-razão, e mede o
+dry-run e a consolidação aplicada.
+
+Uso:
+    python scripts/benchmark_consolidacao.py [--materiais 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import unicodedata
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine, insert, select, func
+from sqlalchemy.orm import sessionmaker
+
+from app.models import (
+    Base, Atendimento, AtendimentoMaterial, Cliente, Material, MovimentacaoEstoque, Procedimento,
+    ProcedimentoMaterial
+)
+from app.utils.consolidacao_materiais import consolidar_materiais
+from app.utils.material_normalizer import normalizar_nomes
+from benchmark_busca_materiais import nome_material
+
+def variante(nome: str, rng: random.Random) -> str:
+    """Mesmo material com outra grafia"""
+    escolha = rng.random()
+    if escolha < 0.4:
+        return nome.upper()
+    if escolha < 0.8:
+        return "".join(c for c in unicodedata.normalize("NFD", nome) if not unicodedata.combining(c))
+    return f"  {nome.replace(' ', '  ')} "
+
+def popular(sessao, quantidade: int, rng: random.Random) -> None:
+    nomes = []
+    for _ in range(quantidade):
+        nomes.append(variante(rng.choice(nomes), rng) if nomes and rng.random() < 0.3 else nome_material(rng))
+    agora = datetime.utcnow()
+    sessao.execute(insert(Material), [
+        {
+            "nome": nome, "nome_normalizado": nome_norm, "quantidade_disponivel": float(rng.randint(0, 50)),
+            "unidade": "un", "valor_unitario": float(rng.randint(1, 300)), "estoque_minimo": float(rng.randint(0, 5)),
+            "ativo": True, "data_cadastro": agora
+        }
+        for nome, nome_norm in zip(nomes, normalizar_nomes(nomes))
+    ])
+    sessao.execute(insert(Cliente), [{"nome": "Cliente", "telefone": "0"}])
+    sessao.execute(insert(Procedimento), [{"nome": f"Procedimento {i}", "valor_padrao": 100.0} for i in range(500)])
+    sessao.execute(insert(Atendimento), [
+        {"cliente_id": 1, "data_hora": agora, "valor_cobrado": 100.0} for _ in range(quantidade // 2)
+    ])
+    sessao.execute(insert(AtendimentoMaterial), [
+        {
+            "atendimento_id": rng.randint(1, quantidade // 2), "material_id": rng.randint(1, quantidade),
+            "quantidade_utilizada": 1.0, "valor_unitario_momento": 10.0
+        }
+        for _ in range(quantidade)
+    ])
+    sessao.execute(insert(ProcedimentoMaterial), [
+        {"procedimento_id": rng.randint(1, 500), "material_id": rng.randint(1, quantidade), "quantidade_padrao": 1.0}
+        for _ in range(quantidade // 20)
+    ])
+    sessao.execute(insert(MovimentacaoEstoque), [
+        {"material_id": i, "quantidade": 1.0, "tipo": "inicial", "data_hora": agora} for i in range(1, quantidade + 1)
+    ])
+    sessao.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--materiais", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = create_engine(f"sqlite:///{os.path.join(diretorio, 'benchmark.db')}")
+        Base.metadata.create_all(bind=engine)
+        Sessao = sessionmaker(bind=engine)
+        with Sessao() as sessao:
+            popular(sessao, args.materiais, random.Random(42))
+
+        with Sessao() as sessao:
+            inicio = time.perf_counter()
+            relatorio = consolidar_materiais(sessao)
+            t_dry_run = time.perf_counter() - inicio
+
+        with Sessao() as sessao:
+            inicio = time.perf_counter()
+            aplicado = consolidar_materiais(sessao, aplicar=True)
+            sessao.commit()
+            t_aplicar = time.perf_counter() - inicio
+            ativos = sessao.execute(select(func.count()).where(Material.ativo == True)).scalar()
+
+        assert aplicado["referencias"] == relatorio["referencias"]
+        print(f"📊 {args.materiais} materiais: {len(relatorio['grupos'])} grupos, "
+              f"{relatorio['materiais_desativados']} duplicados, {ativos} ativos após a consolidação")
+        print(f"   referências: {relatorio['referencias']}")
+        print(f"   dry-run {t_dry_run:6.2f} s   aplicada {t_aplicar:6.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark da importação de clientes por CSV (banco SQLite temporário)
+
+Gera uma planilha sintética (com duplicados e linhas inválidas), importa
+com importar_clientes_csv e compara com a inserção de um cliente por
+requisição (um commit por linha, como em POST /clientes). O pico de
+memória da importação é medido com tracemalloc em uma segunda rodada,
+que só encontra duplicados.
+
+Uso:
+    python scripts/benchmark_importacao_clientes.py [--linhas 50000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Cliente
+from app.utils.importacao_clientes import importar_clientes_csv
+
+sys.path.append(os.path.dirname(__file__))
+from benchmark_busca_clientes import NOMES, SOBRENOMES
+
+def gerar_planilha(caminho: str, linhas: int, rng: random.Random) -> None:
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write("nome;telefone;email;observacao\n")
+        anteriores = []
+        for i in range(linhas):
+            sorteio = rng.random()
+            if sorteio < 0.05 and anteriores:
+                arquivo.write(rng.choice(anteriores))  # repetida no arquivo
+                continue
+            if sorteio < 0.07:
+                arquivo.write(f"Sem Telefone {i};;;\n")
+                continue
+            linha = (f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {i};"
+                     f"({rng.randint(11, 99)}) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)};;\n")
+            anteriores = (anteriores + [linha])[-100:]
+            arquivo.write(linha)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        planilha = os.path.join(diretorio, "clientes.csv")
+        gerar_planilha(planilha, args.linhas, random.Random(42))
+        engine = create_engine(f"sqlite:///{os.path.join(diretorio, 'benchmark.db')}")
+        Base.metadata.create_all(bind=engine)
+        Sessao = sessionmaker(bind=engine)
+
+        with Sessao() as sessao, open(planilha, "rb") as arquivo:
+            inicio = time.perf_counter()
+            resumo = importar_clientes_csv(sessao, arquivo)
+            t_importacao = time.perf_counter() - inicio
+        print(f"📊 {args.linhas} linhas: {resumo['inseridos']} inseridos, {resumo['duplicados']} duplicados, "
+              f"{resumo['invalidos']} inválidos em {t_importacao:.2f} s")
+
+        with Sessao() as sessao, open(planilha, "rb") as arquivo:
+            tracemalloc.start()
+            resumo = importar_clientes_csv(sessao, arquivo)
+            pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+        print(f"   Reimportação: {resumo['duplicados']} duplicados, pico de memória {pico:.1f} MB")
+
+        amostra = 2000
+        with Sessao() as sessao:
+            inicio = time.perf_counter()
+            for i in range(amostra):
+                sessao.add(Cliente(nome=f"Cliente avulso {i}", telefone=f"(11) 9{i:04d}-0000"))
+                sessao.commit()
+            t_avulso = (time.perf_counter() - inicio) / amostra
+            total = sessao.query(func.count(Cliente.id)).scalar()
+        print(f"   Um commit por cliente: {t_avulso * 1000:.2f} ms/cliente "
+              f"(~{t_avulso * resumo['linhas']:.0f} s para a planilha; {total} clientes no banco)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark da serialização das listagens (páginas de 1.000 linhas)
+
+Compara, para /atendimentos, /materiais e /procedimentos, o caminho
+anterior (model_validate por linha + validação do response_model +
+JSONResponse) com app.utils.serializacao, e confere que os bytes gerados
+são idênticos.
+
+Uso:
+    python scripts/benchmark_serializacao.py [--linhas 1000] [--repeticoes 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.models import (
+    Base, Cliente, Procedimento, Material, Atendimento, AtendimentoProcedimento,
+    AtendimentoMaterial, ProcedimentoMaterial
+)
+from app.routers.atendimentos import CARREGAMENTO_ATENDIMENTO
+from app.routers.procedimentos import CARREGAMENTO_PROCEDIMENTO
+from app.schemas import (
+    AtendimentoList, MaterialList, ProcedimentoList,
+    Atendimento as AtendimentoSchema, Material as MaterialSchema, Procedimento as ProcedimentoSchema
+)
+from app.utils.serializacao import serializar
+
+def popular_banco(url: str, linhas: int) -> sessionmaker:
+    """Cria um banco temporário com `linhas` registros em cada listagem"""
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Cliente), [{"nome": f"Cliente {i}", "telefone": f"11{i:09d}"} for i in range(linhas)])
+        conn.execute(insert(Material), [
+            {"nome": f"Material {i}", "quantidade_disponivel": i * 1.5, "valor_unitario": 9.9, "estoque_minimo": 2.0}
+            for i in range(linhas)
+        ])
+        conn.execute(insert(Procedimento), [
+            {"nome": f"Procedimento {i}", "descricao": "Aplicação", "valor_padrao": 500.0} for i in range(linhas)
+        ])
+        conn.execute(insert(ProcedimentoMaterial), [
+            {"procedimento_id": i + 1, "material_id": i + 1, "quantidade_padrao": 1.0} for i in range(linhas)
+        ])
+        inicio = datetime(2023, 1, 1)
+        conn.execute(insert(Atendimento), [
+            {"cliente_id": i + 1, "data_hora": inicio + timedelta(hours=i), "valor_cobrado": 500.0}
+            for i in range(linhas)
+        ])
+        conn.execute(insert(AtendimentoProcedimento), [
+            {"atendimento_id": i + 1, "procedimento_id": i + 1, "valor_cobrado": 500.0} for i in range(linhas)
+        ])
+        conn.execute(insert(AtendimentoMaterial), [
+            {"atendimento_id": i + 1, "material_id": i + 1, "quantidade_utilizada": 1.0, "valor_unitario_momento": 9.9}
+            for i in range(linhas)
+        ])
+    return sessionmaker(bind=engine)
+
+def caminho_anterior(caminho: str, lista, schema, campo: str, objetos) -> bytes:
+    """model_validate por linha, validação do response_model e JSONResponse"""
+    rota = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == caminho and "GET" in r.methods)
+    conteudo = lista(**{campo: [schema.model_validate(o) for o in objetos], "total": len(objetos)})
+    dados = asyncio.run(serialize_response(field=rota.response_field, response_content=conteudo))
+    return JSONResponse(dados).body
+
+def cronometrar(funcao, repeticoes: int) -> float:
+    """Melhor tempo (ms) entre as repetições"""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=1000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        Sessao = popular_banco(f"sqlite:///{diretorio}/benchmark.db", args.linhas)
+        db = Sessao()
+        casos = [
+            ("/api/v1/atendimentos", AtendimentoList, AtendimentoSchema, "atendimentos",
+             db.query(Atendimento).options(*CARREGAMENTO_ATENDIMENTO).all()),
+            ("/api/v1/materiais", MaterialList, MaterialSchema, "materiais", db.query(Material).all()),
+            ("/api/v1/procedimentos", ProcedimentoList, ProcedimentoSchema, "procedimentos",
+             db.query(Procedimento).options(*CARREGAMENTO_PROCEDIMENTO).all()),
+        ]
+
+        print(f"📊 Serialização de páginas com {args.linhas} linhas (melhor de {args.repeticoes})")
+        for caminho, lista, schema, campo, objetos in casos:
+            anterior = lambda: caminho_anterior(caminho, lista, schema, campo, objetos)
+            atual = lambda: serializar(lista, {campo: objetos, "total": len(objetos)})
+            identico = anterior() == atual()
+            t_anterior = cronometrar(anterior, args.repeticoes)
+            t_atual = cronometrar(atual, args.repeticoes)
+            print(
+                f"   {caminho:<24} antes {t_anterior:8.1f} ms   agora {t_atual:8.1f} ms   "
+                f"{t_anterior / t_atual:4.1f}x   {'bytes idênticos' if identico else '❌ SAÍDA DIFERENTE'}"
+            )
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark do relatório de valorização e giro do estoque (banco SQLite temporário)
+
+Gera materiais em várias unidades e um ano de consumo em
+atendimento_materiais, reconstrói consumo_diario e mede o relatório para
+períodos de 30 e 365 dias, comparando com a agregação direta do consumo
+sobre atendimento_materiais.
+
+Uso:
+    python scripts/benchmark_valorizacao.py [--materiais 10000] [--consumos 1000000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Atendimento, AtendimentoMaterial, Cliente, Material
+from app.utils.consumo_diario import reconstruir_consumo_diario
+from app.utils.valorizacao_estoque import relatorio_valorizacao
+
+UNIDADES = ["un", "ml", "g", "cx", "par", "frasco"]
+DIAS = 365
+
+def popular(sessao, materiais: int, consumos: int, rng: random.Random) -> None:
+    inicio = datetime.combine(date.today() - timedelta(days=DIAS - 1), datetime.min.time())
+    sessao.execute(insert(Material), [
+        {
+            "nome": f"Material {i}", "nome_normalizado": f"material {i}",
+            "quantidade_disponivel": float(rng.randint(0, 500)), "unidade": rng.choice(UNIDADES),
+            "valor_unitario": float(rng.randint(1, 300)), "estoque_minimo": 5.0, "ativo": True
+        }
+        for i in range(materiais)
+    ])
+    sessao.execute(insert(Cliente), [{"nome": "Cliente", "telefone": "0"}])
+    atendimentos = consumos // 5
+    sessao.execute(insert(Atendimento), [
+        {
+            "cliente_id": 1, "valor_cobrado": 100.0,
+            "data_hora": inicio + timedelta(minutes=rng.randrange(DIAS * 24 * 60))
+        }
+        for _ in range(atendimentos)
+    ])
+    for lote in range(0, consumos, 100000):
+        sessao.execute(insert(AtendimentoMaterial), [
+            {
+                "atendimento_id": rng.randint(1, atendimentos), "material_id": rng.randint(1, materiais),
+                "quantidade_utilizada": float(rng.randint(1, 3)), "valor_unitario_momento": float(rng.randint(1, 300))
+            }
+            for _ in range(min(100000, consumos - lote))
+        ])
+    sessao.commit()
+
+def medir(funcao, repeticoes: int = 7) -> float:
+    """Mediana em ms"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+def agregacao_direta(sessao, data_inicio: date, data_fim: date):
+    """Referência: consumo agregado de atendimento_materiais a cada chamada"""
+    return sessao.execute(text(
+        "SELECT am.material_id, SUM(am.quantidade_utilizada), SUM(am.quantidade_utilizada * am.valor_unitario_momento) "
+        "FROM atendimento_materiais am JOIN atendimentos a ON a.id = am.atendimento_id "
+        "WHERE a.data_hora >= :inicio AND a.data_hora < :fim GROUP BY am.material_id"
+    ), {"inicio": data_inicio, "fim": data_fim + timedelta(days=1)}).all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--materiais", type=int, default=10000)
+    parser.add_argument("--consumos", type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = create_engine(f"sqlite:///{os.path.join(diretorio, 'benchmark.db')}")
+        Base.metadata.create_all(bind=engine)
+        Sessao = sessionmaker(bind=engine)
+        with Sessao() as sessao:
+            popular(sessao, args.materiais, args.consumos, random.Random(42))
+            inicio = time.perf_counter()
+            linhas = reconstruir_consumo_diario(sessao)
+            t_reconstrucao = time.perf_counter() - inicio
+
+        print(f"📊 {args.materiais} materiais, {args.consumos} consumos em {DIAS} dias "
+              f"-> {linhas} linhas em consumo_diario ({t_reconstrucao:.2f} s para reconstruir)")
+        hoje = date.today()
+        with Sessao() as sessao:
+            for dias in (30, DIAS):
+                data_inicio = hoje - timedelta(days=dias - 1)
+                t_relatorio = medir(lambda: relatorio_valorizacao(sessao, data_inicio, hoje))
+                t_direta = medir(lambda: agregacao_direta(sessao, data_inicio, hoje), repeticoes=3)
+                print(f"   {dias:3d} dias: relatório {t_relatorio:7.1f} ms   "
+                      f"(só o consumo agregado de atendimento_materiais: {t_direta:7.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Script para consolidar materiais duplicados (mesmo nome normalizado)
+
+Por padrão só mostra o relatório do que mudaria (dry-run); com --aplicar
+funde os duplicados e reponta as referências em uma única transação.
+
+Uso:
+    python scripts/consolidar_materiais.py [--aplicar] [--detalhes 20] [--json relatorio.json]
+"""
+
+import argparse
+import json
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import engine, SessionLocal
+from app.models import Base
+from app.utils.consolidacao_materiais import consolidar_materiais
+
+def imprimir_relatorio(relatorio: dict, detalhes: int) -> None:
+    """Resumo do relatório com a diferença dos primeiros grupos"""
+    grupos = relatorio["grupos"]
+    for grupo in grupos[:detalhes]:
+        print(f"   #{grupo['principal_id']} {grupo['nome']}: quantidade {grupo['quantidade_total']}")
+        for duplicado_id, nome in zip(grupo["duplicados"], grupo["nomes_duplicados"]):
+            print(f"      - #{duplicado_id} {nome}")
+    if len(grupos) > detalhes:
+        print(f"   ... mais {len(grupos) - detalhes} grupos")
+    print(f"📦 {len(grupos)} grupos, {relatorio['materiais_desativados']} materiais duplicados")
+    for tabela, quantidade in relatorio["referencias"].items():
+        print(f"🔗 {tabela}: {quantidade} referências")
+    if relatorio["materiais_padrao_mesclados"]:
+        print(f"🔗 procedimento_materiais: {relatorio['materiais_padrao_mesclados']} linhas mescladas")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--aplicar", action="store_true", help="Grava a consolidação (padrão: dry-run)")
+    parser.add_argument("--detalhes", type=int, default=20, help="Grupos listados no relatório")
+    parser.add_argument("--json", help="Arquivo para salvar o relatório completo")
+    args = parser.parse_args()
+
+    print("🔧 Consolidando materiais duplicados..." if args.aplicar else "🔍 Dry-run da consolidação de materiais...")
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        relatorio = consolidar_materiais(db, aplicar=args.aplicar)
+        if args.aplicar:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao consolidar materiais: {e}")
+        raise
+    finally:
+        db.close()
+
+    imprimir_relatorio(relatorio, args.detalhes)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print("✅ Consolidação aplicada." if args.aplicar else "ℹ️  Nada foi gravado (use --aplicar).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Script para consolidar o livro-razão do estoque em snapshots de saldo
+
+Deve rodar periodicamente (ex: cron diário); cada execução cria um
+snapshot por material com movimentações desde o snapshot anterior.
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import engine, SessionLocal
+from app.models import Base
+from app.utils.estoque import gerar_snapshots
+
+def gerar_snapshots_estoque():
+    """Gera os snapshots de saldo dos materiais movimentados"""
+    print("🔧 Gerando snapshots de saldo do estoque...")
+    
+    Base.metadata.create_all(bind=engine)
+    
+    db = SessionLocal()
+    try:
+        criados = gerar_snapshots(db)
+        db.commit()
+        print(f"✅ Snapshots criados: {criados} materiais")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao gerar snapshots: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    gerar_snapshots_estoque()
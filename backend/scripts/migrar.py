@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Script para aplicar as migrações pendentes do banco de dados
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import engine
+from app.models import Base
+from app.migracoes import MIGRACOES, aplicar_migracoes
+
+def migrar():
+    """Cria tabelas ausentes e aplica as migrações pendentes"""
+    print("🔧 Aplicando migrações...")
+    
+    Base.metadata.create_all(bind=engine)
+    versoes = aplicar_migracoes(engine)
+    
+    if not versoes:
+        print("ℹ️  Nenhuma migração pendente.")
+        return
+    
+    descricoes = {m.versao: m.descricao for m in MIGRACOES}
+    for versao in versoes:
+        print(f"✅ {versao:04d} - {descricoes[versao]}")
+
+if __name__ == "__main__":
+    migrar()
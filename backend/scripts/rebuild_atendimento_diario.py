@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir o resumo diário de atendimentos (atendimento_diario)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import engine, SessionLocal
+from app.models import Base
+from app.utils.resumo_diario import reconstruir_resumo_diario
+
+def rebuild_atendimento_diario():
+    """Recalcula o resumo diário a partir da tabela de atendimentos"""
+    print("🔧 Reconstruindo resumo diário de atendimentos...")
+    
+    Base.metadata.create_all(bind=engine)
+    
+    db = SessionLocal()
+    try:
+        linhas = reconstruir_resumo_diario(db)
+        print(f"✅ Resumo reconstruído: {linhas} linhas (dia, status)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao reconstruir resumo: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_atendimento_diario()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir o consumo diário de materiais (consumo_diario)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import engine, SessionLocal
+from app.models import Base
+from app.utils.consumo_diario import reconstruir_consumo_diario
+
+def rebuild_consumo_diario():
+    """Recalcula o consumo diário e os acumulados a partir de atendimento_materiais"""
+    print("🔧 Reconstruindo consumo diário de materiais...")
+    
+    Base.metadata.create_all(bind=engine)
+    
+    db = SessionLocal()
+    try:
+        linhas = reconstruir_consumo_diario(db)
+        print(f"✅ Consumo reconstruído: {linhas} linhas (material, dia)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao reconstruir consumo: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_consumo_diario()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir o resumo dos clientes (resumo_clientes e resumo_cliente_procedimentos)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import engine, SessionLocal
+from app.models import Base
+from app.utils.resumo_clientes import reconstruir_resumo_clientes
+
+def rebuild_resumo_clientes():
+    """Recalcula as métricas de cada cliente a partir dos atendimentos"""
+    print("🔧 Reconstruindo resumo dos clientes...")
+    
+    Base.metadata.create_all(bind=engine)
+    
+    db = SessionLocal()
+    try:
+        linhas = reconstruir_resumo_clientes(db)
+        print(f"✅ Resumo reconstruído: {linhas} clientes")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao reconstruir resumo: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_resumo_clientes()
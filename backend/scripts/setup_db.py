@@ -9,6 +9,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from app.database import engine, SessionLocal
 from app.models import Base, Cliente, Procedimento, Material, Atendimento
+from app.migracoes import aplicar_migracoes
 from datetime import datetime
 
 def setup_database():
@@ -19,6 +20,10 @@ def setup_database():
     Base.metadata.create_all(bind=engine)
     print("✅ Tabelas criadas com sucesso!")
     
+    # Aplicar migrações pendentes
+    versoes = aplicar_migracoes(engine)
+    print(f"✅ Migrações aplicadas: {versoes or 'nenhuma pendente'}")
+    
     # Verificar se já existem dados
     db = SessionLocal()
     try:
@@ -12,6 +12,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from app.main import app
 from app.database import engine, Base, SessionLocal
+from app.utils.autocomplete_clientes import invalidar_indice_clientes
+from app.utils.catalogo_materiais import invalidar_catalogo
 
 @pytest.fixture
 def client():
@@ -30,4 +32,6 @@ def db_session():
     finally:
         session.close()
         # Limpar tabelas após teste
-        Base.metadata.drop_all(bind=engine) 
\ No newline at end of file
+        Base.metadata.drop_all(bind=engine)
+        invalidar_catalogo()
+        invalidar_indice_clientes() 
\ No newline at end of file
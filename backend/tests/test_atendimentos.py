@@ -0,0 +1,336 @@
+"""
+Testes para o módulo de atendimentos
+"""
+
+import json
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.database import engine, engine_leitura
+from app.utils.consumo_diario import reconstruir_consumo_diario
+from app.utils.resumo_clientes import reconstruir_resumo_clientes
+from app.utils.resumo_diario import reconstruir_resumo_diario
+from app.models import (
+    Cliente, Procedimento, Material, Atendimento, AtendimentoProcedimento,
+    AtendimentoMaterial, ProcedimentoMaterial, ConsumoDiario
+)
+
+@contextmanager
+def contar_consultas():
+    """Conta os comandos SQL executados nos engines (escrita e leitura) dentro do bloco"""
+    comandos = []
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        comandos.append(statement)
+    for e in {engine, engine_leitura}:
+        event.listen(e, "before_cursor_execute", registrar)
+    try:
+        yield comandos
+    finally:
+        for e in {engine, engine_leitura}:
+            event.remove(e, "before_cursor_execute", registrar)
+
+@pytest.fixture
+def atendimentos(db_session):
+    """Cria um cliente com 7 atendimentos, dois deles no mesmo horário"""
+    cliente = Cliente(nome="Maria Souza", telefone="(11) 98888-7777")
+    procedimento = Procedimento(nome="Botox", valor_padrao=800.0)
+    db_session.add_all([cliente, procedimento])
+    db_session.flush()
+
+    base = datetime(2024, 3, 1, 10, 0)
+    horarios = [base + timedelta(days=i) for i in range(6)] + [base + timedelta(days=2)]
+    for data_hora in horarios:
+        atendimento = Atendimento(cliente_id=cliente.id, data_hora=data_hora, valor_cobrado=800.0)
+        db_session.add(atendimento)
+        db_session.flush()
+        db_session.add(AtendimentoProcedimento(
+            atendimento_id=atendimento.id,
+            procedimento_id=procedimento.id,
+            valor_cobrado=800.0
+        ))
+    db_session.commit()
+    return horarios
+
+def test_listar_atendimentos_por_cursor(client, atendimentos):
+    """Percorre todas as páginas via next_cursor sem repetir nem pular registros"""
+    response = client.get("/api/v1/atendimentos", params={"limit": 3})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 7
+
+    ids = [a["id"] for a in data["atendimentos"]]
+    paginas = 1
+    while data["next_cursor"]:
+        response = client.get(
+            "/api/v1/atendimentos",
+            params={"limit": 3, "cursor": data["next_cursor"], "incluir_total": False}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] is None
+        ids.extend(a["id"] for a in data["atendimentos"])
+        paginas += 1
+
+    assert paginas == 3
+    assert len(ids) == len(set(ids)) == 7
+
+    # Mesma ordem da paginação por offset
+    response = client.get("/api/v1/atendimentos", params={"limit": 10})
+    assert [a["id"] for a in response.json()["atendimentos"]] == ids
+    assert response.json()["next_cursor"] is None
+
+def test_listar_atendimentos_cursor_invalido(client, db_session):
+    """Cursor malformado retorna 400"""
+    response = client.get("/api/v1/atendimentos", params={"cursor": "nao-e-um-cursor"})
+    assert response.status_code == 400
+
+@pytest.fixture
+def atendimentos_completos(db_session):
+    """Cria 30 atendimentos com procedimentos, materiais padrão e materiais utilizados"""
+    cliente = Cliente(nome="Ana Lima", telefone="(11) 97777-6666")
+    material = Material(nome="Seringa", quantidade_disponivel=100, valor_unitario=2.5)
+    procedimentos = [Procedimento(nome=f"Procedimento {i}", valor_padrao=100.0) for i in range(3)]
+    db_session.add_all([cliente, material, *procedimentos])
+    db_session.flush()
+    for procedimento in procedimentos:
+        db_session.add(ProcedimentoMaterial(procedimento_id=procedimento.id, material_id=material.id))
+
+    for i in range(30):
+        atendimento = Atendimento(
+            cliente_id=cliente.id,
+            data_hora=datetime(2024, 1, 1) + timedelta(hours=i),
+            valor_cobrado=300.0
+        )
+        db_session.add(atendimento)
+        db_session.flush()
+        for procedimento in procedimentos:
+            db_session.add(AtendimentoProcedimento(
+                atendimento_id=atendimento.id, procedimento_id=procedimento.id, valor_cobrado=100.0
+            ))
+        db_session.add(AtendimentoMaterial(
+            atendimento_id=atendimento.id, material_id=material.id,
+            quantidade_utilizada=1, valor_unitario_momento=2.5
+        ))
+    db_session.commit()
+
+def test_listar_atendimentos_consultas_fixas(client, atendimentos_completos):
+    """A quantidade de consultas por página não depende do tamanho da página"""
+    contagens = []
+    for limit in (2, 10, 30):
+        with contar_consultas() as comandos:
+            response = client.get("/api/v1/atendimentos", params={"limit": limit, "incluir_total": False})
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["atendimentos"]) == limit
+        assert data["atendimentos"][0]["procedimentos"][0]["procedimento"]["materiais_padrao"][0]["material"]["nome"] == "Seringa"
+        contagens.append(len(comandos))
+
+    # atendimentos + procedimentos + materiais padrão + materiais utilizados
+    assert contagens == [4, 4, 4]
+
+@pytest.fixture
+def cadastro_basico(db_session):
+    """Cliente, três procedimentos e um material com 10 unidades em estoque"""
+    cliente = Cliente(nome="Paula Reis", telefone="(21) 96666-5555")
+    material = Material(nome="Ácido hialurônico", quantidade_disponivel=10, valor_unitario=50.0)
+    procedimentos = [Procedimento(nome=f"Procedimento {i}", valor_padrao=100.0) for i in range(3)]
+    db_session.add_all([cliente, material, *procedimentos])
+    db_session.commit()
+    return {
+        "cliente_id": cliente.id,
+        "material_id": material.id,
+        "procedimento_ids": [p.id for p in procedimentos],
+    }
+
+def _payload_atendimento(cadastro, n_procedimentos=1, quantidade=1):
+    return {
+        "cliente_id": cadastro["cliente_id"],
+        "data_hora": "2024-05-10T14:00:00",
+        "valor_cobrado": 100.0 * n_procedimentos,
+        "procedimentos": [
+            {"procedimento_id": pid, "valor_cobrado": 100.0}
+            for pid in cadastro["procedimento_ids"][:n_procedimentos]
+        ],
+        "materiais_utilizados": [
+            {"material_id": cadastro["material_id"], "quantidade_utilizada": quantidade, "valor_unitario_momento": 50.0}
+        ],
+    }
+
+def test_criar_atendimento_baixa_estoque(client, db_session, cadastro_basico):
+    """Cria atendimento e baixa a quantidade utilizada do estoque"""
+    response = client.post("/api/v1/atendimentos", json=_payload_atendimento(cadastro_basico, 3, 4))
+    assert response.status_code == 201
+    data = response.json()
+    assert len(data["procedimentos"]) == 3
+    assert data["materiais_utilizados"][0]["material"]["quantidade_disponivel"] == 6
+    movimentacoes = client.get(f"/api/v1/materiais/{cadastro_basico['material_id']}/movimentacoes").json()
+    assert [(m["tipo"], m["quantidade"], m["atendimento_id"]) for m in movimentacoes["movimentacoes"]] == [
+        ("atendimento", -4.0, data["id"]), ("inicial", 10.0, None)
+    ]
+
+def test_criar_atendimento_atualiza_cache_do_catalogo(client, cadastro_basico):
+    """A baixa de estoque do atendimento aparece na busca de similares sem reconstruir o cache"""
+    client.get("/api/v1/materiais/buscar/similares", params={"nome": "acido hialuronico"})
+    reconstrucoes = client.get("/api/v1/materiais/cache/estatisticas").json()["reconstrucoes"]
+
+    client.post("/api/v1/atendimentos", json=_payload_atendimento(cadastro_basico, 1, 4))
+    response = client.get("/api/v1/materiais/buscar/similares", params={"nome": "acido hialuronico"})
+    assert response.json()["materiais_similares"][0]["quantidade_disponivel"] == 6
+    assert client.get("/api/v1/materiais/cache/estatisticas").json()["reconstrucoes"] == reconstrucoes
+
+def test_criar_atendimento_estoque_insuficiente(client, db_session, cadastro_basico):
+    """Estoque insuficiente retorna 400 e não grava o atendimento"""
+    response = client.post("/api/v1/atendimentos", json=_payload_atendimento(cadastro_basico, 1, 11))
+    assert response.status_code == 400
+    assert db_session.query(Atendimento).count() == 0
+    assert db_session.query(Material).one().quantidade_disponivel == 10
+
+def test_criar_atendimento_procedimento_inexistente(client, db_session, cadastro_basico):
+    """Procedimento inexistente retorna 404"""
+    payload = _payload_atendimento(cadastro_basico)
+    payload["procedimentos"].append({"procedimento_id": 9999, "valor_cobrado": 10.0})
+    response = client.post("/api/v1/atendimentos", json=payload)
+    assert response.status_code == 404
+    assert "9999" in response.json()["detail"]
+
+def test_criar_atendimento_sem_procedimentos(client, db_session, cadastro_basico):
+    """Atendimento sem procedimentos é aceito (só materiais)"""
+    payload = {**_payload_atendimento(cadastro_basico), "procedimentos": []}
+    response = client.post("/api/v1/atendimentos", json=payload)
+    assert response.status_code == 201
+    assert response.json()["procedimentos"] == []
+    assert db_session.query(AtendimentoProcedimento).count() == 0
+    assert db_session.query(Material).one().quantidade_disponivel == 9
+
+def test_criar_atendimento_consultas_fixas(client, cadastro_basico):
+    """A validação não faz uma consulta por procedimento"""
+    contagens = []
+    for n_procedimentos in (1, 3):
+        with contar_consultas() as comandos:
+            response = client.post("/api/v1/atendimentos", json=_payload_atendimento(cadastro_basico, n_procedimentos))
+        assert response.status_code == 201
+        contagens.append(len(comandos))
+    assert contagens[0] == contagens[1]
+
+def test_importar_atendimentos_bulk(client, db_session, cadastro_basico):
+    """Importa NDJSON em lotes e reporta o resultado de cada linha"""
+    valido = json.dumps(_payload_atendimento(cadastro_basico, 2, 3))
+    sem_estoque = json.dumps(_payload_atendimento(cadastro_basico, 1, 5))
+    cliente_inexistente = json.dumps({**_payload_atendimento(cadastro_basico), "cliente_id": 9999})
+    corpo = "\n".join([valido, "{invalido", valido, cliente_inexistente, sem_estoque, "", valido]) + "\n"
+
+    response = client.post(
+        "/api/v1/atendimentos/bulk",
+        params={"tamanho_lote": 2},
+        content=corpo.encode("utf-8"),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    linhas = [json.loads(l) for l in response.text.splitlines()]
+    status = {l["linha"]: l["status"] for l in linhas[:-1]}
+    assert status == {1: "criado", 2: "erro", 3: "criado", 4: "erro", 5: "erro", 7: "criado"}
+    assert linhas[-1] == {"resumo": {"criados": 3, "erros": 3}}
+
+    assert db_session.query(Atendimento).count() == 3
+    assert db_session.query(AtendimentoProcedimento).count() == 6
+    assert db_session.query(Material).one().quantidade_disponivel == 1
+
+def test_estatisticas_resumo_diario(client, db_session, cadastro_basico):
+    """O resumo diário acompanha criação, alteração e remoção de atendimentos"""
+    agora = datetime.now().replace(microsecond=0)
+    ids = []
+    for data_hora in (agora, agora - timedelta(days=400)):
+        payload = {**_payload_atendimento(cadastro_basico), "data_hora": data_hora.isoformat()}
+        ids.append(client.post("/api/v1/atendimentos", json=payload).json()["id"])
+
+    data = client.get("/api/v1/atendimentos/estatisticas/resumo").json()
+    assert data == {"total_atendimentos": 2, "atendimentos_hoje": 1, "atendimentos_mes": 1, "valor_total_mes": 100.0}
+
+    client.put(f"/api/v1/atendimentos/{ids[1]}", json={"data_hora": agora.isoformat(), "valor_cobrado": 250.0})
+    data = client.get("/api/v1/atendimentos/estatisticas/resumo").json()
+    assert data == {"total_atendimentos": 2, "atendimentos_hoje": 2, "atendimentos_mes": 2, "valor_total_mes": 350.0}
+
+    client.delete(f"/api/v1/atendimentos/{ids[0]}")
+    data = client.get("/api/v1/atendimentos/estatisticas/resumo").json()
+    assert data == {"total_atendimentos": 1, "atendimentos_hoje": 1, "atendimentos_mes": 1, "valor_total_mes": 250.0}
+
+    # A reconstrução completa chega ao mesmo resultado
+    reconstruir_resumo_diario(db_session)
+    assert client.get("/api/v1/atendimentos/estatisticas/resumo").json() == data
+
+def test_relatorio_valorizacao_consumo_diario(client, db_session, cadastro_basico):
+    """O consumo do relatório de valorização acompanha criação, alteração e remoção de atendimentos"""
+    ids = []
+    for data_hora, quantidade in (("2024-05-10T14:00:00", 4), ("2024-05-20T09:00:00", 2)):
+        payload = {**_payload_atendimento(cadastro_basico, 1, quantidade), "data_hora": data_hora}
+        ids.append(client.post("/api/v1/atendimentos", json=payload).json()["id"])
+    periodo = {"data_inicio": "2024-05-01", "data_fim": "2024-05-30"}
+
+    def indicadores():
+        data = client.get("/api/v1/materiais/relatorios/valorizacao", params=periodo).json()
+        material = data["materiais"][0]
+        assert data["por_unidade"][0]["valor_consumido"] == data["totais"]["valor_consumido"] == material["valor_consumido"]
+        return material["valor_estoque"], material["quantidade_consumida"], material["giro"], material["dias_cobertura"]
+
+    assert indicadores() == (200.0, 6.0, 1.5, 20.0)
+    client.put(f"/api/v1/atendimentos/{ids[0]}", json={"data_hora": "2024-06-05T14:00:00"})
+    assert indicadores() == (200.0, 2.0, 0.5, 60.0)
+    client.delete(f"/api/v1/atendimentos/{ids[1]}")
+    assert indicadores() == (200.0, 0.0, 0.0, None)
+
+    # A reconstrução completa chega ao mesmo resultado
+    colunas = (ConsumoDiario.material_id, ConsumoDiario.dia, ConsumoDiario.quantidade, ConsumoDiario.quantidade_acumulada)
+    consumo = db_session.query(*colunas).filter(ConsumoDiario.quantidade != 0).all()
+    reconstruir_consumo_diario(db_session)
+    assert db_session.query(*colunas).all() == consumo
+    assert client.get("/api/v1/materiais/relatorios/valorizacao", params={
+        "data_inicio": "2024-06-01", "data_fim": "2024-05-01"
+    }).status_code == 400
+
+def test_historico_cliente_resumo(client, db_session, cadastro_basico):
+    """O resumo do cliente acompanha criação, alteração e remoção de atendimentos"""
+    cliente_id = cadastro_basico["cliente_id"]
+    outro_id = client.post("/api/v1/clientes", json={"nome": "Rita Lima", "telefone": "(21) 95555-0000"}).json()["id"]
+    ids = []
+    for data_hora, n_procedimentos in (("2024-05-10T14:00:00", 2), ("2024-05-20T09:00:00", 1), ("2024-05-15T10:00:00", 1)):
+        payload = {**_payload_atendimento(cadastro_basico, n_procedimentos), "data_hora": data_hora}
+        ids.append(client.post("/api/v1/atendimentos", json=payload).json()["id"])
+
+    def historico(**params):
+        return client.get(f"/api/v1/clientes/{cliente_id}/historico", params=params).json()
+
+    def metricas(data):
+        return data["n_atendimentos"], data["total_gasto"], data["ultimo_atendimento"]
+
+    data = historico(limit=2)
+    assert metricas(data) == (3, 400.0, "2024-05-20T09:00:00")
+    assert data["procedimentos_frequentes"][0] == {
+        "procedimento_id": cadastro_basico["procedimento_ids"][0], "nome": "Procedimento 0", "quantidade": 3
+    }
+    assert [a["id"] for a in data["atendimentos"]] == [ids[1], ids[2]]
+    assert data["atendimentos"][0]["procedimentos"] == ["Procedimento 0"]
+    restante = historico(limit=2, cursor=data["next_cursor"])
+    assert [a["id"] for a in restante["atendimentos"]] == [ids[0]]
+    assert restante["atendimentos"][0]["procedimentos"] == ["Procedimento 0", "Procedimento 1"]
+    assert restante["next_cursor"] is None
+
+    # Cancelado sai das métricas; o último atendimento volta para o anterior
+    client.put(f"/api/v1/atendimentos/{ids[1]}", json={"status": "cancelado"})
+    assert metricas(historico()) == (2, 300.0, "2024-05-15T10:00:00")
+    client.put(f"/api/v1/atendimentos/{ids[0]}", json={"cliente_id": outro_id, "valor_cobrado": 50.0})
+    assert metricas(historico()) == (1, 100.0, "2024-05-15T10:00:00")
+    outro = client.get(f"/api/v1/clientes/{outro_id}/historico").json()
+    assert metricas(outro) == (1, 50.0, "2024-05-10T14:00:00")
+    assert len(outro["procedimentos_frequentes"]) == 2
+    client.delete(f"/api/v1/atendimentos/{ids[2]}")
+    data = historico()
+    assert metricas(data) == (0, 0.0, None)
+    assert data["procedimentos_frequentes"] == []
+    assert [a["status"] for a in data["atendimentos"]] == ["cancelado"]
+
+    # A reconstrução completa chega ao mesmo resultado
+    esperado = [historico(), client.get(f"/api/v1/clientes/{outro_id}/historico").json()]
+    reconstruir_resumo_clientes(db_session)
+    assert [historico(), client.get(f"/api/v1/clientes/{outro_id}/historico").json()] == esperado
+    assert client.get("/api/v1/clientes/9999/historico").status_code == 404
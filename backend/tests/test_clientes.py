@@ -2,9 +2,12 @@
 Testes para o módulo de clientes
 """
 
+import json
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import text
 from app.models import Cliente
+from app.utils.material_normalizer import normalizar_nome
 
 def test_create_cliente(client, db_session):
     """Testa criação de cliente"""
@@ -16,7 +19,7 @@ def test_create_cliente(client, db_session):
     }
     
     response = client.post("/api/v1/clientes", json=cliente_data)
-    assert response.status_code == 200
+    assert response.status_code == 201
     
     data = response.json()
     assert data["nome"] == cliente_data["nome"]
@@ -32,10 +35,190 @@ def test_get_clientes(client, db_session):
     assert "clientes" in data
     assert "total" in data
 
+def test_listar_clientes_cursor_e_streaming(client, db_session):
+    """Testa a listagem paginada por cursor (nome, id) e em streaming"""
+    nomes = ["Bia", "Ana", "Carla", "Ana", "Dani"]
+    for nome in nomes:
+        client.post("/api/v1/clientes", json={"nome": nome, "telefone": "(11) 99999-0000"})
+    
+    # Percorre todas as páginas pelo cursor; nomes repetidos são desempatados pelo id
+    vistos, cursor = [], None
+    while True:
+        params = {"limit": 2, "incluir_total": cursor is None}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/api/v1/clientes", params=params).json()
+        assert data["total"] == (5 if cursor is None else None)
+        vistos += [(c["nome"], c["id"]) for c in data["clientes"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert [nome for nome, _ in vistos] == sorted(nomes)
+    assert vistos == sorted(vistos)
+    
+    # Array JSON em streaming: a mesma sequência, sem paginação
+    response = client.get("/api/v1/clientes", params={"formato": "json"})
+    assert response.headers["content-type"] == "application/json"
+    assert [(c["nome"], c["id"]) for c in response.json()] == vistos
+    
+    # NDJSON a partir de um cursor
+    primeira = client.get("/api/v1/clientes", params={"limit": 2}).json()
+    response = client.get("/api/v1/clientes", params={"formato": "ndjson", "cursor": primeira["next_cursor"]})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    linhas = [json.loads(linha) for linha in response.text.splitlines()]
+    assert [(c["nome"], c["id"]) for c in linhas] == vistos[2:]
+    
+    assert client.get("/api/v1/clientes", params={"formato": "json", "cursor": "invalido"}).status_code == 400
+
 def test_health_check(client):
     """Testa endpoint de health check"""
     response = client.get("/health")
     assert response.status_code == 200
     
     data = response.json()
-    assert data["status"] == "healthy" 
\ No newline at end of file
+    assert data["status"] == "healthy"
+
+
+def test_buscar_clientes_fts(client, db_session):
+    """Busca sem acentos, por prefixo, ordenada por relevância e acompanhando alterações"""
+    ids = {}
+    for nome, telefone, observacao in [
+        ("João Silva", "(11) 99999-1111", None),
+        ("Maria Joana", "(21) 98888-2222", None),
+        ("Pedro Souza", "(31) 97777-3333", "Indicado pela Joana"),
+    ]:
+        response = client.post("/api/v1/clientes", json={"nome": nome, "telefone": telefone, "observacao": observacao})
+        ids[nome] = response.json()["id"]
+
+    def buscar(termo, **params):
+        data = client.get("/api/v1/clientes/busca", params={"termo": termo, **params}).json()
+        return [c["nome"] for c in data["clientes"]], data["total"]
+
+    assert buscar("joao") == (["João Silva"], 1)
+    assert buscar("SIL") == (["João Silva"], 1)
+    assert buscar("99999") == (["João Silva"], 1)
+    # Telefone em outro formato, com código do país ou só o final
+    for numero in ("11999991111", "+55 11 99999-1111", "9999-1111"):
+        assert buscar(numero) == (["João Silva"], 1)
+    telefone = client.get("/api/v1/clientes/telefone", params={"numero": "0055 (11) 999991111"}).json()
+    assert [c["nome"] for c in telefone["clientes"]] == ["João Silva"]
+    # Poucos dígitos casariam com quase todos os telefones
+    assert client.get("/api/v1/clientes/telefone", params={"numero": "1"}).status_code == 400
+    assert client.get("/api/v1/clientes/telefone", params={"numero": "(11)"}).status_code == 400
+    # O nome pesa mais que a observação
+    assert buscar("joana") == (["Maria Joana", "Pedro Souza"], 2)
+    assert buscar("joana", skip=1, limit=1) == (["Pedro Souza"], 2)
+    # Aspas e operadores digitados são texto, não sintaxe FTS5
+    assert buscar('jo" OR *') == ([], 0)
+    assert buscar("---") == ([], 0)
+
+    client.put(f"/api/v1/clientes/{ids['João Silva']}", json={"nome": "João Araújo"})
+    assert buscar("silva") == ([], 0)
+    assert buscar("araujo") == (["João Araújo"], 1)
+    client.delete(f"/api/v1/clientes/{ids['Maria Joana']}")
+    assert buscar("joana") == (["Pedro Souza"], 1)
+
+def test_autocomplete_clientes(client, db_session):
+    """Autocompletar pelo índice em memória, acompanhando as escritas sem reconstruir"""
+    ids = {}
+    for nome, telefone in [
+        ("Ana Júlia Conceição", "(11) 99999-1111"),
+        ("Antônio Silva", "(21) 98888-2222"),
+        ("Bruna Conceicao", "+55 31 97777-3333"),
+    ]:
+        ids[nome] = client.post("/api/v1/clientes", json={"nome": nome, "telefone": telefone}).json()["id"]
+
+    def sugerir(q, **params):
+        data = client.get("/api/v1/clientes/autocomplete", params={"q": q, **params}).json()
+        return [c["nome"] for c in data["clientes"]]
+
+    cache_materiais = normalizar_nome.cache_info().currsize
+    assert sugerir("an") == ["Ana Júlia Conceição", "Antônio Silva"]
+    assert sugerir("ANTO") == ["Antônio Silva"]
+    assert sugerir("conceição") == ["Ana Júlia Conceição", "Bruna Conceicao"]
+    assert sugerir("julia conc") == ["Ana Júlia Conceição"]
+    assert sugerir("(31) 9777") == ["Bruna Conceicao"]
+    assert sugerir("98888-2") == ["Antônio Silva"]
+    assert sugerir("an", limit=1) == ["Ana Júlia Conceição"]
+    assert sugerir("zz") == [] and sugerir("--") == []
+    # Nomes e termos não ocupam o cache de nomes de materiais
+    assert normalizar_nome.cache_info().currsize == cache_materiais
+    antes = client.get("/api/v1/clientes/autocomplete/estatisticas").json()
+
+    # Escritas pela aplicação são aplicadas ao índice no commit
+    client.put(f"/api/v1/clientes/{ids['Antônio Silva']}", json={"nome": "Caio Silva"})
+    client.delete(f"/api/v1/clientes/{ids['Bruna Conceicao']}")
+    client.post("/api/v1/clientes", json={"nome": "Anderson", "telefone": "11 3333-4444"})
+    assert sugerir("an") == ["Ana Júlia Conceição", "Anderson"]
+    assert sugerir("silva") == ["Caio Silva"]
+    assert sugerir("conceicao") == ["Ana Júlia Conceição"]
+    depois = client.get("/api/v1/clientes/autocomplete/estatisticas").json()
+    assert depois["reconstrucoes"] == antes["reconstrucoes"]
+    assert depois["atualizacoes"] == antes["atualizacoes"] + 3
+
+    # Outro processo grava direto no banco e incrementa a versão
+    db_session.execute(text("UPDATE clientes SET nome = 'Beatriz Silva' WHERE nome = 'Caio Silva'"))
+    db_session.execute(text("UPDATE indice_clientes_versao SET versao = versao + 1"))
+    db_session.commit()
+    assert sugerir("silva") == ["Beatriz Silva"]
+    assert client.get("/api/v1/clientes/autocomplete/estatisticas").json()["reconstrucoes"] == antes["reconstrucoes"] + 1
+
+def test_importar_clientes_csv(client, db_session):
+    """Importação em lotes: normaliza, ignora duplicados e reporta linhas inválidas"""
+    client.post("/api/v1/clientes", json={"nome": "Ana Souza", "telefone": "(11) 99999-1111"})
+    csv = (
+        "\ufeffNome;Telefone;E-mail;Observações\n"
+        "  João   Silva ;(21) 98888-2222;joao@email.com;\n"
+        "ANA SOUZA;+55 11 99999-1111;;já cadastrada\n"
+        "Maria Souza;11999991111;;mesmo telefone, outro nome\n"
+        ";(31) 97777-3333;;\n"
+        "Pedro Lima;123;;\n"
+        "\n"
+        "\"Lima; Carla\";(31) 97777-3333;;\"várias\nlinhas\"\n"
+        "Joao Silva;21 98888 2222;;repetido no arquivo\n"
+    ).encode("utf-8")
+    response = client.post("/api/v1/clientes/importar", params={"tamanho_lote": 2}, content=csv)
+    assert response.status_code == 200
+    assert response.json() == {
+        "linhas": 7, "inseridos": 3, "duplicados": 2, "invalidos": 2,
+        "erros": [{"linha": 5, "erro": "nome vazio"}, {"linha": 6, "erro": "telefone inválido: '123'"}],
+        "interrompida": None
+    }
+
+    clientes = {c.nome: c for c in db_session.query(Cliente)}
+    assert sorted(clientes) == ["Ana Souza", "João Silva", "Lima; Carla", "Maria Souza"]
+    assert clientes["João Silva"].email == "joao@email.com"
+    assert clientes["Lima; Carla"].observacao == "várias\nlinhas"
+    assert clientes["Maria Souza"].telefone_invertido == "11119999911"
+    assert clientes["Lima; Carla"].data_cadastro is not None
+
+    # Busca e autocompletar enxergam os clientes importados
+    busca = client.get("/api/v1/clientes/busca", params={"termo": "joao"}).json()
+    assert [c["nome"] for c in busca["clientes"]] == ["João Silva"]
+    sugestoes = client.get("/api/v1/clientes/autocomplete", params={"q": "lima"}).json()
+    assert [c["nome"] for c in sugestoes["clientes"]] == ["Lima; Carla"]
+
+    assert client.post("/api/v1/clientes/importar", content=b"nome,email\nAna,a@b.c\n").status_code == 400
+    assert client.post("/api/v1/clientes/importar", content="nome,telefone\nJosé,11 99999-0000\n".encode("cp1252")).status_code == 400
+    response = client.post(
+        "/api/v1/clientes/importar", params={"encoding": "cp1252"},
+        content="nome,telefone\nJosé,11 99999-0000\n".encode("cp1252")
+    )
+    assert response.json()["inseridos"] == 1
+
+def test_importar_clientes_csv_interrompida(client, db_session):
+    """Erro de leitura depois de lotes gravados: resposta 207 com o que foi importado e onde parou"""
+    linhas = "".join(f"Cliente {i},11 9{i:08d}\n" for i in range(2000))
+    csv = ("nome,telefone\n" + linhas).encode("utf-8") + "Zoë,11 98888-0000\n".encode("cp1252")
+    response = client.post("/api/v1/clientes/importar", params={"tamanho_lote": 100}, content=csv)
+    assert response.status_code == 207
+    resumo = response.json()
+    assert 0 < resumo["inseridos"] == resumo["linhas"] <= 2000
+    assert resumo["interrompida"]["linha"] == resumo["linhas"] + 2
+    assert resumo["interrompida"]["erro"].startswith("Arquivo não está em utf-8-sig")
+    assert db_session.query(Cliente).count() == resumo["inseridos"]
+
+    # Arquivo curto (nenhum lote gravado antes do erro): recusado sem importar nada
+    response = client.post("/api/v1/clientes/importar", content=b"nome,telefone\nAna,11 97777-0000\nZo\xeb,1\n")
+    assert response.status_code == 400
+    assert db_session.query(Cliente).filter(Cliente.nome == "Ana").count() == 0
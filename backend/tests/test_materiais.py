@@ -0,0 +1,445 @@
+"""
+Testes para o módulo de materiais
+"""
+
+import asyncio
+import random
+import re
+import unicodedata
+import pytest
+from datetime import datetime
+from difflib import SequenceMatcher
+from sqlalchemy import text
+from app.models import (
+    Atendimento, AtendimentoMaterial, Cliente, ConsumoDiario, Material, MovimentacaoEstoque, Procedimento,
+    ProcedimentoMaterial
+)
+from app.routers.materiais import transmitir_alertas_estoque
+from app.utils.alertas_estoque import canal_alertas
+from app.utils.agrupamento_materiais import agrupar_indices
+from app.utils.consolidacao_materiais import consolidar_materiais
+from app.utils.consumo_diario import reconstruir_consumo_diario
+from app.utils.estoque import atualizar_saldos, gerar_snapshots, saldo_em
+from app.utils.indice_materiais import MAXIMO_CANDIDATOS, IndiceNgramas
+from app.utils.material_normalizer import (
+    agrupar_materiais_similares, calcular_similaridade, encontrar_materiais_similares, normalizar_nome,
+    normalizar_nomes, similaridade_normalizada
+)
+
+def test_nome_normalizado_acompanha_nome(client, db_session):
+    """O nome normalizado é gravado na criação e atualizado junto com o nome"""
+    response = client.post("/api/v1/materiais", json={
+        "nome": "Ácido Hialurônico", "quantidade_disponivel": 1, "unidade": "ml", "valor_unitario": 10.0
+    })
+    assert response.status_code == 201
+    material_id = response.json()["id"]
+    assert db_session.get(Material, material_id).nome_normalizado == "acido hialuronico"
+
+    client.put(f"/api/v1/materiais/{material_id}", json={"nome": "Toxina Botulínica"})
+    db_session.expire_all()
+    assert db_session.get(Material, material_id).nome_normalizado == "toxina botulinica"
+
+def test_criar_ou_buscar_por_nome_normalizado(client, db_session):
+    """Nome igual após a normalização soma ao material existente"""
+    db_session.add(Material(nome="Ácido Hialurônico", quantidade_disponivel=5))
+    db_session.commit()
+
+    response = client.post(
+        "/api/v1/materiais/criar-ou-buscar",
+        params={"nome": "  ACIDO   hialuronico ", "quantidade_disponivel": 3}
+    )
+    assert response.status_code == 200
+    assert response.json()["nome"] == "Ácido Hialurônico"
+    assert response.json()["quantidade_disponivel"] == 8
+    assert db_session.query(Material).count() == 1
+
+def _catalogo_sintetico(rng, quantidade):
+    """Nomes com variações de acento, grafia e tamanho, incluindo duplicados e vazios"""
+    palavras = ["seringa", "agulha", "ácido", "hialurônico", "luva", "látex", "gaze", "3ml", "5ml", "30G", "BD", "estéril"]
+    nomes = []
+    for _ in range(quantidade):
+        nome = " ".join(rng.choice(palavras) for _ in range(rng.randint(1, 4)))
+        if rng.random() < 0.3:
+            posicao = rng.randrange(len(nome))
+            nome = nome[:posicao] + rng.choice("aeioxz ") + nome[posicao + 1:]
+        nomes.append(nome)
+    return nomes + ["", "!!!", "a", "Seringa", "SERINGA"]
+
+@pytest.mark.parametrize("threshold", [0.0, 0.3, 0.6, 0.8, 0.9, 1.0])
+def test_indice_acompanha_busca_linear(threshold):
+    """
+    O índice devolve parte da busca linear, com as mesmas similaridades e
+    na mesma ordem, e sempre o nome buscado quando ele está no catálogo
+    """
+    rng = random.Random(7)
+    materiais = [
+        {"id": i + 1, "nome": nome, "nome_normalizado": normalizar_nome(nome)}
+        for i, nome in enumerate(_catalogo_sintetico(rng, 400))
+    ]
+    indice = IndiceNgramas((m["id"], m["nome_normalizado"], bool(m["nome"])) for m in materiais)
+
+    # Remover e adicionar de novo mantém o índice equivalente
+    for material in materiais[::7]:
+        indice.remover(material["id"])
+    for material in materiais[::7]:
+        indice.adicionar(material["id"], material["nome_normalizado"], bool(material["nome"]))
+
+    do_catalogo = rng.sample([m["nome"] for m in materiais], 40)
+    for nome in do_catalogo + ["!!!", "seringa bd 3ml", "x"]:
+        esperado = [(m["id"], m["similaridade"]) for m in encontrar_materiais_similares(nome, materiais, threshold)]
+        obtido = indice.buscar(normalizar_nome(nome), threshold)
+        if threshold <= 0:
+            assert obtido == esperado
+            continue
+        ids = {material_id for material_id, _ in obtido}
+        assert obtido == [r for r in esperado if r[0] in ids]
+        assert len({indice.nomes[material_id] for material_id in ids}) <= MAXIMO_CANDIDATOS
+        if nome in do_catalogo:
+            assert obtido[:1] == esperado[:1]
+
+def test_buscar_similares_acompanha_alteracoes(client, db_session):
+    """O índice é atualizado nos commits que criam, renomeiam e removem materiais"""
+    client.post("/api/v1/materiais", json={"nome": "Seringa 3ml", "quantidade_disponivel": 1, "valor_unitario": 1.0})
+    response = client.get("/api/v1/materiais/buscar/similares", params={"nome": "seringa 5ml"})
+    assert [m["nome"] for m in response.json()["materiais_similares"]] == ["Seringa 3ml"]
+
+    criado = client.post("/api/v1/materiais", json={"nome": "Seringa 5ml", "quantidade_disponivel": 2, "valor_unitario": 1.0})
+    response = client.get("/api/v1/materiais/buscar/similares", params={"nome": "seringa 5ml"})
+    similares = response.json()["materiais_similares"]
+    assert [(m["nome"], m["similaridade"]) for m in similares][0] == ("Seringa 5ml", 1.0)
+    assert similares[0]["quantidade_disponivel"] == 2
+    assert "nome_normalizado" not in similares[0]
+
+    client.put(f"/api/v1/materiais/{criado.json()['id']}", json={"nome": "Gaze estéril"})
+    response = client.get("/api/v1/materiais/buscar/similares", params={"nome": "gaze esteril"})
+    assert [m["nome"] for m in response.json()["materiais_similares"]] == ["Gaze estéril"]
+
+    client.delete(f"/api/v1/materiais/{criado.json()['id']}")
+    response = client.get("/api/v1/materiais/buscar/similares", params={"nome": "gaze esteril"})
+    assert response.json()["total_encontrado"] == 0
+
+def test_cache_catalogo_write_through_e_versao(client, db_session):
+    """Escritas da aplicação atualizam o cache no commit; versão alterada por fora força reconstrução"""
+    criado = client.post("/api/v1/materiais", json={
+        "nome": "Seringa 3ml", "quantidade_disponivel": 5, "valor_unitario": 1.0, "estoque_minimo": 2
+    }).json()
+    similares = client.get("/api/v1/materiais/buscar/similares", params={"nome": "seringa 3ml"}).json()
+    assert similares["materiais_similares"][0]["quantidade_disponivel"] == 5
+    antes = client.get("/api/v1/materiais/cache/estatisticas").json()
+
+    client.post(f"/api/v1/materiais/{criado['id']}/ajustar-estoque", params={"quantidade": 3, "tipo": "saida"})
+    baixo = client.get("/api/v1/materiais/estoque/baixo").json()
+    assert [(m["id"], m["quantidade_disponivel"]) for m in baixo["materiais"]] == [(criado["id"], 2)]
+    depois = client.get("/api/v1/materiais/cache/estatisticas").json()
+    assert depois["reconstrucoes"] == antes["reconstrucoes"]
+    assert depois["atualizacoes"] == antes["atualizacoes"] + 1
+    assert depois["acertos"] > antes["acertos"]
+
+    # Outro processo grava direto no banco e incrementa a versão
+    db_session.execute(text("UPDATE materiais SET quantidade_disponivel = 9"))
+    db_session.execute(text("UPDATE catalogo_versao SET versao = versao + 1"))
+    db_session.commit()
+    assert client.get("/api/v1/materiais/estoque/baixo").json()["total"] == 0
+    assert client.get("/api/v1/materiais/cache/estatisticas").json()["reconstrucoes"] == antes["reconstrucoes"] + 1
+
+def test_livro_razao_e_snapshots(client, db_session):
+    """Cada variação de estoque é uma movimentação; snapshot + movimentações dá o saldo em qualquer data"""
+    material_id = client.post("/api/v1/materiais", json={
+        "nome": "Luva", "quantidade_disponivel": 10, "valor_unitario": 1.0
+    }).json()["id"]
+    client.post(f"/api/v1/materiais/{material_id}/ajustar-estoque", params={"quantidade": 5, "tipo": "entrada"})
+    client.post("/api/v1/materiais/criar-ou-buscar", params={"nome": "LUVA", "quantidade_disponivel": 2})
+    response = client.post(f"/api/v1/materiais/{material_id}/ajustar-estoque", params={"quantidade": 20, "tipo": "saida"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Estoque insuficiente. Disponível: 17.0"
+
+    assert gerar_snapshots(db_session) == 1
+    db_session.commit()
+    assert gerar_snapshots(db_session) == 0
+    antes_da_saida = datetime.utcnow()
+    client.post(f"/api/v1/materiais/{material_id}/ajustar-estoque", params={"quantidade": 4, "tipo": "saida"})
+    client.put(f"/api/v1/materiais/{material_id}", json={"quantidade_disponivel": 12})
+
+    movimentacoes = client.get(f"/api/v1/materiais/{material_id}/movimentacoes").json()
+    assert [(m["tipo"], m["quantidade"]) for m in movimentacoes["movimentacoes"]] == [
+        ("ajuste", -1.0), ("saida", -4.0), ("entrada", 2.0), ("entrada", 5.0), ("inicial", 10.0)
+    ]
+    assert saldo_em(db_session, material_id, antes_da_saida) == 17
+    assert client.get(f"/api/v1/materiais/{material_id}/saldo").json()["saldo"] == 12
+    assert client.get(f"/api/v1/materiais/{material_id}").json()["quantidade_disponivel"] == 12
+    assert client.get("/api/v1/materiais/9999/saldo").status_code == 404
+
+def test_remover_material_preserva_livro_razao(client, db_session):
+    """Material removido é desativado: o livro-razão não passa para um material criado depois"""
+    removido = client.post("/api/v1/materiais", json={
+        "nome": "Luva", "quantidade_disponivel": 10, "valor_unitario": 1.0
+    }).json()["id"]
+    assert client.delete(f"/api/v1/materiais/{removido}").status_code == 204
+    novo = client.post("/api/v1/materiais", json={
+        "nome": "Gaze", "quantidade_disponivel": 5, "valor_unitario": 1.0
+    }).json()["id"]
+
+    assert novo != removido
+    assert client.get(f"/api/v1/materiais/{novo}/saldo").json()["saldo"] == 5
+    assert [m["quantidade"] for m in client.get(f"/api/v1/materiais/{novo}/movimentacoes").json()["movimentacoes"]] == [5.0]
+    assert client.get(f"/api/v1/materiais/{removido}").json()["ativo"] is False
+    assert [m["id"] for m in client.get("/api/v1/materiais", params={"ativo": True}).json()["materiais"]] == [novo]
+    assert client.delete("/api/v1/materiais/9999").status_code == 404
+
+def test_material_removido_acessivel_por_id(client, db_session):
+    """Removido sai das listagens de ativos e da busca, mas GET/PUT por id respondem e o PUT reativa"""
+    material_id = client.post("/api/v1/materiais", json={
+        "nome": "Fio de PDO", "quantidade_disponivel": 3, "valor_unitario": 20.0
+    }).json()["id"]
+    assert client.delete(f"/api/v1/materiais/{material_id}").status_code == 204
+    assert client.delete(f"/api/v1/materiais/{material_id}").status_code == 204
+
+    response = client.get(f"/api/v1/materiais/{material_id}")
+    assert response.status_code == 200
+    assert (response.json()["ativo"], response.json()["quantidade_disponivel"]) == (False, 3)
+    assert client.get("/api/v1/materiais", params={"ativo": True}).json()["total"] == 0
+    assert client.get("/api/v1/materiais/buscar/similares", params={"nome": "fio de pdo"}).json()["total_encontrado"] == 0
+
+    response = client.put(f"/api/v1/materiais/{material_id}", json={"ativo": True})
+    assert response.status_code == 200 and response.json()["ativo"] is True
+    assert [m["id"] for m in client.get("/api/v1/materiais", params={"ativo": True}).json()["materiais"]] == [material_id]
+    similares = client.get("/api/v1/materiais/buscar/similares", params={"nome": "fio de pdo"}).json()
+    assert [m["id"] for m in similares["materiais_similares"]] == [material_id]
+
+def test_ajustar_estoque_em_lote(client, db_session):
+    """O lote é aplicado em uma transação: todos os saldos ou nenhum"""
+    ids = [
+        client.post("/api/v1/materiais", json={"nome": nome, "quantidade_disponivel": 10, "valor_unitario": 1.0}).json()["id"]
+        for nome in ("Luva", "Gaze")
+    ]
+    lote = [
+        {"material_id": ids[0], "quantidade": 5, "tipo": "entrada"},
+        {"material_id": ids[1], "quantidade": 4, "tipo": "saida"},
+        {"material_id": ids[0], "quantidade": 12, "tipo": "saida"},
+    ]
+    response = client.post("/api/v1/materiais/ajustar-estoque/lote", json=lote)
+    assert response.status_code == 200
+    assert response.json()["saldos"] == [
+        {"material_id": ids[0], "quantidade_atual": 3.0}, {"material_id": ids[1], "quantidade_atual": 6.0}
+    ]
+    movimentacoes = client.get(f"/api/v1/materiais/{ids[0]}/movimentacoes").json()["movimentacoes"]
+    assert [(m["tipo"], m["quantidade"]) for m in movimentacoes] == [("saida", -12.0), ("entrada", 5.0), ("inicial", 10.0)]
+
+    # Um item sem saldo ou inexistente desfaz o lote inteiro
+    response = client.post("/api/v1/materiais/ajustar-estoque/lote", json=[
+        {"material_id": ids[0], "quantidade": 1, "tipo": "entrada"},
+        {"material_id": ids[1], "quantidade": 7, "tipo": "saida"},
+    ])
+    assert response.status_code == 400
+    assert str(ids[1]) in response.json()["detail"]
+    response = client.post("/api/v1/materiais/ajustar-estoque/lote", json=[
+        {"material_id": ids[0], "quantidade": 1, "tipo": "entrada"},
+        {"material_id": 9999, "quantidade": 1, "tipo": "entrada"},
+    ])
+    assert response.status_code == 404
+    assert client.post("/api/v1/materiais/ajustar-estoque/lote", json=[]).status_code == 400
+    assert client.post("/api/v1/materiais/ajustar-estoque/lote", json=[
+        {"material_id": ids[0], "quantidade": -1, "tipo": "entrada"}
+    ]).status_code == 422
+    assert [client.get(f"/api/v1/materiais/{i}").json()["quantidade_disponivel"] for i in ids] == [3, 6]
+
+    # A guarda de saldo também vale no UPDATE, caso o saldo mude depois da validação
+    assert atualizar_saldos(db_session, {ids[0]: -100.0, ids[1]: 1.0}) == {ids[1]: 7.0}
+    db_session.rollback()
+
+def test_alertas_estoque_por_sse(client, db_session):
+    """O stream envia o estado inicial e um evento só quando o material cruza o estoque mínimo"""
+    material_id = client.post("/api/v1/materiais", json={
+        "nome": "Gaze", "quantidade_disponivel": 5, "valor_unitario": 1.0, "estoque_minimo": 3
+    }).json()["id"]
+
+    async def receber():
+        resposta = await transmitir_alertas_estoque()
+        eventos = resposta.body_iterator
+        inicial = await eventos.__anext__()
+        # 5 -> 2 cruza, 2 -> 1 não, 1 -> 21 volta, saída sem saldo é desfeita
+        for quantidade, tipo in [(3, "saida"), (1, "saida"), (20, "entrada"), (50, "saida")]:
+            await asyncio.to_thread(
+                client.post, f"/api/v1/materiais/{material_id}/ajustar-estoque",
+                params={"quantidade": quantidade, "tipo": tipo}
+            )
+        recebidos = [await asyncio.wait_for(eventos.__anext__(), 5) for _ in range(2)]
+        await asyncio.sleep(0)
+        pendentes = sum(fila.qsize() for fila in canal_alertas._assinantes)
+        await eventos.aclose()
+        return inicial, recebidos, pendentes
+
+    inicial, recebidos, pendentes = asyncio.run(receber())
+    assert inicial == 'event: estoque_baixo_atual\ndata: {"materiais": [], "total": 0}\n\n'
+    assert [r.split("\n")[0] for r in recebidos] == ["event: estoque_baixo", "event: estoque_normalizado"]
+    assert '"quantidade_disponivel": 2.0' in recebidos[0]
+    assert pendentes == 0
+    assert not canal_alertas._assinantes
+
+def test_material_inativo_sem_movimentacoes_nem_alertas(client, db_session):
+    """Material removido recusa ajustes e consumo e não gera alertas de estoque baixo"""
+    material_id = client.post("/api/v1/materiais", json={
+        "nome": "Gaze", "quantidade_disponivel": 5, "valor_unitario": 1.0, "estoque_minimo": 3
+    }).json()["id"]
+    cliente_id = client.post("/api/v1/clientes", json={"nome": "Ana", "telefone": "11999991111"}).json()["id"]
+    procedimento_id = client.post("/api/v1/procedimentos", json={"nome": "Limpeza", "valor_padrao": 100.0}).json()["id"]
+    client.delete(f"/api/v1/materiais/{material_id}")
+
+    response = client.post(f"/api/v1/materiais/{material_id}/ajustar-estoque", params={"quantidade": 3, "tipo": "saida"})
+    assert response.status_code == 400
+    response = client.post("/api/v1/materiais/ajustar-estoque/lote", json=[
+        {"material_id": material_id, "quantidade": 3, "tipo": "saida"}
+    ])
+    assert (response.status_code, response.json()["detail"]) == (400, f"Materiais inativos: [{material_id}]")
+    response = client.post("/api/v1/atendimentos", json={
+        "cliente_id": cliente_id, "data_hora": "2024-01-01T10:00:00", "valor_cobrado": 100.0,
+        "procedimentos": [{"procedimento_id": procedimento_id, "valor_cobrado": 100.0}],
+        "materiais_utilizados": [{"material_id": material_id, "quantidade_utilizada": 3, "valor_unitario_momento": 1.0}]
+    })
+    assert (response.status_code, response.json()["detail"]) == (400, "Material Gaze está inativo")
+    assert atualizar_saldos(db_session, {material_id: -3.0}) == {}
+    db_session.rollback()
+
+    # PUT em material inativo cruzando o mínimo não vira alerta
+    material = db_session.get(Material, material_id)
+    material.quantidade_disponivel = 1
+    db_session.flush()
+    assert "alertas_estoque" not in db_session.info
+    db_session.rollback()
+
+    movimentacoes = client.get(f"/api/v1/materiais/{material_id}/movimentacoes").json()["movimentacoes"]
+    assert [m["tipo"] for m in movimentacoes] == ["inicial"]
+    assert client.get(f"/api/v1/materiais/{material_id}/saldo").json()["saldo"] == 5
+
+def test_consolidar_materiais(client, db_session):
+    """Dry-run não grava; aplicada funde os duplicados e reponta todas as referências"""
+    materiais = [
+        Material(nome="Ácido Hialurônico", quantidade_disponivel=2, valor_unitario=10.0, estoque_minimo=1),
+        Material(nome="Luva", quantidade_disponivel=7, valor_unitario=1.0),
+        Material(nome="ACIDO  HIALURONICO", quantidade_disponivel=3, valor_unitario=12.0, descricao="1ml"),
+        Material(nome="!!!", quantidade_disponivel=1, valor_unitario=1.0),
+        Material(nome="???", quantidade_disponivel=1, valor_unitario=1.0),
+    ]
+    cliente = Cliente(nome="Ana", telefone="1")
+    procedimento = Procedimento(nome="Preenchimento", valor_padrao=100.0)
+    db_session.add_all([*materiais, cliente, procedimento])
+    db_session.flush()
+    atendimento = Atendimento(cliente_id=cliente.id, data_hora=datetime(2024, 1, 1), valor_cobrado=100.0)
+    db_session.add(atendimento)
+    db_session.flush()
+    duplicado, principal = materiais[0].id, materiais[2].id
+    db_session.add_all([
+        AtendimentoMaterial(
+            atendimento_id=atendimento.id, material_id=duplicado, quantidade_utilizada=1, valor_unitario_momento=10.0
+        ),
+        AtendimentoMaterial(
+            atendimento_id=atendimento.id, material_id=principal, quantidade_utilizada=2, valor_unitario_momento=12.0
+        ),
+        ProcedimentoMaterial(procedimento_id=procedimento.id, material_id=duplicado, quantidade_padrao=1.0),
+        ProcedimentoMaterial(procedimento_id=procedimento.id, material_id=principal, quantidade_padrao=0.5),
+    ])
+    db_session.commit()
+    reconstruir_consumo_diario(db_session)
+    gerar_snapshots(db_session)
+    db_session.commit()
+    similares = client.get("/api/v1/materiais/buscar/similares", params={"nome": "acido hialuronico"}).json()
+    assert [m["id"] for m in similares["materiais_similares"]] == [duplicado, principal]
+
+    relatorio = consolidar_materiais(db_session)
+    grupos = [(g["principal_id"], g["duplicados"], g["quantidade_total"]) for g in relatorio["grupos"]]
+    assert grupos == [(principal, [duplicado], 5)]
+    assert relatorio["referencias"] == {
+        "procedimento_materiais": 1, "atendimento_materiais": 1, "movimentacoes_estoque": 1, "consumo_diario": 1
+    }
+    assert relatorio["materiais_padrao_mesclados"] == 1
+    db_session.rollback()
+    assert db_session.get(Material, duplicado).ativo
+
+    assert consolidar_materiais(db_session, aplicar=True)["referencias"] == relatorio["referencias"]
+    db_session.commit()
+    db_session.expire_all()
+    assert not db_session.get(Material, duplicado).ativo
+    fundido = db_session.get(Material, principal)
+    assert (fundido.quantidade_disponivel, fundido.estoque_minimo, fundido.valor_unitario) == (5, 1, 12.0)
+    assert {m.material_id for m in db_session.query(AtendimentoMaterial)} == {principal}
+    consumo = db_session.query(ConsumoDiario).one()
+    assert (consumo.material_id, consumo.quantidade, consumo.valor_total) == (principal, 3, 34.0)
+    assert [(p.material_id, p.quantidade_padrao) for p in db_session.query(ProcedimentoMaterial)] == [(principal, 1.5)]
+    assert db_session.query(MovimentacaoEstoque).filter(MovimentacaoEstoque.material_id == duplicado).count() == 0
+    assert saldo_em(db_session, principal) == 5
+    # O cache do catálogo enxerga a fusão
+    similares = client.get("/api/v1/materiais/buscar/similares", params={"nome": "acido hialuronico"}).json()
+    assert [m["id"] for m in similares["materiais_similares"]] == [principal]
+    assert consolidar_materiais(db_session)["grupos"] == []
+
+def _componentes_por_pares(nomes, threshold):
+    """Referência O(n²): componentes conexas dos pares com similaridade >= threshold"""
+    grupo_de = list(range(len(nomes)))
+    def raiz(i):
+        while grupo_de[i] != i:
+            i = grupo_de[i]
+        return i
+    for i in range(len(nomes)):
+        for j in range(i + 1, len(nomes)):
+            if calcular_similaridade(nomes[i], nomes[j]) >= threshold:
+                grupo_de[raiz(j)] = raiz(i)
+    grupos = {}
+    for i in range(len(nomes)):
+        grupos.setdefault(raiz(i), []).append(i)
+    return sorted(grupos.values())
+
+def test_agrupar_indices_dentro_da_comparacao_de_pares():
+    """
+    Blocking + union-find só junta nomes que a comparação de todos os pares
+    também junta, com o mesmo resultado no processo atual e no pool
+    """
+    nomes = _catalogo_sintetico(random.Random(11), 150)
+    for threshold in (0.7, 0.8, 0.9):
+        grupos = agrupar_indices(nomes, threshold)
+        assert agrupar_indices(nomes, threshold, 2) == grupos
+        componente_de = {i: k for k, componente in enumerate(_componentes_por_pares(nomes, threshold)) for i in componente}
+        assert all(len({componente_de[i] for i in grupo}) == 1 for grupo in grupos)
+        assert sorted(i for grupo in grupos for i in grupo) == list(range(len(nomes)))
+        # Grafias diferentes do mesmo nome normalizado ficam juntas
+        assert any({nomes.index("Seringa"), nomes.index("SERINGA")} <= set(grupo) for grupo in grupos)
+
+def test_agrupar_materiais_similares_representante():
+    """O representante é o material com mais estoque e soma o estoque do grupo"""
+    materiais = [
+        {"id": 1, "nome": "Seringa 3ml", "quantidade_disponivel": 2},
+        {"id": 2, "nome": "Gaze", "quantidade_disponivel": 9},
+        {"id": 3, "nome": "SERINGA 3 ml", "quantidade_disponivel": 5},
+        {"id": 4, "nome": "", "quantidade_disponivel": 1},
+    ]
+    grupos = agrupar_materiais_similares(materiais)
+    assert [g["id"] for g in grupos] == [3, 2, 4]
+    assert [m["id"] for m in grupos[0]["materiais_similares"]] == [1, 3]
+    assert grupos[0]["total_estoque"] == 7
+
+def _normalizar_nome_por_regex(nome):
+    """Implementação anterior do normalizar_nome (NFD + regex), usada como referência"""
+    if not nome:
+        return ""
+    nome = unicodedata.normalize('NFD', nome.lower().strip())
+    nome = ''.join(c for c in nome if not unicodedata.combining(c))
+    nome = re.sub(r'[^a-z0-9\s]', '', nome)
+    return re.sub(r'\s+', ' ', nome).strip()
+
+def test_normalizar_nome_igual_implementacao_anterior():
+    """A tabela de translate produz o mesmo resultado da normalização por regex"""
+    rng = random.Random(3)
+    caracteres = [chr(c) for c in range(0x2100)] + list("　 ​ﬁÅΣΟΔΟΣİ")
+    nomes = ["".join(rng.choice(caracteres) for _ in range(rng.randint(0, 20))) for _ in range(5000)]
+    nomes += ["  Ácido   Hialurônico 1ml ", "SERINGA\t3ML", "Álcool 70%", "", None]
+    assert [normalizar_nome(n) for n in nomes] == [_normalizar_nome_por_regex(n) for n in nomes]
+    assert normalizar_nomes(nomes) == [normalizar_nome(n) for n in nomes]
+
+def test_similaridade_normalizada_igual_sequence_matcher():
+    """A busca dos blocos por substrings dá o mesmo ratio do SequenceMatcher"""
+    rng = random.Random(5)
+    pares = [
+        tuple("".join(rng.choice("ab c1") for _ in range(rng.randint(0, 30))) for _ in range(2))
+        for _ in range(5000)
+    ]
+    pares += [("seringa 3ml", "seringa 5ml"), ("gaze", "gaze"), ("", "luva"), ("a" * 250, "a" * 240 + "b")]
+    assert [similaridade_normalizada(a, b) for a, b in pares] == [SequenceMatcher(None, a, b).ratio() for a, b in pares]
@@ -0,0 +1,128 @@
+"""
+Testes para as migrações e para os planos de consulta das listagens
+"""
+
+import re
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, text
+from app.database import engine_leitura
+from app.migracoes import MIGRACOES, aplicar_migracoes
+from app.utils.paginacao import codificar_cursor
+from app.models import (
+    Base, Cliente, Procedimento, Material, Atendimento, AtendimentoProcedimento,
+    AtendimentoMaterial, ProcedimentoMaterial
+)
+
+def _indices(conn):
+    """Nomes dos índices criados explicitamente (inclui índices de expressão)"""
+    return {nome for (nome,) in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"))}
+
+def test_migracoes_em_banco_existente(tmp_path):
+    """Um banco criado antes dos índices recebe todos eles, uma única vez"""
+    engine_antigo = create_engine(f"sqlite:///{tmp_path / 'antigo.db'}")
+    Base.metadata.create_all(bind=engine_antigo)
+    with engine_antigo.begin() as conn:
+        declarados = [nome for nome in _indices(conn) if not nome.endswith("_id")]
+        for nome in declarados:
+            conn.execute(text(f"DROP INDEX {nome}"))
+        # A busca de clientes ainda não tinha índice FTS5
+        for trigger in ("insert", "delete", "update"):
+            conn.execute(text(f"DROP TRIGGER clientes_fts_{trigger}"))
+        conn.execute(text("DROP TABLE clientes_fts"))
+        # Colunas adicionadas por migrações ainda não existiam
+        for coluna in ("telefone_normalizado", "telefone_invertido"):
+            conn.execute(text(f"ALTER TABLE clientes DROP COLUMN {coluna}"))
+        conn.execute(text("INSERT INTO clientes (nome, telefone) VALUES ('João Silva', '(11) 99999-1111')"))
+        conn.execute(text("ALTER TABLE materiais DROP COLUMN nome_normalizado"))
+        conn.execute(text(
+            "INSERT INTO materiais (nome, quantidade_disponivel, unidade, valor_unitario, estoque_minimo, ativo) "
+            "VALUES ('Ácido Hialurônico', 1, 'ml', 10, 0, 1)"
+        ))
+
+    assert aplicar_migracoes(engine_antigo) == [m.versao for m in MIGRACOES]
+    assert aplicar_migracoes(engine_antigo) == []
+    with engine_antigo.connect() as conn:
+        assert set(declarados) <= _indices(conn)
+        assert conn.execute(text("SELECT nome_normalizado FROM materiais")).scalar() == "acido hialuronico"
+        assert conn.execute(text("SELECT tipo, quantidade FROM movimentacoes_estoque")).all() == [("inicial", 1.0)]
+        assert conn.execute(text("SELECT rowid FROM clientes_fts WHERE clientes_fts MATCH 'joao'")).all() == [(1,)]
+        assert conn.execute(text("SELECT telefone_normalizado, telefone_invertido FROM clientes")).all() == [
+            ("11999991111", "11119999911")
+        ]
+
+@pytest.fixture
+def dados_consultas(db_session):
+    """Cadastro mínimo para exercitar as listagens com filtros"""
+    cliente = Cliente(nome="Carla Dias", telefone="(31) 95555-4444")
+    material = Material(nome="Luva", quantidade_disponivel=1, valor_unitario=1.0, estoque_minimo=5)
+    procedimento = Procedimento(nome="Preenchimento", valor_padrao=1200.0)
+    db_session.add_all([cliente, material, procedimento])
+    db_session.flush()
+    db_session.add(ProcedimentoMaterial(procedimento_id=procedimento.id, material_id=material.id))
+    atendimento = Atendimento(cliente_id=cliente.id, data_hora=datetime(2024, 6, 1, 9), valor_cobrado=1200.0)
+    db_session.add(atendimento)
+    db_session.flush()
+    db_session.add(AtendimentoProcedimento(
+        atendimento_id=atendimento.id, procedimento_id=procedimento.id, valor_cobrado=1200.0
+    ))
+    db_session.add(AtendimentoMaterial(
+        atendimento_id=atendimento.id, material_id=material.id, quantidade_utilizada=1, valor_unitario_momento=1.0
+    ))
+    db_session.commit()
+    return {"cliente_id": cliente.id, "procedimento_id": procedimento.id, "atendimento_id": atendimento.id}
+
+# Varredura de tabela ou índice inteiro. Só é aceita em consultas com LIMIT
+# percorrendo um índice na ordem do ORDER BY (para ao completar a página).
+VARREDURA = re.compile(r"^SCAN (\w+)( USING (COVERING )?INDEX \w+)?$")
+
+def test_listagens_sem_varredura_completa(client, dados_consultas):
+    """Nenhuma consulta das listagens com filtro percorre uma tabela inteira"""
+    ids = dados_consultas
+    data = datetime(2024, 6, 1)
+    urls = [
+        ("/api/v1/atendimentos", {"limit": 10, "incluir_total": False}),
+        ("/api/v1/atendimentos", {"cliente_id": ids["cliente_id"]}),
+        ("/api/v1/atendimentos", {"status": "realizado"}),
+        ("/api/v1/atendimentos", {"procedimento_id": ids["procedimento_id"]}),
+        ("/api/v1/atendimentos", {"data_inicio": data.isoformat(), "data_fim": (data + timedelta(days=1)).isoformat()}),
+        ("/api/v1/atendimentos", {"cliente_id": ids["cliente_id"], "data_inicio": data.isoformat()}),
+        ("/api/v1/atendimentos", {"status": "realizado", "data_inicio": data.isoformat()}),
+        (f"/api/v1/atendimentos/{ids['atendimento_id']}", {}),
+        ("/api/v1/materiais", {"ativo": True}),
+        ("/api/v1/materiais", {"estoque_baixo": True}),
+        ("/api/v1/materiais/estoque/baixo", {}),
+        ("/api/v1/procedimentos", {"ativo": True}),
+        ("/api/v1/clientes", {"limit": 10, "incluir_total": False}),
+        ("/api/v1/clientes", {"cursor": codificar_cursor("Carla", 0), "incluir_total": False}),
+        (f"/api/v1/clientes/{ids['cliente_id']}/historico", {}),
+        ("/api/v1/clientes/autocomplete", {"q": "carla"}),
+        ("/api/v1/clientes/telefone", {"numero": "+55 31 95555-4444"}),
+        ("/api/v1/clientes/busca", {"termo": "5555-4444"}),
+        (f"/api/v1/procedimentos/{ids['procedimento_id']}/materiais-padrao", {}),
+    ]
+
+    # O índice do autocompletar é carregado uma vez (varrendo clientes); as consultas seguintes só leem a versão
+    client.get("/api/v1/clientes/autocomplete", params={"q": "carla"})
+
+    consultas = []
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            consultas.append((statement, parameters))
+    event.listen(engine_leitura, "before_cursor_execute", registrar)
+    try:
+        for url, params in urls:
+            assert client.get(url, params=params).status_code == 200
+    finally:
+        event.remove(engine_leitura, "before_cursor_execute", registrar)
+
+    assert consultas
+    with engine_leitura.connect() as conn:
+        for statement, parameters in consultas:
+            plano = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            com_limite = " LIMIT " in statement
+            varreduras = [
+                linha[3] for linha in plano
+                if VARREDURA.match(linha[3]) and not (com_limite and " USING " in linha[3])
+            ]
+            assert not varreduras, f"{varreduras} em: {statement}"
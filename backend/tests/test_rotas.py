@@ -0,0 +1,52 @@
+"""
+Testes de configuração das rotas
+"""
+
+import inspect
+import pytest
+from fastapi.routing import APIRoute
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.database import engine, engine_leitura, get_db, get_db_leitura
+from app.main import app
+
+# Endpoints assíncronos que usam o banco apenas via run_in_threadpool
+ASSINCRONOS_PERMITIDOS = {"importar_atendimentos_bulk", "importar_clientes"}
+
+def _usa(dependant, dependencia):
+    return any(d.call is dependencia or _usa(d, dependencia) for d in dependant.dependencies)
+
+def _usa_get_db(dependant):
+    return _usa(dependant, get_db) or _usa(dependant, get_db_leitura)
+
+def test_endpoints_com_banco_rodam_no_threadpool():
+    """Endpoints com sessão síncrona não podem ser async def (bloqueariam o event loop)"""
+    bloqueantes = [
+        route.endpoint.__name__
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        and _usa_get_db(route.dependant)
+        and inspect.iscoroutinefunction(route.endpoint)
+        and route.endpoint.__name__ not in ASSINCRONOS_PERMITIDOS
+    ]
+    assert bloqueantes == []
+
+def test_endpoints_get_usam_sessao_de_leitura():
+    """Endpoints GET usam o pool somente leitura, sem disputar conexões com escritas"""
+    com_sessao_de_escrita = [
+        route.endpoint.__name__
+        for route in app.routes
+        if isinstance(route, APIRoute) and "GET" in route.methods and _usa(route.dependant, get_db)
+    ]
+    assert com_sessao_de_escrita == []
+
+def test_perfil_sqlite(db_session):
+    """As conexões recebem os PRAGMAs do perfil e o pool de leitura recusa escritas"""
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    with engine_leitura.connect() as conn:
+        assert conn.execute(text("PRAGMA query_only")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("DELETE FROM clientes"))
@@ -0,0 +1,106 @@
+"""
+Testes para a serialização das listagens
+"""
+
+import asyncio
+import pytest
+from datetime import datetime
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from app.main import app
+from app.models import (
+    Atendimento, AtendimentoMaterial, AtendimentoProcedimento, Cliente, Material, Procedimento, ProcedimentoMaterial
+)
+from app.schemas import (
+    AtendimentoList, MaterialList, ProcedimentoList, Atendimento as AtendimentoSchema, Material as MaterialSchema
+)
+from app.utils.serializacao import codificar_json
+
+def _resposta_fastapi(caminho, conteudo):
+    """Bytes que o FastAPI geraria com o response_model da rota (validação + JSONResponse)"""
+    rota = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == caminho and "GET" in r.methods)
+    dados = asyncio.run(serialize_response(field=rota.response_field, response_content=conteudo))
+    return JSONResponse(dados).body
+
+@pytest.fixture
+def catalogo(db_session):
+    """Materiais e procedimentos com acentos, frações e datas com microssegundos"""
+    materiais = [
+        Material(nome="Ácido hialurônico", descricao="Seringa 1ml \"premium\"", quantidade_disponivel=2.5,
+                 valor_unitario=0.1 + 0.2, estoque_minimo=0.00005, data_cadastro=datetime(2024, 1, 2, 3, 4, 5, 678901)),
+        Material(nome="Toxina botulínica", quantidade_disponivel=1e16, valor_unitario=850.0),
+        Material(nome="Gaze", quantidade_disponivel=0, valor_unitario=0.35, ativo=False),
+    ]
+    procedimento = Procedimento(nome="Preenchimento labial", descricao="Lábios ✨", valor_padrao=1200.0)
+    db_session.add_all([*materiais, procedimento])
+    db_session.flush()
+    db_session.add(ProcedimentoMaterial(procedimento_id=procedimento.id, material_id=materiais[0].id, quantidade_padrao=0.5))
+    db_session.commit()
+
+def test_listar_materiais_identico_ao_fastapi(client, db_session, catalogo):
+    """A listagem de materiais gera exatamente os bytes do caminho anterior"""
+    response = client.get("/api/v1/materiais")
+    materiais = db_session.query(Material).all()
+    esperado = _resposta_fastapi("/api/v1/materiais", MaterialList(
+        materiais=[MaterialSchema.model_validate(m) for m in materiais], total=len(materiais)
+    ))
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == esperado
+
+def test_listar_procedimentos_identico_ao_fastapi(client, db_session, catalogo):
+    """A listagem de procedimentos (com materiais padrão aninhados) gera os mesmos bytes"""
+    response = client.get("/api/v1/procedimentos")
+    procedimentos = db_session.query(Procedimento).all()
+    esperado = _resposta_fastapi("/api/v1/procedimentos", ProcedimentoList(procedimentos=procedimentos, total=1))
+    assert response.content == esperado
+
+@pytest.fixture
+def atendimentos(db_session, catalogo):
+    """Atendimentos com procedimentos e materiais aninhados, datas com microssegundos e valores fracionários"""
+    cliente = Cliente(nome="Júlia \"Ju\" Conceição", telefone="(11) 99999-1111", observacao="Alérgica a látex")
+    db_session.add(cliente)
+    db_session.flush()
+    procedimento = db_session.query(Procedimento).one()
+    material = db_session.query(Material).first()
+    for data_hora, valor in ((datetime(2024, 3, 1, 9, 30, 0, 123456), 0.1 + 0.2), (datetime(2024, 3, 2, 14, 0), 1e16)):
+        atendimento = Atendimento(
+            cliente_id=cliente.id, data_hora=data_hora, valor_cobrado=valor, observacoes="Retorno em 15 dias ✨"
+        )
+        db_session.add(atendimento)
+        db_session.flush()
+        db_session.add_all([
+            AtendimentoProcedimento(atendimento_id=atendimento.id, procedimento_id=procedimento.id, valor_cobrado=valor),
+            AtendimentoMaterial(
+                atendimento_id=atendimento.id, material_id=material.id,
+                quantidade_utilizada=0.00005, valor_unitario_momento=0.1 + 0.2
+            ),
+        ])
+    db_session.commit()
+
+def test_listar_atendimentos_identico_ao_fastapi(client, db_session, atendimentos):
+    """A listagem de atendimentos (cliente, procedimentos e materiais aninhados) gera os mesmos bytes"""
+    response = client.get("/api/v1/atendimentos")
+    lista = db_session.query(Atendimento).order_by(Atendimento.data_hora.desc(), Atendimento.id.desc()).all()
+    esperado = _resposta_fastapi("/api/v1/atendimentos", AtendimentoList(
+        atendimentos=[AtendimentoSchema.model_validate(a) for a in lista], total=len(lista)
+    ))
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == esperado
+
+def test_obter_atendimento_identico_ao_fastapi(client, db_session, atendimentos):
+    """O detalhe do atendimento gera os mesmos bytes do response_model"""
+    atendimento = db_session.query(Atendimento).first()
+    response = client.get(f"/api/v1/atendimentos/{atendimento.id}")
+    esperado = _resposta_fastapi("/api/v1/atendimentos/{atendimento_id}", atendimento)
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == esperado
+    dados = response.json()
+    assert [p["procedimento"]["materiais_padrao"][0]["quantidade_padrao"] for p in dados["procedimentos"]] == [0.5]
+    assert [m["material"]["nome"] for m in dados["materiais_utilizados"]] == ["Ácido hialurônico"]
+    assert client.get("/api/v1/atendimentos/9999").status_code == 404
+
+@pytest.mark.parametrize("valor", [800.0, 0.1 + 0.2, 5e-05, 1e16, -0.00001, 1e-7, 123456.789])
+def test_codificar_json_floats(valor):
+    """Floats fora da faixa em que orjson e json concordam caem no json padrão"""
+    dados = {"valor": valor, "texto": "João"}
+    assert codificar_json(dados) == JSONResponse(dados).body
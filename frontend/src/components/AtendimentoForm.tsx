@@ -53,12 +53,12 @@ const AtendimentoForm: React.FC<AtendimentoFormProps> = ({
     try {
       setLoadingData(true);
       const [clientesRes, procedimentosRes, materiaisRes] = await Promise.all([
-        clientesApi.listar(),
+        clientesApi.listarTodos(),
         procedimentosApi.listar({ ativo: true }),
         materiaisApi.listar({ ativo: true })
       ]);
 
-      setClientes(clientesRes.data.clientes);
+      setClientes(clientesRes.data);
       setProcedimentos(procedimentosRes.data.procedimentos);
       setMateriais(materiaisRes.data.materiais);
     } catch (error) {
@@ -65,12 +65,12 @@ const AtendimentoTable: React.FC<AtendimentoTableProps> = ({
       setLoading(true);
       const [atendimentosRes, clientesRes, procedimentosRes] = await Promise.all([
         atendimentosApi.listar(filtros),
-        clientesApi.listar(),
+        clientesApi.listarTodos(),
         procedimentosApi.listar()
       ]);
 
       setAtendimentos(atendimentosRes.data.atendimentos);
-      setClientes(clientesRes.data.clientes);
+      setClientes(clientesRes.data);
       setProcedimentos(procedimentosRes.data.procedimentos);
     } catch (error) {
       message.error('Erro ao carregar atendimentos');
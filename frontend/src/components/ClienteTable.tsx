@@ -20,12 +20,32 @@ const ClienteTable: React.FC<ClienteTableProps> = ({
   const [clientes, setClientes] = useState<Cliente[]>([]);
   const [loading, setLoading] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
+  const [nextCursor, setNextCursor] = useState<string | undefined>();
+  const [totalClientes, setTotalClientes] = useState<number | undefined>();
 
   const carregarClientes = async () => {
     try {
       setLoading(true);
       const response = await clientesApi.listar();
       setClientes(response.data.clientes);
+      setNextCursor(response.data.next_cursor);
+      setTotalClientes(response.data.total);
+    } catch (error) {
+      message.error('Erro ao carregar clientes');
+      console.error('Erro:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  // Próxima página da listagem (cursor), sem recontar o total
+  const carregarMais = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoading(true);
+      const response = await clientesApi.listar({ cursor: nextCursor, incluir_total: false });
+      setClientes((anteriores) => [...anteriores, ...response.data.clientes]);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       message.error('Erro ao carregar clientes');
       console.error('Erro:', error);
@@ -44,6 +64,8 @@ const ClienteTable: React.FC<ClienteTableProps> = ({
       setLoading(true);
       const response = await clientesApi.buscar(searchTerm);
       setClientes(response.data.clientes);
+      setNextCursor(undefined);
+      setTotalClientes(response.data.total);
     } catch (error) {
       message.error('Erro na busca');
       console.error('Erro:', error);
@@ -178,9 +200,16 @@ const ClienteTable: React.FC<ClienteTableProps> = ({
           showSizeChanger: true,
           showQuickJumper: true,
           showTotal: (total, range) =>
-            `${range[0]}-${range[1]} de ${total} clientes`,
+            `${range[0]}-${range[1]} de ${totalClientes ?? total} clientes`,
         }}
       />
+      {nextCursor && (
+        <div style={{ textAlign: 'center', marginTop: 16 }}>
+          <Button onClick={carregarMais} loading={loading}>
+            Carregar mais clientes
+          </Button>
+        </div>
+      )}
     </div>
   );
 };
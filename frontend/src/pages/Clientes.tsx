@@ -22,8 +22,8 @@ const Clientes: React.FC = () => {
 
   const carregarEstatisticas = async () => {
     try {
-      const response = await clientesApi.listar();
-      const clientes = response.data.clientes;
+      const response = await clientesApi.listarTodos();
+      const clientes = response.data;
       setEstatisticas({
         total_clientes: clientes.length,
         com_email: clientes.filter(c => c.email).length,
@@ -22,7 +22,10 @@ const api = axios.create({
 
 // Clientes
 export const clientesApi = {
-  listar: () => api.get<ClienteListResponse>('/clientes'),
+  listar: (params?: { limit?: number; cursor?: string; incluir_total?: boolean }) =>
+    api.get<ClienteListResponse>('/clientes', { params }),
+  // Todos os clientes em um único array (streaming no backend), para selects e estatísticas
+  listarTodos: () => api.get<Cliente[]>('/clientes', { params: { formato: 'json' } }),
   buscar: (termo: string) => api.get<ClienteListResponse>(`/clientes/busca?termo=${termo}`),
   obter: (id: number) => api.get<Cliente>(`/clientes/${id}`),
   criar: (cliente: Omit<Cliente, 'id' | 'data_cadastro'>) => api.post<Cliente>('/clientes', cliente),
@@ -40,6 +43,8 @@ export const atendimentosApi = {
     data_inicio?: string;
     data_fim?: string;
     status?: string;
+    cursor?: string;
+    incluir_total?: boolean;
   }) => api.get<AtendimentoList>('/atendimentos', { params }),
   obter: (id: number) => api.get<Atendimento>(`/atendimentos/${id}`),
   criar: (atendimento: AtendimentoCreate) => api.post<Atendimento>('/atendimentos', atendimento),
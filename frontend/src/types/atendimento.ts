@@ -107,7 +107,8 @@ export interface AtendimentoUpdate {
 
 export interface AtendimentoList {
   atendimentos: Atendimento[];
-  total: number;
+  total?: number | null;
+  next_cursor?: string | null;
 }
 
 export interface ProcedimentoList {
@@ -122,5 +123,6 @@ export interface MaterialList {
 
 export interface ClienteListResponse {
   clientes: Cliente[];
-  total: number;
+  total?: number;       // ausente quando a consulta pede incluir_total=false
+  next_cursor?: string; // próxima página; ausente na última
 } 
\ No newline at end of file
@@ -22,5 +22,6 @@ export interface ClienteUpdate {
 
 export interface ClienteListResponse {
   clientes: Cliente[];
-  total: number;
+  total?: number;       // ausente quando a consulta pede incluir_total=false
+  next_cursor?: string; // próxima página; ausente na última
 } 
\ No newline at end of file